@@ -0,0 +1,80 @@
+"""
+Lambda の Init 相当（app の import と、区のリーダー・取得エンジンの読み込み）にかかる時間を計測する。
+毎回新しいプロセスで `python -X importtime` を実行し、最上位の import の累積時間の合計から
+インタプリタ起動時の import（site 等）の分を差し引いて集計する。
+
+    python benchmarks/bench_import.py --runs 10
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+# 計測する処理。区ごとに、既定エンジンで初回取得するまでに読み込まれるモジュールを含める
+SCENARIOS: Dict[str, str] = {
+    "app": "import app",
+    "app+minato(http)": "import app; app.get_reader('minato'); import requests",
+    "app+nakano(http)": "import app; app.get_reader('nakano'); import requests",
+    "app+nerima(playwright)": (
+        "import app; app.get_reader('nerima'); import playwright.sync_api"
+    ),
+    "app+suginami(playwright)": (
+        "import app; app.get_reader('suginami'); import playwright.sync_api"
+    ),
+    # 全区のモジュールと依存をまとめて読み込む場合（遅延読み込み前の app に相当）
+    "all wards (eager)": (
+        "import app, batch, minato, nakano, nerima, suginami; "
+        "import requests, playwright.sync_api, playwright.async_api"
+    ),
+}
+
+
+def measure(code: str) -> float:
+    """新しいプロセスで code を実行し、import にかかった時間（ミリ秒）を返す"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # インデントの無い行（最上位の import）だけを合計する
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us / 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="JSON で出力する")
+    args = parser.parse_args()
+
+    baseline = statistics.median(measure("pass") for _ in range(args.runs))
+    report: Dict[str, Dict[str, float]] = {}
+    for name, code in SCENARIOS.items():
+        samples: List[float] = [measure(code) - baseline for _ in range(args.runs)]
+        report[name] = {"p50_ms": statistics.median(samples), "min_ms": min(samples)}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'scenario':<28}{'p50':>12}{'min':>12}")
+    for name, result in report.items():
+        print(f"{name:<28}{result['p50_ms']:>10.1f}ms{result['min_ms']:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+モック OPAC に対して lambda_handler を実行し、フェーズごとの所要時間とピーク RSS を計測する。
+1回目をコールドスタート、2回目以降をウォーム実行として集計する。
+
+    python benchmarks/bench_lambda.py --runs 5 --latency 50
+    python benchmarks/bench_lambda.py --area nakano --engine playwright --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from mock_opac import ENTRY_PATHS, MockOpacServer  # noqa: E402
+
+PHASES = ("browser_launch", "login", "navigation", "parse", "total")
+
+
+class PhaseTimer:
+    """リーダーの各メソッドを包んでフェーズごとの所要時間を集計する"""
+
+    def __init__(self) -> None:
+        self.spans: Dict[str, float] = defaultdict(float)
+        self._stack: List[str] = []
+
+    @contextmanager
+    def span(self, phase: str):
+        start = time.perf_counter()
+        self._stack.append(phase)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - start
+            self.spans[phase] += elapsed
+            # 入れ子になったフェーズの時間は外側のフェーズから差し引く
+            if self._stack:
+                self.spans[self._stack[-1]] -= elapsed
+
+    def wrap(self, owner, name: str, phase: str) -> None:
+        original = getattr(owner, name)
+        timer = self
+
+        def wrapper(*args, **kwargs):
+            with timer.span(phase):
+                return original(*args, **kwargs)
+
+        setattr(owner, name, wrapper)
+
+    def reset(self) -> None:
+        self.spans.clear()
+
+
+class RssSampler:
+    """自プロセスと子孫プロセス（ブラウザ）の RSS 合計を定期的に計測し、最大値を記録する"""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval: float = interval
+        self.peak: int = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _children() -> Dict[int, List[int]]:
+        tree: Dict[int, List[int]] = defaultdict(list)
+        for pid in filter(str.isdigit, os.listdir("/proc")):
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            tree[ppid].append(int(pid))
+        return tree
+
+    @staticmethod
+    def _rss(pid: int) -> int:
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, IndexError, ValueError):
+            return 0
+
+    def sample(self) -> int:
+        tree = self._children()
+        pids, total = [os.getpid()], 0
+        while pids:
+            pid = pids.pop()
+            total += self._rss(pid)
+            pids.extend(tree.get(pid, []))
+        return total
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.sample())
+            time.sleep(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.sample())
+
+
+def instrument(timer: PhaseTimer) -> None:
+    """ブラウザ起動・ログイン・画面遷移・解析の各処理にタイマーを仕掛ける"""
+    import browser_pool
+    import library_reader
+    import minato
+    import nakano
+    import nerima
+    import suginami
+
+    original_create = browser_pool.create_browser
+
+    def create_browser(playwright, profile=None):
+        with timer.span("browser_launch"):
+            return original_create(playwright, profile)
+
+    browser_pool.create_browser = create_browser
+
+    # 一覧は区ごとのジェネレータ（_read_*）を基底クラスでリストにまとめるので、そちらで計測する
+    # （_parse_all は2つ目のページの表示待ちも含む）
+    for name in (
+        "_parse_all",
+        "_parse_lent",
+        "_parse_reserve",
+        "_http_parse_all",
+        "_http_parse_lent",
+        "_http_parse_reserve",
+    ):
+        timer.wrap(library_reader.BaseLibraryReader, name, "navigation")
+
+    for module in (minato, nakano, nerima, suginami):
+        reader = next(
+            v
+            for v in vars(module).values()
+            if isinstance(v, type)
+            and issubclass(v, library_reader.BaseLibraryReader)
+            and v is not library_reader.BaseLibraryReader
+        )
+        for name in ("_login", "_http_login"):
+            if name in vars(reader):
+                timer.wrap(reader, name, "login")
+        if "_between_tabs" in vars(reader):
+            timer.wrap(reader, "_between_tabs", "navigation")
+        # 解析だけの時間は画面遷移の時間から差し引かれる
+        for name in vars(module):
+            if name.startswith("build_"):
+                timer.wrap(module, name, "parse")
+
+
+def point_readers_to(server: MockOpacServer) -> None:
+    """各区のリーダーの接続先をモックサーバに向ける"""
+    import minato
+    import nakano
+    import nerima
+    import suginami
+
+    minato.MinatoLibraryReader.URL = server.entry_url("minato")
+    nakano.NakanoLibraryReader.URL = server.entry_url("nakano")
+    nerima.NerimaLibraryReader.URL = server.entry_url("nerima")
+    suginami.SuginamiLibraryReader.URL = server.entry_url("suginami")
+
+
+def force_engine(engine: str) -> None:
+    """全リーダーの既定エンジンを差し替える（対応していない区は Playwright のまま）"""
+    import library_reader
+
+    for reader in library_reader.BaseLibraryReader.__subclasses__():
+        if engine in reader.ENGINES:
+            reader.ENGINES = (engine,) + tuple(
+                e for e in reader.ENGINES if e != engine
+            )
+
+
+def run(area: str, runs: int, timer: PhaseTimer) -> List[Dict[str, float]]:
+    from app import lambda_handler
+
+    event = {
+        "queryStringParameters": {
+            "area": area,
+            "userid": "0000000000",
+            "password": "dummy",
+        }
+    }
+    results = []
+    for _ in range(runs):
+        timer.reset()
+        with RssSampler() as rss:
+            start = time.perf_counter()
+            lambda_handler(event, None)
+            timer.spans["total"] = time.perf_counter() - start
+        result = {phase: timer.spans.get(phase, 0.0) * 1000 for phase in PHASES}
+        result["peak_rss_mb"] = rss.peak / 1024 / 1024
+        results.append(result)
+    return results
+
+
+def summarize(results: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    cold, warm = results[0], results[1:]
+    summary = {"cold": cold}
+    if warm:
+        summary["warm_p50"] = {
+            k: statistics.median(r[k] for r in warm) for k in cold.keys()
+        }
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--area", choices=list(ENTRY_PATHS), action="append")
+    parser.add_argument("--runs", type=int, default=5, help="1区あたりの実行回数")
+    parser.add_argument("--latency", type=float, default=0.0, help="遅延（ミリ秒）")
+    parser.add_argument("--engine", choices=("http", "playwright"))
+    parser.add_argument("--json", action="store_true", help="JSON で出力する")
+    args = parser.parse_args()
+
+    server = MockOpacServer(latency=args.latency / 1000).start()
+    timer = PhaseTimer()
+    instrument(timer)
+    point_readers_to(server)
+    if args.engine:
+        force_engine(args.engine)
+
+    report = {}
+    try:
+        for area in args.area or list(ENTRY_PATHS):
+            report[area] = summarize(run(area, args.runs, timer))
+    finally:
+        server.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    header = f"{'area':<10}{'run':<10}" + "".join(f"{p:>16}" for p in PHASES)
+    print(header + f"{'peak_rss_mb':>14}")
+    for area, summary in report.items():
+        for label, result in summary.items():
+            row = f"{area:<10}{label:<10}"
+            row += "".join(f"{result[p]:>14.1f}ms" for p in PHASES)
+            print(row + f"{result['peak_rss_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
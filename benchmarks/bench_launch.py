@@ -0,0 +1,99 @@
+"""
+起動プロファイル（launch_profile.PROFILES）ごとに Chromium を起動し、起動時間・モック OPAC の
+最初の画面を表示するまでの時間・ピーク RSS を計測する。
+ブラウザは毎回起動し直すため、どの実行もコールドスタート相当になる。
+
+    python benchmarks/bench_launch.py --runs 5
+    python benchmarks/bench_launch.py --profile default --profile minimal-memory --json
+
+取得処理全体を特定のプロファイルで計測する場合は、BROWSER_PROFILE を指定して bench_lambda.py を
+Playwright エンジンで実行する。
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from bench_lambda import RssSampler  # noqa: E402
+from mock_opac import ENTRY_PATHS, MockOpacServer  # noqa: E402
+
+from browser_pool import create_browser  # noqa: E402
+from launch_profile import PROFILES, get_launch_profile  # noqa: E402
+
+METRICS = ("launch_ms", "first_page_ms", "peak_rss_mb")
+
+
+def run(playwright, profile_name: str, url: str, runs: int) -> List[Dict[str, float]]:
+    profile = get_launch_profile(profile_name)
+    results = []
+    for _ in range(runs):
+        with RssSampler() as rss:
+            start = time.perf_counter()
+            browser = create_browser(playwright, profile)
+            launched = time.perf_counter()
+            try:
+                page = browser.new_context().new_page()
+                page.goto(url)
+                page.wait_for_load_state()
+                loaded = time.perf_counter()
+            finally:
+                browser.close()
+        results.append(
+            {
+                "launch_ms": (launched - start) * 1000,
+                "first_page_ms": (loaded - launched) * 1000,
+                "peak_rss_mb": rss.peak / 1024 / 1024,
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profile", choices=list(PROFILES), action="append")
+    parser.add_argument("--area", choices=list(ENTRY_PATHS), default="minato")
+    parser.add_argument("--runs", type=int, default=5, help="プロファイルごとの起動回数")
+    parser.add_argument("--json", action="store_true", help="JSON で出力する")
+    args = parser.parse_args()
+
+    from playwright.sync_api import sync_playwright
+
+    server = MockOpacServer().start()
+    report: Dict[str, Dict[str, float]] = {}
+    try:
+        with sync_playwright() as playwright:
+            for name in args.profile or list(PROFILES):
+                results = run(playwright, name, server.entry_url(args.area), args.runs)
+                report[name] = {
+                    f"{k}_p50": statistics.median(r[k] for r in results)
+                    for k in METRICS
+                }
+                report[name]["peak_rss_mb_max"] = max(r["peak_rss_mb"] for r in results)
+    finally:
+        server.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"{'profile':<16}{'launch p50':>14}{'first page p50':>18}"
+        f"{'rss p50':>12}{'rss max':>12}"
+    )
+    for name, result in report.items():
+        print(
+            f"{name:<16}{result['launch_ms_p50']:>12.1f}ms"
+            f"{result['first_page_ms_p50']:>16.1f}ms"
+            f"{result['peak_rss_mb_p50']:>10.1f}MB"
+            f"{result['peak_rss_mb_max']:>10.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+中野区の予約中一覧の解析（nakano.build_reserve_items）を、予約件数を変えた合成データで計測する。
+比較のため、状態ごとにリストを削除・切り出ししていた以前の実装も同じデータで計測し、
+結果が一致することを確認する。
+
+    python benchmarks/bench_nakano_reserve.py --holds 100 300 1000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from model import ReserveItem  # noqa: E402
+from nakano import build_reserve_items  # noqa: E402
+
+STATUSES = ("予約中", "取置済", "回送中")
+
+
+def synthetic_cells(holds: int) -> List[str]:
+    """予約 holds 件分のセルテキスト（1件8セル、状態は順に入れ替える）"""
+    cells: List[str] = []
+    for n in range(1, holds + 1):
+        status = STATUSES[n % len(STATUSES)]
+        day = n % 28 + 1
+        cells += [
+            str(n),
+            status,
+            f"2024/04/{day:02d}\n順位\n{n}" if status == "予約中" else f"2024/04/{day:02d}",
+            "受取館\n中央図書館",
+            f"タイトル{n}",
+            f"2024/05/{day:02d}" if status == "取置済" else "",
+            "連絡方法\n電話" if n % 2 else "メール",
+            "",
+        ]
+    return cells
+
+
+def previous_build_reserve_items(elements: List[str]) -> List[ReserveItem]:
+    """以前の実装（回送中の行でリストを削除し、状態ごとに前後を切り出す）"""
+    elements = [e.replace("\t", "").strip().split("\n") for e in elements]
+    items: List[ReserveItem] = []
+    i = 0
+    while i < len(elements):
+        parse_elements = []
+        if elements[i][0] and elements[i][0] in ("予約中", "取置済"):
+            parse_elements = elements[i - 1 : i + 7]
+        elif elements[i][0] and elements[i][0] in ("回送中"):
+            del elements[i - 1]
+            i = i - 1
+            parse_elements = elements[i - 1 : i + 7]
+        if parse_elements:
+            items.append(
+                ReserveItem(
+                    title="".join(parse_elements[4]),
+                    receive_location=parse_elements[3][1],
+                    notification_method=(
+                        parse_elements[6][0]
+                        if len(parse_elements[6]) == 1
+                        else parse_elements[6][1]
+                    ),
+                    reserve_date=parse_elements[2][0],
+                    reserve_rank=(
+                        parse_elements[2][2] if len(parse_elements[2]) == 3 else ""
+                    ),
+                    reserve_status=parse_elements[1][0],
+                    reserve_expire_date=parse_elements[5][0],
+                    is_canceled=None,
+                )
+            )
+        i += 1
+    return items
+
+
+def measure(
+    func: Callable[[List[str]], List[ReserveItem]], cells: List[str], runs: int
+) -> Dict[str, float]:
+    """func の所要時間（ミリ秒）の中央値と最小値"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(cells)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": statistics.median(samples), "min_ms": min(samples)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--holds", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="JSON で出力する")
+    args = parser.parse_args()
+
+    report: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for holds in args.holds:
+        cells = synthetic_cells(holds)
+        current = build_reserve_items(cells)
+        if current != previous_build_reserve_items(cells) or len(current) != holds:
+            raise SystemExit(f"{holds} 件: 以前の実装と解析結果が一致しません")
+        report[str(holds)] = {
+            "current": measure(build_reserve_items, cells, args.runs),
+            "previous": measure(previous_build_reserve_items, cells, args.runs),
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'holds':>8}{'current p50':>16}{'previous p50':>16}")
+    for holds, result in report.items():
+        print(
+            f"{holds:>8}{result['current']['p50_ms']:>14.2f}ms"
+            f"{result['previous']['p50_ms']:>14.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
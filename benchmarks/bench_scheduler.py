@@ -0,0 +1,187 @@
+"""
+合成アカウントの貸出・予約の推移を一定期間シミュレーションし、固定間隔で取得する場合と
+scheduler.PollScheduler で取得時刻を決める場合の取得回数を比較する。
+あわせて、予約資料が取置になってから取得で気付くまでの遅れを集計する。
+
+    python benchmarks/bench_scheduler.py --accounts 200 --days 30 --fixed-hours 1
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from model import LentItem, ReserveItem  # noqa: E402
+from resilience import JST  # noqa: E402
+from scheduler import PollJob, PollScheduler  # noqa: E402
+
+DAY = 86400
+# 取置になった予約資料を受け取るまでの日数・取置期限までの日数
+PICKUP_DAYS = 3
+HOLD_DAYS = 7
+# 合成アカウントを割り当てる区と、予約順位を数値で持つ区（他の区は文字列）
+AREAS = ("minato", "nakano", "nerima", "suginami")
+INT_RANK_AREAS = frozenset({"minato", "nerima"})
+
+
+class SyntheticAccount:
+    """
+    貸出は返却期限の日に返却し、予約は一定の日数ごとに順位が1つずつ上がって取置になるアカウント。
+    """
+
+    def __init__(self, rng: random.Random, start: float, area: str) -> None:
+        self.start: float = start
+        self.area: str = area
+        self.lent: List[Tuple[str, float]] = [
+            (f"貸出{n}", start + rng.randint(1, 21) * DAY)
+            for n in range(rng.randint(0, 5))
+        ]
+        # (タイトル, 開始時の順位, 順位が1つ上がるまでの秒数)
+        self.holds: List[Tuple[str, int, float]] = [
+            (f"予約{n}", rng.randint(1, 15), rng.uniform(0.5, 4) * DAY)
+            for n in range(rng.randint(0, 6))
+        ]
+
+    @staticmethod
+    def _date(t: float) -> date:
+        return datetime.fromtimestamp(t, JST).date()
+
+    def ready_times(self) -> List[float]:
+        """予約資料が取置になる時刻"""
+        return [self.start + rank * per_rank for _, rank, per_rank in self.holds]
+
+    def items(self, t: float) -> Tuple[List[LentItem], List[ReserveItem]]:
+        """時刻 t の貸出中・予約中一覧"""
+        lent_items = [
+            LentItem(title=title, return_date=self._date(due))
+            for title, due in self.lent
+            if t < due
+        ]
+        reserve_items = []
+        for (title, rank, per_rank), ready in zip(self.holds, self.ready_times()):
+            if t >= ready + PICKUP_DAYS * DAY:
+                continue
+            int_rank = self.area in INT_RANK_AREAS
+            if t >= ready:
+                expire = self._date(ready) + timedelta(days=HOLD_DAYS)
+                status, expire_date = "取置済", expire
+                current = None if int_rank else ""
+            else:
+                current = rank - int((t - self.start) // per_rank)
+                current = current if int_rank else str(current)
+                status, expire_date = "予約中", None
+            reserve_items.append(
+                ReserveItem(
+                    title=title,
+                    reserve_rank=current,
+                    reserve_status=status,
+                    reserve_expire_date=expire_date,
+                )
+            )
+        return lent_items, reserve_items
+
+
+def detection_delays(
+    accounts: Dict[str, SyntheticAccount], fetches: Dict[str, List[float]]
+) -> List[float]:
+    """取置になってから、その後最初に取得するまでの時間（時間単位）"""
+    delays = []
+    for userid, account in accounts.items():
+        times = fetches[userid]
+        for ready in account.ready_times():
+            later = [t for t in times if t >= ready]
+            if later:
+                delays.append((later[0] - ready) / 3600)
+    return delays
+
+
+def simulate_fixed(
+    accounts: Dict[str, SyntheticAccount], start: float, end: float, interval: float
+) -> Dict[str, List[float]]:
+    times = [start + n * interval for n in range(int((end - start) // interval) + 1)]
+    return {userid: times for userid in accounts}
+
+
+def simulate_adaptive(
+    accounts: Dict[str, SyntheticAccount], start: float, end: float
+) -> Dict[str, List[float]]:
+    clock = [start]
+    scheduler = PollScheduler(clock=lambda: clock[0])
+    fetches: Dict[str, List[float]] = {userid: [] for userid in accounts}
+    for userid, account in accounts.items():
+        scheduler.add(account.area, userid, "", due_at=start)
+
+    def fetch(job: PollJob) -> Tuple[List[LentItem], List[ReserveItem]]:
+        fetches[job.userid].append(clock[0])
+        return accounts[job.userid].items(clock[0])
+
+    # 合成データでは取得は失敗しないため、失敗扱いになった場合は予定の決定の不具合として止める
+    def fail(job: PollJob, error: BaseException, now=None) -> PollJob:
+        raise SystemExit(f"{job.area}/{job.userid}: 次回の取得時刻を決められません: {error!r}")
+
+    scheduler.record_error = fail
+
+    while True:
+        next_due = scheduler.next_due_at()
+        if next_due is None or next_due > end:
+            return fetches
+        clock[0] = next_due
+        scheduler.drain(fetch)
+
+
+def summarize(
+    accounts: Dict[str, SyntheticAccount], fetches: Dict[str, List[float]]
+) -> Dict[str, float]:
+    delays = detection_delays(accounts, fetches)
+    return {
+        "fetches": sum(len(t) for t in fetches.values()),
+        "ready_delay_p50_h": statistics.median(delays) if delays else 0.0,
+        "ready_delay_max_h": max(delays, default=0.0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--fixed-hours", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="JSON で出力する")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = datetime(2024, 4, 1, tzinfo=JST).timestamp()
+    end = start + args.days * DAY
+    accounts = {
+        str(n): SyntheticAccount(rng, start, AREAS[n % len(AREAS)])
+        for n in range(args.accounts)
+    }
+
+    report = {
+        f"fixed_{args.fixed_hours:g}h": summarize(
+            accounts, simulate_fixed(accounts, start, end, args.fixed_hours * 3600)
+        ),
+        "adaptive": summarize(accounts, simulate_adaptive(accounts, start, end)),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'strategy':>12}{'fetches':>10}{'ready p50':>12}{'ready max':>12}")
+    for name, result in report.items():
+        print(
+            f"{name:>12}{result['fetches']:>10}"
+            f"{result['ready_delay_p50_h']:>11.1f}h"
+            f"{result['ready_delay_max_h']:>11.1f}h"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+4区の OPAC のログイン・一覧画面を fixtures の合成の HTML で再現するローカルサーバ。
+各リーダーの _login / _parse_* と同じ画面遷移になるように画面をつなぐ。
+
+    python benchmarks/mock_opac.py --port 8000 --latency 50
+"""
+
+import argparse
+import re
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = Path(__file__).resolve().parents[1] / "fixtures"
+
+# ログインを拒否するパスワード（認証情報の誤りを再現する）
+WRONG_PASSWORD = "wrong-password"
+
+# 各区の入口 URL（サーバのベース URL からの相対パス）
+ENTRY_PATHS = {
+    "minato": "/minato/WOpacSmtMnuTopAction.do",
+    "nakano": "/nakano/usermenu.do?target=adult/",
+    "nerima": "/nerima/",
+    "suginami": "/suginami/",
+}
+
+
+def _page(title: str, body: str) -> str:
+    return (
+        '<!DOCTYPE html><html lang="ja"><head><meta charset="UTF-8">'
+        f"<title>{title}</title></head><body>{body}</body></html>"
+    )
+
+
+def _fixture(area: str, name: str) -> str:
+    return (FIXTURES_DIR / area / f"{name}.html").read_text(encoding="utf-8")
+
+
+def _with_nav(html: str, nav: str) -> str:
+    """fixture の body 先頭にナビゲーションを差し込む"""
+    return html.replace("<body>", f"<body>{nav}", 1)
+
+
+def _nerima_mypage() -> str:
+    """練馬は貸出・予約が同じ画面のタブなので、2つの fixture を1画面にまとめる"""
+    lent = _fixture("nerima", "lent")
+    reserve = _fixture("nerima", "reserve")
+    pane = re.search(
+        r'<div class="tab-pane[^"]*" id="ContentRsv">.*?</form>\s*</div>', reserve, re.S
+    ).group(0)
+    head, tail = lent.rsplit("</div>\n</body>", 1)
+    return f"{head}{pane}\n</div>\n</body>{tail}"
+
+
+NAKANO_NAV = (
+    '<div id="nav"><a href="/nakano/lent.do">●貸出中一覧</a>'
+    '<a href="/nakano/rsv.do">●予約中一覧</a></div>'
+)
+SUGINAMI_NAV = (
+    '<div id="nav">'
+    '<a href="/suginami/lent" title="あなたが現在借りている資料です">貸出状況</a>'
+    '<a href="/suginami/reserve" title="あなたが現在予約している資料です">予約状況</a>'
+    "</div>"
+)
+
+# ログイン画面
+LOGIN_PAGES = {
+    "minato": _page(
+        "ログイン",
+        '<form method="post" action="/minato/WOpacSmtLoginAction.do">'
+        '<label for="usrid">利用者番号</label><input type="text" id="usrid" name="usrid">'
+        '<label for="passwd">パスワード</label>'
+        '<input type="password" id="passwd" name="passwd">'
+        '<input type="submit" value="ログイン"></form>',
+    ),
+    "nakano": _page(
+        "利用者メニュー",
+        '<form method="post" action="/nakano/login.do">'
+        '<label for="usrcardnumber">利用者番号</label>'
+        '<input type="text" id="usrcardnumber" name="usrcardnumber">'
+        '<label for="password">パスワード</label>'
+        '<input type="password" id="password" name="password">'
+        '<input type="submit" name="login" value="ログインする"></form>',
+    ),
+    "nerima": _page(
+        "利用者ログイン",
+        '<form method="post" action="/nerima/login">'
+        '<input type="text" name="userid" placeholder="利用者ID">'
+        '<input type="password" name="password" placeholder="パスワード">'
+        '<button type="submit">送信</button></form>',
+    ),
+    "suginami": _page(
+        "ログイン",
+        '<form method="post" action="/suginami/login">'
+        '<label for="card">図書館利用カード番号</label>'
+        '<input type="text" id="card" name="card">'
+        '<label for="pw">パスワード</label><input type="password" id="pw" name="pw">'
+        '<button type="submit">ログイン</button></form>',
+    ),
+}
+
+# ログイン後に遷移する画面
+AFTER_LOGIN = {
+    "minato": "/minato/WOpacSmtMyLibLentListAction.do",
+    "nakano": "/nakano/usermenu.do",
+    "nerima": "/nerima/mypage",
+    "suginami": "/suginami/mypage",
+}
+
+# ログイン前に表示できる画面
+PUBLIC_PAGES: Dict[str, Callable[[], str]] = {
+    "/minato/WOpacSmtMnuTopAction.do": lambda: _page(
+        "港区立図書館",
+        '<a href="#menu" aria-label="マイ図書館メニューを開きます">≡</a>'
+        '<nav id="menu"><a href="WOpacSmtLoginAction.do">ログイン</a></nav>',
+    ),
+    "/minato/WOpacSmtLoginAction.do": lambda: LOGIN_PAGES["minato"],
+    "/nerima/": lambda: _page(
+        "練馬区立図書館", '<a href="/nerima/login">利用者ログイン</a>'
+    ),
+    "/nerima/login": lambda: LOGIN_PAGES["nerima"],
+    "/suginami/": lambda: _page(
+        "杉並区立図書館",
+        '<header role="banner"><a href="/suginami/login-top">利用者ログイン</a></header>',
+    ),
+    "/suginami/login-top": lambda: _page(
+        "利用者ログイン",
+        '<form method="get" action="/suginami/login">'
+        '<button type="submit">ログイン</button></form>',
+    ),
+    "/suginami/login": lambda: LOGIN_PAGES["suginami"],
+}
+
+# ログインが必要な画面
+PRIVATE_PAGES: Dict[str, Callable[[], str]] = {
+    "/minato/WOpacSmtMyLibLentListAction.do": lambda: _fixture("minato", "lent"),
+    "/minato/WOpacSmtMyLibResvListAction.do": lambda: _fixture("minato", "reserve"),
+    "/nakano/usermenu.do": lambda: _page("利用者メニュー", NAKANO_NAV),
+    "/nakano/lent.do": lambda: _with_nav(_fixture("nakano", "lent"), NAKANO_NAV),
+    "/nakano/rsv.do": lambda: _with_nav(_fixture("nakano", "reserve"), NAKANO_NAV),
+    "/nerima/mypage": _nerima_mypage,
+    "/suginami/mypage": lambda: _page("マイページ", SUGINAMI_NAV),
+    "/suginami/lent": lambda: _with_nav(_fixture("suginami", "lent"), SUGINAMI_NAV),
+    "/suginami/reserve": lambda: _with_nav(
+        _fixture("suginami", "reserve"), SUGINAMI_NAV
+    ),
+}
+
+LOGIN_ACTIONS = {
+    "/minato/WOpacSmtLoginAction.do": "minato",
+    "/nakano/login.do": "nakano",
+    "/nerima/login": "nerima",
+    "/suginami/login": "suginami",
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "MockOpacServer"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _session(self) -> Optional[str]:
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        token = cookie.get("MOCKSESSION")
+        if token is not None and token.value in self.server.sessions:
+            return token.value
+        return None
+
+    def _send(self, status: int, body: str = "", headers: Dict[str, str] = None):
+        time.sleep(self.server.latency)
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        self.server.request_count += 1
+        path = urlparse(self.path).path
+
+        if path in PRIVATE_PAGES:
+            if self._session():
+                return self._send(200, PRIVATE_PAGES[path]())
+            # 中野は未ログインの場合、利用者メニューにログインフォームを表示する
+            if path == "/nakano/usermenu.do":
+                return self._send(200, LOGIN_PAGES["nakano"])
+            area = path.split("/")[1]
+            return self._send(302, headers={"Location": ENTRY_PATHS[area]})
+        if path in PUBLIC_PAGES:
+            return self._send(200, PUBLIC_PAGES[path]())
+        return self._send(404, _page("Not Found", "Not Found"))
+
+    def do_POST(self) -> None:
+        self.server.request_count += 1
+        path = urlparse(self.path).path
+        length = int(self.headers.get("Content-Length", 0))
+        fields = parse_qs(self.rfile.read(length).decode("utf-8"))
+
+        area = LOGIN_ACTIONS.get(path)
+        if area is None:
+            return self._send(404, _page("Not Found", "Not Found"))
+        self.server.login_attempts += 1
+        # 誤ったパスワードの場合は、ログインせずにログイン画面を表示し直す
+        if any(WRONG_PASSWORD in values for values in fields.values()):
+            return self._send(200, LOGIN_PAGES[area])
+
+        token = secrets.token_hex(16)
+        self.server.sessions.add(token)
+        return self._send(
+            302,
+            headers={
+                "Location": AFTER_LOGIN[area],
+                "Set-Cookie": f"MOCKSESSION={token}; Path=/",
+            },
+        )
+
+
+class MockOpacServer(ThreadingHTTPServer):
+    """
+    別スレッドで起動できるモック OPAC サーバ。
+
+    Args:
+        port: 待ち受けポート（0 の場合は空きポート）。
+        latency: 各レスポンスに加える遅延（秒）。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0) -> None:
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency: float = latency
+        self.sessions = set()
+        self.request_count: int = 0
+        self.login_attempts: int = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def entry_url(self, area: str) -> str:
+        """区ごとのリーダーの URL に設定する入口 URL"""
+        return self.base_url + ENTRY_PATHS[area]
+
+    def start(self) -> "MockOpacServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="遅延（ミリ秒）")
+    args = parser.parse_args()
+
+    server = MockOpacServer(args.port, args.latency / 1000)
+    for area in ENTRY_PATHS:
+        print(f"{area}: {server.entry_url(area)}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,54 @@
-from dataclasses import asdict
-from minato import MinatoLibraryReader
-from nerima import NerimaLibraryReader
-from suginami import (
-    SuginamiLibraryReader,
-)
-from nakano import NakanoLibraryReader
+import json
+
+from history import history_store_from_env
+from metrics import metrics_callback_from_env
+from resilience import CircuitOpenError, LoginError
+from result_cache import BYPASS, MISS, REFRESHED, result_cache_from_env
+from session_cache import session_cache_from_env
+from registry import get_reader
+from snapshot import snapshot_store_from_env
+
+# ウォームコンテナ間で共有するセッションキャッシュ（環境変数未設定なら無効）
+SESSION_CACHE = session_cache_from_env()
+# 取得ごとの計測結果の出力先（METRICS_NAMESPACE 指定時は EMF）
+METRICS_CALLBACK = metrics_callback_from_env()
+# 取得結果のキャッシュ（環境変数未設定なら無効）
+RESULT_CACHE = result_cache_from_env()
+# 差分取得（delta 指定時）に使う前回のスナップショット
+SNAPSHOTS = snapshot_store_from_env()
+# 取得ごとの貸出中・予約中一覧の履歴（HISTORY_PATH 未設定なら保存しない）
+HISTORY = history_store_from_env()
+
+
+def iter_ndjson(lib_reader):
+    """
+    1回のログインで取得した貸出中・予約中の資料を、解析した順に NDJSON の1行ずつ返す。
+    - 各行は {"type": "lent" | "reserve", "item": {...}}
+    - 最後の行は {"type": "end", "metrics": {...}}、取得途中で失敗した場合は
+      {"type": "error", "error": "..."}（それまでに返した行は有効）
+    - 区の OPAC が停止中の場合は、1行目を返す前に CircuitOpenError を送出する
+    レスポンスストリーミングに対応した実行環境では、このジェネレータをそのまま流せる。
+    """
+    try:
+        for kind, item in lib_reader.iter_all():
+            line = {"type": kind, "item": item.to_dict()}
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        error = {"type": "error", "error": f"{type(e).__name__}: {e}"}
+        yield json.dumps(error, ensure_ascii=False) + "\n"
+        return
+    end = {"type": "end", "metrics": lib_reader.metrics.as_dict()}
+    yield json.dumps(end, ensure_ascii=False) + "\n"
+
+
+def _unavailable(e: CircuitOpenError):
+    return {
+        "statusCode": 503,
+        "headers": {"Retry-After": str(int(e.retry_after))},
+        "body": {"error": str(e), "retry_after": int(e.retry_after)},
+    }
 
 
 def lambda_handler(event, context):
@@ -13,23 +57,87 @@ def lambda_handler(event, context):
     area = param["area"]
     userid = param["userid"]
     password = param["password"]
+    force_refresh = param.get("force_refresh", "").lower() in ("1", "true")
+    # delta 指定時は前回（consumer ごと）からの差分だけを返す
+    delta = param.get("delta", "").lower() in ("1", "true")
+    consumer = param.get("consumer", "default")
+    # format=ndjson の場合は取得結果キャッシュ・差分を使わず、解析した順に1行ずつ返す
+    ndjson = param.get("format", "").lower() == "ndjson"
+
+    # リーダーを設定（要求された区のモジュールだけをその時点で読み込む）
+    try:
+        reader_cls = get_reader(area)
+    except ValueError as e:
+        # 未対応・綴り違いの区は呼び出し側の誤りとして返す
+        return {"statusCode": 400, "body": {"error": str(e)}}
+    lib_reader = reader_cls(
+        userid, password, session_cache=SESSION_CACHE, metrics_callback=METRICS_CALLBACK
+    )
 
-    # リーダーを設定
-    if area == "suginami":
-        lib_reader = SuginamiLibraryReader(userid, password)
-    elif area == "minato":
-        lib_reader = MinatoLibraryReader(userid, password)
-    elif area == "nerima":
-        lib_reader = NerimaLibraryReader(userid, password)
-    elif area == "nakano":
-        lib_reader = NakanoLibraryReader(userid, password)
-    else:
-        raise Exception
+    if ndjson:
+        lines = iter_ndjson(lib_reader)
+        try:
+            first = next(lines, "")
+        except CircuitOpenError as e:
+            return _unavailable(e)
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/x-ndjson"},
+            "body": first + "".join(lines),
+        }
 
     # 取得結果を受け取る
+    # 1回のログインで貸出中・予約中の両方を取得する
+    def load():
+        lent_items, reserve_items = lib_reader.fetch_all()
+        if HISTORY is not None:
+            HISTORY.append(area, userid, lent_items, reserve_items)
+        return {
+            "lent_items": [_.to_dict() for _ in lent_items],
+            "reserve_items": [_.to_dict() for _ in reserve_items],
+        }
+
+    # OPAC が停止中・メンテナンス中の場合は、キャッシュがあればそれを返し、無ければすぐに 503 を返す
+    try:
+        if RESULT_CACHE is None:
+            contents, cache_status = load(), None
+        else:
+            contents, cache_status = RESULT_CACHE.fetch(
+                area,
+                userid,
+                password,
+                load,
+                force_refresh=force_refresh,
+                ttl=reader_cls.CACHE_TTL,
+                fallback_errors=(CircuitOpenError,),
+            )
+    except CircuitOpenError as e:
+        return _unavailable(e)
+    except LoginError as e:
+        # 利用者番号・パスワードの誤りは再試行しても変わらないので、呼び出し側の誤りとして返す
+        return {"statusCode": 401, "body": {"error": str(e)}}
+    if delta:
+        changes = SNAPSHOTS.diff_and_save(
+            area,
+            userid,
+            contents["lent_items"],
+            contents["reserve_items"],
+            consumer=consumer,
+        )
+        contents = {
+            "changes": {
+                "previous_at": changes["previous_at"],
+                "lent": changes["lent"].to_dict(),
+                "reserve": changes["reserve"].to_dict(),
+            }
+        }
+
+    # キャッシュを返した場合は取得処理をしていないので計測結果は無い
+    fetched = cache_status in (None, MISS, REFRESHED, BYPASS)
     contents = {
-        "lent_items": [asdict(_) for _ in lib_reader.lent],
-        "reserve_items": [asdict(_) for _ in lib_reader.reserve],
+        **contents,
+        "cache": cache_status,
+        "metrics": lib_reader.metrics.as_dict() if fetched else None,
     }
 
     # lambdaのresponseはjson.dumps()されているのでdictをそのまま渡す
@@ -37,3 +145,46 @@ def lambda_handler(event, context):
         "statusCode": 200,
         "body": contents,
     }
+
+
+async def _run_batch(accounts):
+    from batch import fetch_batch
+    from browser_pool import get_async_browser_pool
+
+    # asyncio.run ごとにイベントループが変わるため、共有ブラウザは実行後に閉じる
+    try:
+        return await fetch_batch(
+            accounts, session_cache=SESSION_CACHE, metrics_callback=METRICS_CALLBACK
+        )
+    finally:
+        await get_async_browser_pool().close()
+
+
+def batch_handler(event, context):
+    """
+    複数アカウントをまとめて取得するエントリポイント。
+    event["accounts"] に {"area", "userid", "password"} の一覧を渡す。
+    """
+    import asyncio
+
+    results = asyncio.run(_run_batch(event.get("accounts", [])))
+
+    # アカウントごとに結果またはエラーを返す
+    contents = {
+        "results": [
+            {
+                "area": r.area,
+                "userid": r.userid,
+                "lent_items": [_.to_dict() for _ in r.lent_items],
+                "reserve_items": [_.to_dict() for _ in r.reserve_items],
+                "error": r.error,
+                "metrics": r.metrics,
+            }
+            for r in results
+        ]
+    }
+
+    return {
+        "statusCode": 200,
+        "body": contents,
+    }
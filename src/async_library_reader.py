@@ -0,0 +1,520 @@
+from __future__ import annotations
+
+import logging
+import re
+from abc import ABC, abstractmethod
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from browser_pool import get_async_browser_pool
+from html_dom import HtmlDocument
+from http_engine import HttpClient
+from library_reader import HTTP_FALLBACK_ERRORS, BaseLibraryReader, TaggedItem
+from metrics import Metrics
+from model import LentItem, ReserveItem
+from registry import register_async
+from resilience import LoginError
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Locator, Page
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBaseLibraryReader(ABC):
+    """
+    BaseLibraryReader の asyncio 版。共有ブラウザ上に区ごとの BrowserContext を作って取得する。
+    - ログイン・画面遷移はサブクラスで async に実装（一覧は非同期ジェネレータで順に返す）
+    - 区ごとの設定（URL・セレクタ等）・解析処理・HTTP エンジンは SYNC_READER の同期版と共有する
+    - browser を省略した場合はイベントループ共有の AsyncBrowserPool を使う
+    - 計測結果（metrics）・コールバック・再試行方針・サーキットブレーカーも同期版のものを使う
+    """
+
+    # 設定・HTTP エンジンを共有する同期版リーダー
+    SYNC_READER: Type[BaseLibraryReader]
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if "SYNC_READER" in cls.__dict__:
+            register_async(cls)
+
+    def __init__(self, user: str, password: str, **kwargs) -> None:
+        self._sync: BaseLibraryReader = self.SYNC_READER(user, password, **kwargs)
+
+    def __getattr__(self, name: str):
+        if name == "_sync":
+            raise AttributeError(name)
+        return getattr(self._sync, name)
+
+    # -------------------------
+    # サブクラスで必須実装
+    # -------------------------
+    @abstractmethod
+    async def _login(self, context: BrowserContext) -> Page:
+        """ログイン処理を実装する（ログイン後の画面の表示・成否の確認は _log_in が行う）"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _open_lent(self, page: Page) -> None:
+        """ログイン後の画面から貸出中一覧へ遷移する（読み込みの完了は待たなくてよい）"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _read_lent(self, page: Page) -> AsyncIterator[LentItem]:
+        """貸出中一覧のスクレイピング処理。複数ページの場合は _pages でたどる"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _open_reserve(self, page: Page) -> None:
+        """ログイン後の画面から予約中一覧へ遷移する（読み込みの完了は待たなくてよい）"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _read_reserve(self, page: Page) -> AsyncIterator[ReserveItem]:
+        """予約中一覧のスクレイピング処理。複数ページの場合は _pages でたどる"""
+        raise NotImplementedError
+
+    # -------------------------
+    # 共通ユーティリティ
+    # -------------------------
+    async def _between_tabs(self, page: Page) -> None:
+        """貸出中一覧から予約中一覧へ移る前の画面遷移（必要なサブクラスのみ上書き）"""
+
+    async def _log_in(self, context: BrowserContext) -> Page:
+        """BaseLibraryReader._log_in の asyncio 版"""
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        page = await self._login(context)
+        try:
+            await page.locator(self.LOGGED_IN_SELECTOR).first.wait_for(
+                timeout=self.wait_timeout
+            )
+        except PlaywrightTimeoutError:
+            if await page.locator('input[type="password"]').first.is_visible():
+                raise LoginError(f"{self.AREA}: ログインに失敗しました: {page.url}")
+            raise
+        return page
+
+    async def _wait_for_rows(self, page: Page, rows_selector: str) -> bool:
+        """BaseLibraryReader._wait_for_rows の asyncio 版"""
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        rows = page.locator(rows_selector)
+        target = rows
+        if self.EMPTY_SELECTOR:
+            target = rows.or_(page.locator(self.EMPTY_SELECTOR))
+        try:
+            await target.first.wait_for(timeout=self.wait_timeout)
+        except PlaywrightTimeoutError:
+            logger.warning(
+                "%s: 一覧の行・空表示が現れないため空として扱います: %s", self.AREA, page.url
+            )
+            return False
+        return await rows.count() > 0
+
+    def _next_page(self, page: Page, pager: Optional[str] = None) -> Locator:
+        """BaseLibraryReader._next_page の asyncio 版"""
+        root = page.locator(pager) if pager else page
+        name = re.compile("|".join(map(re.escape, self.NEXT_PAGE_NAMES)))
+        return (
+            root.get_by_role("link", name=name)
+            .or_(root.get_by_role("button", name=name))
+            .first
+        )
+
+    async def _pages(
+        self,
+        page: Page,
+        rows_selector: str,
+        read: Callable[[Page], Awaitable[R]],
+        pager: Optional[str] = None,
+    ) -> AsyncIterator[R]:
+        """BaseLibraryReader._pages の asyncio 版"""
+        for number in range(1, self.MAX_PAGES + 1):
+            if not await self._wait_for_rows(page, rows_selector):
+                return
+            rows = await read(page)
+            next_page = self._next_page(page, pager)
+            has_next = await next_page.count() > 0
+            if has_next and number == self.MAX_PAGES:
+                logger.warning(
+                    "%s: %d ページを超えたため以降は取得しません", self.AREA, number
+                )
+                has_next = False
+            if has_next:
+                async with page.expect_navigation(wait_until="commit"):
+                    await next_page.click()
+            yield rows
+            if not has_next:
+                return
+
+    async def _retry(
+        self,
+        phase: str,
+        func: Callable[[], Awaitable[T]],
+        on_retry: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> T:
+        """BaseLibraryReader._retry の asyncio 版"""
+
+        async def before_retry(retry: int, exc: BaseException) -> None:
+            self.metrics.retries += 1
+            logger.warning(
+                "%s: %s に失敗したため再試行します（%d回目）: %s",
+                self.AREA,
+                phase,
+                retry,
+                exc,
+            )
+            if on_retry is not None:
+                await on_retry()
+
+        return await self.retry_policy.call_async(func, before_retry)
+
+    @asynccontextmanager
+    async def _new_context(
+        self, browser: Optional[Browser], **kwargs
+    ) -> AsyncIterator[BrowserContext]:
+        """指定のブラウザ、または共有ブラウザから新しいコンテキストを払い出す"""
+        if browser is None:
+            async with get_async_browser_pool().new_context(**kwargs) as context:
+                yield context
+            return
+
+        context = await browser.new_context(**kwargs)
+        try:
+            yield context
+        finally:
+            await context.close()
+
+    @asynccontextmanager
+    async def _browser_session(
+        self, browser: Optional[Browser]
+    ) -> AsyncIterator[Tuple[BrowserContext, Page]]:
+        """新しいコンテキストでログインし、コンテキストとページを渡す"""
+        cached = (
+            self.session_cache.get(self.AREA, self.card, self.password)
+            if self.session_cache
+            else None
+        )
+        storage_state = cached["storage_state"] if cached else None
+        self.metrics.engine = "playwright"
+
+        async with AsyncExitStack() as stack:
+            with self.metrics.span("browser"):
+                context = await stack.enter_async_context(
+                    self._new_context(browser, storage_state=storage_state)
+                )
+            context.on("response", self.metrics.on_browser_response)
+            if self.block_resources:
+                await self._route_policy().install_async(context)
+
+            async def login() -> Page:
+                page = (
+                    await self._restore_session(context, cached["url"])
+                    if cached
+                    else None
+                )
+                if page is None:
+                    await context.clear_cookies()
+                    page = await self._log_in(context)
+                    # ログイン後の画面の表示を確かめてから保存する（同期版と同じ）
+                    if self.session_cache:
+                        self.session_cache.put(
+                            self.AREA,
+                            self.card,
+                            self.password,
+                            await context.storage_state(),
+                            page.url,
+                        )
+                return page
+
+            with self.metrics.span("login"):
+                page = await self._retry(
+                    "login", login, lambda: self._close_pages(context)
+                )
+            yield context, page
+
+    async def _with_login(
+        self, browser: Optional[Browser], action: Callable[[Page], Awaitable[T]]
+    ) -> T:
+        """新しいコンテキストでログイン後、指定の処理を実行して結果を返す"""
+        async with self._browser_session(browser) as (context, page):
+            landing_url = page.url
+
+            async def navigate() -> T:
+                nonlocal page
+                # 再試行時は、同じコンテキストでログイン後の画面を開き直してからやり直す
+                if page.is_closed():
+                    page = await self._restore_session(
+                        context, landing_url
+                    ) or await self._log_in(context)
+                return await action(page)
+
+            with self.metrics.span("navigation"):
+                return await self._retry(
+                    "navigation", navigate, lambda: self._close_pages(context)
+                )
+
+    async def _iter_with_login(
+        self, browser: Optional[Browser], action: Callable[[Page], AsyncIterator[T]]
+    ) -> AsyncIterator[T]:
+        """_with_login の非同期ジェネレータ版（返し始めた後は再試行しない）"""
+        async with self._browser_session(browser) as (_, page):
+            with self.metrics.span("navigation"):
+                async for item in action(page):
+                    yield item
+
+    @staticmethod
+    async def _close_pages(context: BrowserContext) -> None:
+        for page in context.pages:
+            await page.close()
+
+    async def _restore_session(
+        self, context: BrowserContext, url: str
+    ) -> Optional[Page]:
+        """BaseLibraryReader._restore_session の asyncio 版"""
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        page: Page = await context.new_page()
+        await page.goto(url)
+        try:
+            await page.locator(self.LOGGED_IN_SELECTOR).first.wait_for(
+                timeout=self.RESTORE_TIMEOUT
+            )
+        except PlaywrightTimeoutError:
+            await page.close()
+            return None
+        return page
+
+    async def _run(
+        self,
+        browser: Optional[Browser],
+        action: Callable[[Page], Awaitable[T]],
+        http_action: Callable[[HttpClient, HtmlDocument], T],
+    ) -> T:
+        """
+        選択されたエンジンで取得する。
+        HTTP エンジンは別スレッドで実行し、画面構造の不一致で失敗した場合は Playwright で取得し直す。
+        サーキットブレーカーが開いている場合はアクセスせずに CircuitOpenError を送出する。
+        """
+        self.circuit_breaker.before_call()
+        self._sync.metrics = Metrics(self.AREA, self.engine)
+        try:
+            result = await self._fetch(browser, action, http_action)
+        except Exception as e:
+            self.circuit_breaker.record_failure(e)
+            raise
+        except BaseException:
+            # タスクの取り消し等で中断された場合も、試しのアクセスを終わらせる
+            self.circuit_breaker.record_abandoned(produced=False)
+            raise
+        else:
+            self.circuit_breaker.record_success()
+            return result
+        finally:
+            self._sync._emit_metrics()
+
+    async def _stream(
+        self,
+        browser: Optional[Browser],
+        action: Callable[[Page], AsyncIterator[T]],
+        http_action: Callable[[HttpClient, HtmlDocument], Iterator[T]],
+    ) -> AsyncIterator[T]:
+        """
+        BaseLibraryReader._stream の asyncio 版。
+        HTTP エンジンは同期版のジェネレータを別スレッドで1件ずつ進める。
+        """
+        self.circuit_breaker.before_call()
+        self._sync.metrics = Metrics(self.AREA, self.engine)
+        started = False
+        try:
+            if self.engine == "http":
+                try:
+                    async for item in self._iter_in_thread(
+                        self._sync._iter_with_http_login(http_action)
+                    ):
+                        started = True
+                        with self.metrics.paused():
+                            yield item
+                    self.circuit_breaker.record_success()
+                    return
+                except HTTP_FALLBACK_ERRORS:
+                    if started:
+                        raise
+                    logger.warning(
+                        "%s: HTTP エンジンでの取得に失敗したため Playwright で再取得します",
+                        self.AREA,
+                        exc_info=True,
+                    )
+            async for item in self._iter_with_login(browser, action):
+                started = True
+                with self.metrics.paused():
+                    yield item
+        except Exception as e:
+            self.circuit_breaker.record_failure(e)
+            raise
+        except BaseException:
+            # 途中で閉じられた（GeneratorExit）・取り消された場合も、試しのアクセスを終わらせる
+            self.circuit_breaker.record_abandoned(produced=started)
+            raise
+        else:
+            self.circuit_breaker.record_success()
+        finally:
+            self._sync._emit_metrics()
+
+    @staticmethod
+    async def _iter_in_thread(iterator: Iterator[T]) -> AsyncIterator[T]:
+        """同期のイテレータを別スレッドで1件ずつ進め、イベントループを止めずに返す"""
+        import asyncio
+
+        done = object()
+        try:
+            while True:
+                item = await asyncio.to_thread(next, iterator, done)
+                if item is done:
+                    return
+                yield item
+        finally:
+            await asyncio.to_thread(iterator.close)
+
+    async def _fetch(
+        self,
+        browser: Optional[Browser],
+        action: Callable[[Page], Awaitable[T]],
+        http_action: Callable[[HttpClient, HtmlDocument], T],
+    ) -> T:
+        import asyncio
+
+        if self.engine == "http":
+            try:
+                return await asyncio.to_thread(self._sync._with_http_login, http_action)
+            except HTTP_FALLBACK_ERRORS:
+                # 画面構造の不一致だけを取り直す（BaseLibraryReader._fetch と同じ）
+                logger.warning(
+                    "%s: HTTP エンジンでの取得に失敗したため Playwright で再取得します",
+                    self.AREA,
+                    exc_info=True,
+                )
+        return await self._with_login(browser, action)
+
+    async def _iter_lent(self, page: Page) -> AsyncIterator[LentItem]:
+        await self._open_lent(page)
+        async for item in self._read_lent(page):
+            yield item
+
+    async def _iter_reserve(self, page: Page) -> AsyncIterator[ReserveItem]:
+        await self._open_reserve(page)
+        async for item in self._read_reserve(page):
+            yield item
+
+    async def _parse_lent(self, page: Page) -> List[LentItem]:
+        return [item async for item in self._iter_lent(page)]
+
+    async def _parse_reserve(self, page: Page) -> List[ReserveItem]:
+        return [item async for item in self._iter_reserve(page)]
+
+    async def _read_reserve_in_new_page(
+        self, page: Page, landing_url: str
+    ) -> Optional[List[ReserveItem]]:
+        """
+        同じコンテキストに2つ目のページを開き、予約中一覧を取得する。
+        ログイン後の画面を URL で開き直せない場合（POST の結果画面等）や、取得の途中で失敗した
+        場合は None（呼び出し側は同じページで順に取得する）
+        """
+        other: Optional[Page] = None
+        try:
+            other = await self._restore_session(page.context, landing_url)
+            if other is None:
+                return None
+            await self._open_reserve(other)
+            return [item async for item in self._read_reserve(other)]
+        except Exception:
+            logger.warning(
+                "%s: 2つ目のページを開けないため、順に取得します", self.AREA, exc_info=True
+            )
+            return None
+        finally:
+            if other is not None:
+                await other.close()
+
+    async def _iter_all(self, page: Page) -> AsyncIterator[TaggedItem]:
+        """
+        BaseLibraryReader._iter_all の asyncio 版。
+        PARALLEL_TABS の区は、予約中一覧を2つ目のページで貸出中一覧と同時に取得する。
+        """
+        import asyncio
+
+        reserve_task = (
+            asyncio.create_task(self._read_reserve_in_new_page(page, page.url))
+            if self.PARALLEL_TABS
+            else None
+        )
+        try:
+            async for item in self._iter_lent(page):
+                yield "lent", item
+            reserve_items = await reserve_task if reserve_task else None
+            if reserve_items is None:
+                await self._between_tabs(page)
+                async for item in self._iter_reserve(page):
+                    yield "reserve", item
+                return
+            for item in reserve_items:
+                yield "reserve", item
+        finally:
+            if reserve_task is not None and not reserve_task.done():
+                reserve_task.cancel()
+
+    async def _parse_all(self, page: Page) -> Tuple[List[LentItem], List[ReserveItem]]:
+        """1回のログインで貸出中・予約中一覧を取得する"""
+        lent_items: List[LentItem] = []
+        reserve_items: List[ReserveItem] = []
+        async for kind, item in self._iter_all(page):
+            (lent_items if kind == "lent" else reserve_items).append(item)
+        return lent_items, reserve_items
+
+    # -------------------------
+    # 公開メソッド
+    # -------------------------
+    async def lent(self, browser: Optional[Browser] = None) -> List[LentItem]:
+        """現在貸出中の資料一覧を取得"""
+        return await self._run(browser, self._parse_lent, self._sync._http_parse_lent)
+
+    async def reserve(self, browser: Optional[Browser] = None) -> List[ReserveItem]:
+        """現在予約中の資料一覧を取得"""
+        return await self._run(
+            browser, self._parse_reserve, self._sync._http_parse_reserve
+        )
+
+    async def fetch_all(
+        self, browser: Optional[Browser] = None
+    ) -> Tuple[List[LentItem], List[ReserveItem]]:
+        """1回のログインで貸出中・予約中の資料一覧をまとめて取得"""
+        return await self._run(browser, self._parse_all, self._sync._http_parse_all)
+
+    def iter_lent(self, browser: Optional[Browser] = None) -> AsyncIterator[LentItem]:
+        """貸出中の資料を解析した順に返す（全件の取得を待たずに処理を始められる）"""
+        return self._stream(browser, self._iter_lent, self._sync._http_iter_lent)
+
+    def iter_reserve(
+        self, browser: Optional[Browser] = None
+    ) -> AsyncIterator[ReserveItem]:
+        """予約中の資料を解析した順に返す"""
+        return self._stream(browser, self._iter_reserve, self._sync._http_iter_reserve)
+
+    def iter_all(self, browser: Optional[Browser] = None) -> AsyncIterator[TaggedItem]:
+        """1回のログインで貸出中・予約中の資料を ("lent" / "reserve", アイテム) の順に返す"""
+        return self._stream(browser, self._iter_all, self._sync._http_iter_all)
@@ -0,0 +1,77 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from model import LentItem, ReserveItem
+from registry import get_async_reader
+
+
+@dataclass
+class BatchResult:
+    """
+    1アカウント分の取得結果。
+
+    Attributes:
+        area (str): 区の識別子。
+        userid (str): 利用者番号。
+        lent_items (List[LentItem]): 貸出中の資料一覧。
+        reserve_items (List[ReserveItem]): 予約中の資料一覧。
+        error (Optional[str]): 取得に失敗した場合のエラー内容。
+        metrics (Optional[Dict[str, Any]]): フェーズごとの所要時間・通信量。
+    """
+
+    area: str
+    userid: str
+    lent_items: List[LentItem] = field(default_factory=list)
+    reserve_items: List[ReserveItem] = field(default_factory=list)
+    error: Optional[str] = field(default=None)
+    metrics: Optional[Dict[str, Any]] = field(default=None)
+
+
+async def fetch_batch(
+    accounts: List[Dict[str, str]],
+    concurrency: Optional[Dict[str, int]] = None,
+    **reader_kwargs,
+) -> List[BatchResult]:
+    """
+    複数アカウントの貸出中・予約中一覧を、イベントループ共有のブラウザで並行取得する。
+    - 区ごとの同時アクセス数は concurrency（未指定なら各リーダーの MAX_CONCURRENCY）で制限
+    - 失敗したアカウント（未対応の区・項目の欠けたアカウントを含む）は error に内容を入れて
+      返し、他のアカウントの取得は続ける
+
+    Args:
+        accounts: {"area", "userid", "password"} の一覧。
+        concurrency: 区ごとの同時アクセス数の上限。
+        reader_kwargs: 各リーダーにそのまま渡す引数（session_cache 等）。
+
+    Returns:
+        accounts と同じ順序の取得結果。
+    """
+    concurrency = concurrency or {}
+    # 区ごとのセマフォは、その区のリーダーを読み込んだ時点で作る
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def fetch_one(account: Dict[str, str]) -> BatchResult:
+        area = account.get("area")
+        result = BatchResult(area=area, userid=account.get("userid"))
+        # 未対応の区・項目の欠けたアカウント・リーダーの読み込み失敗等も、そのアカウントの
+        # エラーとして返す（gather 全体を止めない）
+        try:
+            reader_cls = get_async_reader(area)
+            reader = reader_cls(account["userid"], account["password"], **reader_kwargs)
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+            return result
+
+        if area not in semaphores:
+            limit = concurrency.get(area, reader_cls.SYNC_READER.MAX_CONCURRENCY)
+            semaphores[area] = asyncio.Semaphore(limit)
+        async with semaphores[area]:
+            try:
+                result.lent_items, result.reserve_items = await reader.fetch_all()
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+        result.metrics = reader.metrics.as_dict()
+        return result
+
+    return list(await asyncio.gather(*(fetch_one(a) for a in accounts)))
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import os
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, Optional
+
+from launch_profile import LaunchProfile, launch_profile_from_env
+
+# playwright（と asyncio）は import に時間がかかるため、ブラウザを起動する時点で読み込む
+if TYPE_CHECKING:
+    import asyncio
+
+    from playwright.async_api import Browser as AsyncBrowser
+    from playwright.async_api import BrowserContext as AsyncBrowserContext
+    from playwright.async_api import Playwright as AsyncPlaywright
+    from playwright.sync_api._generated import Browser, BrowserContext, Playwright
+
+
+def create_browser(
+    playwright: Playwright, profile: Optional[LaunchProfile] = None
+) -> Browser:
+    """
+    Playwright ブラウザを起動する共通関数。
+    profile 未指定の場合は BROWSER_PROFILE で選んだ起動プロファイル（既定は default）を使う。
+    """
+    profile = profile or launch_profile_from_env()
+    if profile.cache_dir is not None:
+        os.makedirs(profile.cache_dir, exist_ok=True)
+    return playwright.chromium.launch(**profile.launch_options())
+
+
+class BrowserPool:
+    """
+    Lambda のウォームコンテナ内で Playwright ドライバと Browser を使い回すマネージャ。
+    - リクエストごとに新しい BrowserContext だけを払い出す
+    - ブラウザがクラッシュしていれば再起動する
+    - 1つのブラウザの再利用回数に上限を設け、上限に達したら起動し直す
+    - keep_alive が False の場合はコンテキストを閉じるたびにブラウザも停止する
+    - profile 未指定の場合は、起動のたびに環境変数から起動プロファイルを選ぶ
+    """
+
+    def __init__(
+        self,
+        max_uses: int = 50,
+        keep_alive: bool = True,
+        profile: Optional[LaunchProfile] = None,
+    ) -> None:
+        self.max_uses: int = max_uses
+        self.keep_alive: bool = keep_alive
+        self.profile: Optional[LaunchProfile] = profile
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._uses: int = 0
+
+    def is_healthy(self) -> bool:
+        """ブラウザが起動済みかつ接続中かどうか"""
+        return self._browser is not None and self._browser.is_connected()
+
+    def get_browser(self) -> Browser:
+        """再利用可能なブラウザを返す。必要に応じて（再）起動する"""
+        if not self.is_healthy() or self._uses >= self.max_uses:
+            self._close_browser()
+            if self._playwright is None:
+                from playwright.sync_api import sync_playwright
+
+                self._playwright = sync_playwright().start()
+            self._browser = create_browser(self._playwright, self.profile)
+            self._uses = 0
+
+        self._uses += 1
+        return self._browser
+
+    @contextmanager
+    def new_context(self, **kwargs) -> Iterator[BrowserContext]:
+        """独立した BrowserContext を払い出し、使用後に閉じる（kwargs は new_context にそのまま渡す）"""
+        try:
+            context = self.get_browser().new_context(**kwargs)
+        except Exception:
+            # 接続が切れていた場合は一度だけ起動し直す
+            self._close_browser()
+            context = self.get_browser().new_context(**kwargs)
+
+        try:
+            yield context
+        finally:
+            try:
+                context.close()
+            except Exception:
+                # ブラウザ側が落ちている場合は次回取得時に再起動させる
+                self._close_browser()
+            if not self.keep_alive:
+                self.close()
+
+    def close(self) -> None:
+        """ブラウザと Playwright ドライバを停止する"""
+        self._close_browser()
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+    def _close_browser(self) -> None:
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        self._uses = 0
+
+
+# コンテナ内で共有するブラウザマネージャ
+_pool: Optional[BrowserPool] = None
+# メインスレッド以外（呼び出し側が作ったスレッド等）のブラウザマネージャ
+_thread_pools = threading.local()
+
+
+def get_browser_pool() -> BrowserPool:
+    """
+    モジュール単位で共有される BrowserPool を返す。
+    sync_api のオブジェクトは作成したスレッドでしか使えないため、メインスレッド以外では
+    スレッドごとに、使い終わったらブラウザを停止する BrowserPool を返す。
+    """
+    global _pool
+    if threading.current_thread() is not threading.main_thread():
+        if not hasattr(_thread_pools, "pool"):
+            _thread_pools.pool = BrowserPool(keep_alive=False)
+        return _thread_pools.pool
+
+    if _pool is None:
+        _pool = BrowserPool()
+    return _pool
+
+
+class AsyncBrowserPool:
+    """
+    BrowserPool の asyncio 版。1つのイベントループ上の複数リーダーで Browser を共有する。
+    - 再利用回数の上限に達しても、使用中のコンテキストがある間は再起動しない
+    - Playwright の async ドライバはイベントループに紐づくため、ループごとに1つ作る
+    """
+
+    def __init__(
+        self, max_uses: int = 50, profile: Optional[LaunchProfile] = None
+    ) -> None:
+        self.max_uses: int = max_uses
+        self.profile: Optional[LaunchProfile] = profile
+        self._playwright: Optional[AsyncPlaywright] = None
+        self._browser: Optional[AsyncBrowser] = None
+        self._uses: int = 0
+        self._active: int = 0
+        import asyncio
+
+        self._lock = asyncio.Lock()
+
+    def is_healthy(self) -> bool:
+        """ブラウザが起動済みかつ接続中かどうか"""
+        return self._browser is not None and self._browser.is_connected()
+
+    async def get_browser(self) -> AsyncBrowser:
+        """再利用可能なブラウザを返す。必要に応じて（再）起動する"""
+        async with self._lock:
+            exhausted = self._uses >= self.max_uses and self._active == 0
+            if not self.is_healthy() or exhausted:
+                await self._close_browser()
+                if self._playwright is None:
+                    from playwright.async_api import async_playwright
+
+                    self._playwright = await async_playwright().start()
+                self._browser = await create_browser(self._playwright, self.profile)
+                self._uses = 0
+
+            self._uses += 1
+            return self._browser
+
+    @asynccontextmanager
+    async def new_context(self, **kwargs) -> AsyncIterator[AsyncBrowserContext]:
+        """独立した BrowserContext を払い出し、使用後に閉じる（kwargs は new_context にそのまま渡す）"""
+        try:
+            context = await (await self.get_browser()).new_context(**kwargs)
+        except Exception:
+            # ブラウザが落ちていた場合だけ一度起動し直す。ブラウザが生きている場合は
+            # 他のアカウントが使用中のため閉じずにそのまま送出する
+            if self.is_healthy():
+                raise
+            async with self._lock:
+                if not self.is_healthy():
+                    await self._close_browser()
+            context = await (await self.get_browser()).new_context(**kwargs)
+
+        self._active += 1
+        try:
+            yield context
+        finally:
+            self._active -= 1
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    async def close(self) -> None:
+        """ブラウザと Playwright ドライバを停止する"""
+        await self._close_browser()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _close_browser(self) -> None:
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        self._uses = 0
+
+
+# イベントループごとに共有するブラウザマネージャ
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncBrowserPool]"
+_async_pools = weakref.WeakKeyDictionary()
+
+
+def get_async_browser_pool() -> AsyncBrowserPool:
+    """実行中のイベントループで共有される AsyncBrowserPool を返す"""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    if loop not in _async_pools:
+        _async_pools[loop] = AsyncBrowserPool()
+    return _async_pools[loop]
@@ -0,0 +1,357 @@
+"""
+取得した貸出中・予約中一覧を履歴として SQLite に蓄積し、集計・書き出しを行うストア。
+- 取得ごとに、資料1件を1行として lent_items / reserve_items に追記する
+- 同じ貸出・予約は loans / holds に1行ずつまとめ、初めて・最後に見た時刻と
+  予約が取置になった日を更新する（集計はこちらの小さな表と索引だけで行う）
+- 利用者番号はハッシュ化した値でのみ保存する
+- 日付が読み取れない貸出・予約は、loans / holds では日付を空文字としてまとめる
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from model import LentItem, ReserveItem, parse_date
+from resilience import JST
+
+Item = Union[LentItem, ReserveItem, Dict[str, Any]]
+
+# 表ごとの列と SQLite の型（書き出し時の型にも使う）
+COLUMNS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "lent_items": (
+        ("fetch_id", "INTEGER"),
+        ("area", "TEXT"),
+        ("card", "TEXT"),
+        ("fetched_at", "REAL"),
+        ("title", "TEXT"),
+        ("category", "TEXT"),
+        ("checkout_location", "TEXT"),
+        ("checkout_date", "TEXT"),
+        ("return_date", "TEXT"),
+        ("reserved_count", "INTEGER"),
+        ("is_reserved", "INTEGER"),
+        ("extend_count", "INTEGER"),
+        ("is_extendable", "INTEGER"),
+    ),
+    "reserve_items": (
+        ("fetch_id", "INTEGER"),
+        ("area", "TEXT"),
+        ("card", "TEXT"),
+        ("fetched_at", "REAL"),
+        ("title", "TEXT"),
+        ("category", "TEXT"),
+        ("receive_location", "TEXT"),
+        ("notification_method", "TEXT"),
+        ("reserve_date", "TEXT"),
+        ("reserve_rank", "TEXT"),
+        ("reserve_status", "TEXT"),
+        ("reserve_cancel_reason", "TEXT"),
+        ("reserve_expire_date", "TEXT"),
+        ("is_canceled", "INTEGER"),
+    ),
+    "loans": (
+        ("area", "TEXT"),
+        ("card", "TEXT"),
+        ("title", "TEXT"),
+        ("checkout_date", "TEXT"),
+        ("category", "TEXT"),
+        ("checkout_location", "TEXT"),
+        ("return_date", "TEXT"),
+        ("extend_count", "INTEGER"),
+        ("first_seen", "REAL"),
+        ("last_seen", "REAL"),
+    ),
+    "holds": (
+        ("area", "TEXT"),
+        ("card", "TEXT"),
+        ("title", "TEXT"),
+        ("reserve_date", "TEXT"),
+        ("category", "TEXT"),
+        ("receive_location", "TEXT"),
+        ("ready_on", "TEXT"),
+        ("is_canceled", "INTEGER"),
+        ("first_seen", "REAL"),
+        ("last_seen", "REAL"),
+    ),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fetches (
+    id INTEGER PRIMARY KEY,
+    area TEXT NOT NULL,
+    card TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lent_items ({lent_items});
+CREATE TABLE IF NOT EXISTS reserve_items ({reserve_items});
+CREATE TABLE IF NOT EXISTS loans (
+    {loans},
+    PRIMARY KEY (area, card, title, checkout_date)
+);
+CREATE TABLE IF NOT EXISTS holds (
+    {holds},
+    PRIMARY KEY (area, card, title, reserve_date)
+);
+CREATE INDEX IF NOT EXISTS fetches_card ON fetches (area, card, fetched_at);
+CREATE INDEX IF NOT EXISTS lent_items_title
+    ON lent_items (area, card, title, checkout_date, return_date);
+CREATE INDEX IF NOT EXISTS lent_items_fetch ON lent_items (fetch_id);
+CREATE INDEX IF NOT EXISTS reserve_items_title
+    ON reserve_items (area, card, title, reserve_date, reserve_expire_date);
+CREATE INDEX IF NOT EXISTS reserve_items_fetch ON reserve_items (fetch_id);
+CREATE INDEX IF NOT EXISTS loans_checkout ON loans (area, card, checkout_date);
+CREATE INDEX IF NOT EXISTS holds_wait
+    ON holds (category, ready_on, reserve_date, area, first_seen);
+CREATE INDEX IF NOT EXISTS holds_reserve ON holds (area, card, reserve_date);
+""".format(
+    **{
+        table: ", ".join(f"{name} {type_}" for name, type_ in columns)
+        for table, columns in COLUMNS.items()
+    }
+)
+
+
+def _as_dict(item: Item) -> Dict[str, Any]:
+    return dict(item) if isinstance(item, dict) else item.to_dict()
+
+
+def _iso(value: Any) -> Optional[str]:
+    """日付（date・YYYY/MM/DD 形式の文字列）を SQLite の日付関数で扱える YYYY-MM-DD にする"""
+    d = parse_date(value)
+    return d.isoformat() if d else None
+
+
+def _since(value: str) -> str:
+    """集計の開始日を YYYY-MM-DD にする。読み取れない場合は ValueError"""
+    d = _iso(value)
+    if d is None:
+        raise ValueError(f"日付を読み取れません: {value!r}")
+    return d
+
+
+def _flag(value: Any) -> Optional[int]:
+    return None if value is None else int(bool(value))
+
+
+class HistoryStore:
+    """
+    貸出中・予約中一覧の履歴を保存する SQLite ストア（EFS 等に置けばコンテナ間で共有できる）。
+    """
+
+    def __init__(self, path: str = "/tmp/library_reader/history.sqlite3") -> None:
+        self.path: str = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 の接続はスレッドをまたいで使えないため、操作ごとに接続する
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _card(area: str, card: str) -> str:
+        return hashlib.sha256(f"{area}:{card}".encode("utf-8")).hexdigest()
+
+    def append(
+        self,
+        area: str,
+        card: str,
+        lent_items: Iterable[Item],
+        reserve_items: Iterable[Item],
+        fetched_at: Optional[float] = None,
+    ) -> int:
+        """1回分の取得結果を追記し、loans / holds を更新する。追記した取得の ID を返す"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        card = self._card(area, card)
+        today = datetime.fromtimestamp(fetched_at, JST).date().isoformat()
+
+        lent_rows = []
+        for i in map(_as_dict, lent_items):
+            lent_rows.append(
+                (
+                    i.get("title"),
+                    i.get("category"),
+                    i.get("checkout_location"),
+                    _iso(i.get("checkout_date")),
+                    _iso(i.get("return_date")),
+                    i.get("reserved_count"),
+                    _flag(i.get("is_reserved")),
+                    i.get("extend_count"),
+                    _flag(i.get("is_extendable")),
+                )
+            )
+        reserve_rows = []
+        for i in map(_as_dict, reserve_items):
+            expire_date = _iso(i.get("reserve_expire_date"))
+            reserve_rows.append(
+                (
+                    i.get("title"),
+                    i.get("category"),
+                    i.get("receive_location"),
+                    i.get("notification_method"),
+                    _iso(i.get("reserve_date")),
+                    i.get("reserve_rank"),
+                    i.get("reserve_status"),
+                    i.get("reserve_cancel_reason"),
+                    expire_date,
+                    _flag(i.get("is_canceled")),
+                    # 取置期限が表示されたら取置になったとみなす
+                    today if expire_date and not i.get("is_canceled") else None,
+                )
+            )
+
+        with self._connect() as conn:
+            fetch_id = conn.execute(
+                "INSERT INTO fetches (area, card, fetched_at) VALUES (?, ?, ?)",
+                (area, card, fetched_at),
+            ).lastrowid
+            head = (fetch_id, area, card, fetched_at)
+            conn.executemany(
+                "INSERT INTO lent_items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [head + row for row in lent_rows],
+            )
+            conn.executemany(
+                "INSERT INTO reserve_items VALUES"
+                " (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [head + row[:-1] for row in reserve_rows],
+            )
+            conn.executemany(
+                """
+                INSERT INTO loans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (area, card, title, checkout_date) DO UPDATE SET
+                    category = COALESCE(excluded.category, category),
+                    return_date = excluded.return_date,
+                    extend_count = excluded.extend_count,
+                    last_seen = excluded.last_seen
+                """,
+                [
+                    (area, card, r[0], r[3] or "", r[1], r[2], r[4], r[7])
+                    + (fetched_at, fetched_at)
+                    for r in lent_rows
+                ],
+            )
+            conn.executemany(
+                """
+                INSERT INTO holds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (area, card, title, reserve_date) DO UPDATE SET
+                    category = COALESCE(excluded.category, category),
+                    receive_location = excluded.receive_location,
+                    ready_on = COALESCE(ready_on, excluded.ready_on),
+                    is_canceled = excluded.is_canceled,
+                    last_seen = excluded.last_seen
+                """,
+                [
+                    (area, card, r[0], r[4] or "", r[1], r[2], r[10], r[9])
+                    + (fetched_at, fetched_at)
+                    for r in reserve_rows
+                ],
+            )
+        return fetch_id
+
+    def hold_wait_by_category(
+        self, area: Optional[str] = None, since: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        取置になった予約の、予約日から取置になるまでの平均日数をカテゴリごとに返す。
+        初めて取得した日（JST）に既に取置になっていた予約は、取置になった日が分からない
+        （ready_on が実際より遅くなる）ため平均に含めず、uncertain_holds に件数だけ数える。
+
+        Args:
+            area: 指定した区の予約だけを集計する。
+            since: この日（YYYY/MM/DD 等）以降に予約したものだけを集計する。
+
+        Raises:
+            ValueError: since を日付として読み取れない場合。
+        """
+        where, params = ["ready_on IS NOT NULL"], []
+        if area is not None:
+            where.append("area = ?")
+            params.append(area)
+        if since is not None:
+            where.append("reserve_date >= ?")
+            params.append(_since(since))
+        sql = f"""
+            SELECT category, SUM(observed) AS holds,
+                AVG(CASE WHEN observed
+                    THEN julianday(ready_on) - julianday(reserve_date) END
+                ) AS avg_wait_days,
+                SUM(NOT observed) AS uncertain_holds
+            FROM (
+                SELECT category, ready_on, reserve_date,
+                    ready_on > date(first_seen, 'unixepoch', '+9 hours') AS observed
+                FROM holds
+                WHERE {" AND ".join(where)}
+            )
+            GROUP BY category ORDER BY category
+        """
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def loans(
+        self, area: str, card: str, since: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        利用者の貸出履歴（同じ貸出は1件）を貸出日の新しい順に返す。
+        since を日付として読み取れない場合は ValueError を送出する。
+        """
+        sql = "SELECT * FROM loans WHERE area = ? AND card = ?"
+        params = [area, self._card(area, card)]
+        if since is not None:
+            sql += " AND checkout_date >= ?"
+            params.append(_since(since))
+        with self._connect() as conn:
+            rows = conn.execute(sql + " ORDER BY checkout_date DESC", params)
+            return [dict(row) for row in rows]
+
+    def export_parquet(
+        self,
+        directory: str,
+        tables: Sequence[str] = tuple(COLUMNS),
+        batch_size: int = 10000,
+    ) -> List[str]:
+        """
+        表ごとに Parquet ファイル（<directory>/<表名>.parquet）へ書き出し、そのパスを返す。
+        batch_size 行ずつ読み出して書き込むため、履歴全体をメモリに載せない。
+        書き出しには pyarrow を使う（別途インストールが必要）。
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "Parquet に書き出すには pyarrow をインストールしてください"
+            ) from e
+
+        types = {"TEXT": pa.string(), "INTEGER": pa.int64(), "REAL": pa.float64()}
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        with self._connect() as conn:
+            for table in tables:
+                columns = COLUMNS[table]
+                schema = pa.schema([(name, types[type_]) for name, type_ in columns])
+                path = os.path.join(directory, f"{table}.parquet")
+                names = ", ".join(name for name, _ in columns)
+                cursor = conn.execute(f"SELECT {names} FROM {table}")
+                with pq.ParquetWriter(path, schema) as writer:
+                    while rows := cursor.fetchmany(batch_size):
+                        arrays = [
+                            pa.array([row[n] for row in rows], type=field.type)
+                            for n, field in enumerate(schema)
+                        ]
+                        writer.write_batch(pa.record_batch(arrays, schema=schema))
+                paths.append(path)
+        return paths
+
+
+def history_store_from_env() -> Optional[HistoryStore]:
+    """
+    環境変数から履歴ストアを構築する。未設定の場合は None（履歴を保存しない）。
+    - HISTORY_PATH: SQLite ファイルのパス
+    """
+    path = os.environ.get("HISTORY_PATH")
+    return HistoryStore(path) if path else None
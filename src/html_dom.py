@@ -0,0 +1,334 @@
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple, Union
+
+# 終了タグを持たない要素
+VOID_ELEMENTS = frozenset(
+    {
+        "area", "base", "br", "col", "embed", "hr", "img", "input",
+        "link", "meta", "param", "source", "track", "wbr",
+    }
+)
+
+# 開始タグが現れたときに暗黙的に閉じる要素
+IMPLICIT_CLOSE = {
+    "td": {"td", "th"},
+    "th": {"td", "th"},
+    "tr": {"tr", "td", "th"},
+    "tbody": {"tbody", "thead", "tfoot", "tr", "td", "th"},
+    "li": {"li"},
+    "option": {"option"},
+    "dt": {"dt", "dd"},
+    "dd": {"dt", "dd"},
+    "p": {"p"},
+}
+
+# innerText で前後に改行が入るブロック要素
+BLOCK_ELEMENTS = frozenset(
+    {
+        "address", "article", "aside", "blockquote", "div", "dl", "dd", "dt",
+        "fieldset", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5",
+        "h6", "header", "hr", "li", "main", "nav", "ol", "option", "p", "pre",
+        "section", "table", "tbody", "thead", "tfoot", "tr", "ul",
+    }
+)
+
+# テキストとして扱わない要素
+SKIP_TEXT_ELEMENTS = frozenset({"script", "style", "noscript", "template", "head"})
+
+_WHITESPACE = re.compile(r"[ \t\n\r\f]+")
+
+
+class Element:
+    """HTML 要素を表す簡易ノード"""
+
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(
+        self, tag: str, attrs: Dict[str, str], parent: Optional["Element"] = None
+    ) -> None:
+        self.tag: str = tag
+        self.attrs: Dict[str, str] = attrs
+        self.children: List = []  # Element または str
+        self.parent: Optional[Element] = parent
+
+    @property
+    def element_children(self) -> List["Element"]:
+        return [c for c in self.children if isinstance(c, Element)]
+
+    @property
+    def classes(self) -> List[str]:
+        return self.attrs.get("class", "").split()
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.attrs.get(name, default)
+
+    def iter(self):
+        """自身と子孫要素を文書順に返す"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.element_children))
+
+    def select(self, selector: str) -> List["Element"]:
+        """CSS セレクタ（サブセット）に一致する子孫要素を返す"""
+        return select(self, selector)
+
+    @property
+    def inner_text(self) -> str:
+        """ブラウザの innerText を近似したテキスト"""
+        parts: List = []
+        _collect_text(self, parts)
+        return _join_text(parts)
+
+
+# innerText 組み立て用の区切り
+_BLOCK = object()
+_BR = object()
+_CELL = object()
+
+
+def _collect_text(node: Element, parts: List) -> None:
+    for child in node.children:
+        if isinstance(child, str):
+            parts.append(child)
+            continue
+        if child.tag in SKIP_TEXT_ELEMENTS:
+            continue
+        if child.tag == "br":
+            parts.append(_BR)
+            continue
+
+        is_block = child.tag in BLOCK_ELEMENTS
+        if is_block:
+            parts.append(_BLOCK)
+        _collect_text(child, parts)
+        if is_block:
+            parts.append(_BLOCK)
+        elif child.tag in ("td", "th"):
+            parts.append(_CELL)
+
+
+def _join_text(parts: List) -> str:
+    """テキスト片と区切りを結合し、空白を innerText 風に畳み込む"""
+    lines = [""]
+    for part in parts:
+        if part is _BLOCK:
+            if lines[-1].strip(" \t"):
+                lines.append("")
+        elif part is _BR:
+            lines.append("")
+        elif part is _CELL:
+            lines[-1] += "\t"
+        else:
+            text = _WHITESPACE.sub(" ", part)
+            if not lines[-1] or lines[-1].endswith((" ", "\t")):
+                text = text.lstrip(" ")
+            lines[-1] += text
+    return "\n".join(line.strip(" \t") for line in lines).strip("\n")
+
+
+# -------------------------
+# セレクタ
+# -------------------------
+_COMPOUND = re.compile(
+    r"""
+    (?P<tag>[a-zA-Z][a-zA-Z0-9-]*|\*)
+    |\#(?P<id>[\w-]+)
+    |\.(?P<cls>[\w-]+)
+    |\[(?P<attr>[\w-]+)(?:(?P<op>[~^$*]?=)["']?(?P<val>[^"'\]]*)["']?)?\]
+    |:nth-child\((?P<nth>\d+)\)
+    """,
+    re.X,
+)
+
+
+def _parse_compound(text: str) -> List[Tuple[str, Tuple]]:
+    conditions = []
+    pos = 0
+    while pos < len(text):
+        m = _COMPOUND.match(text, pos)
+        if not m:
+            raise ValueError(f"未対応のセレクタです: {text!r}")
+        if m.group("tag"):
+            if m.group("tag") != "*":
+                conditions.append(("tag", (m.group("tag").lower(),)))
+        elif m.group("id"):
+            conditions.append(("attr", ("id", "=", m.group("id"))))
+        elif m.group("cls"):
+            conditions.append(("class", (m.group("cls"),)))
+        elif m.group("attr"):
+            conditions.append(
+                ("attr", (m.group("attr"), m.group("op"), m.group("val")))
+            )
+        else:
+            conditions.append(("nth", (int(m.group("nth")),)))
+        pos = m.end()
+    return conditions
+
+
+def _parse_selector(selector: str) -> List[Tuple[str, List]]:
+    """'a > b c' を [(None, a), ('>', b), (' ', c)] に分解する"""
+    tokens = selector.replace(">", " > ").split()
+    steps = []
+    combinator = None
+    for token in tokens:
+        if token == ">":
+            combinator = ">"
+            continue
+        steps.append((combinator if steps else None, _parse_compound(token)))
+        combinator = " "
+    return steps
+
+
+def _matches(el: Element, conditions: List[Tuple[str, Tuple]]) -> bool:
+    for kind, args in conditions:
+        if kind == "tag":
+            if el.tag != args[0]:
+                return False
+        elif kind == "class":
+            if args[0] not in el.classes:
+                return False
+        elif kind == "attr":
+            name, op, val = args
+            actual = el.attrs.get(name)
+            if actual is None:
+                return False
+            if op == "=" and actual != val:
+                return False
+            if op == "~=" and val not in actual.split():
+                return False
+            if op == "^=" and not actual.startswith(val):
+                return False
+            if op == "$=" and not actual.endswith(val):
+                return False
+            if op == "*=" and val not in actual:
+                return False
+        elif kind == "nth":
+            if el.parent is None:
+                return False
+            siblings = el.parent.element_children
+            if siblings.index(el) + 1 != args[0]:
+                return False
+    return True
+
+
+def _matches_steps(el: Element, steps: List[Tuple[str, List]], root: Element) -> bool:
+    combinator, conditions = steps[-1]
+    if not _matches(el, conditions):
+        return False
+    if len(steps) == 1:
+        return True
+
+    rest = steps[:-1]
+    parent = el.parent
+    if combinator == ">":
+        return parent is not None and parent is not root.parent and _matches_steps(
+            parent, rest, root
+        )
+    while parent is not None and parent is not root.parent:
+        if _matches_steps(parent, rest, root):
+            return True
+        parent = parent.parent
+    return False
+
+
+def select(root: Element, selector: str) -> List[Element]:
+    """
+    root 配下からセレクタに一致する要素を文書順に返す。
+    対応: タグ, #id, .class, [attr], [attr="v"], :nth-child(n), 子孫・子結合子, カンマ区切り
+    （属性値に空白やカンマを含むセレクタには対応しない）
+    """
+    groups = [_parse_selector(s) for s in selector.split(",") if s.strip()]
+    return [
+        el
+        for el in root.iter()
+        if el is not root and any(_matches_steps(el, steps, root) for steps in groups)
+    ]
+
+
+# -------------------------
+# パーサ
+# -------------------------
+class _TreeBuilder(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.root = Element("#document", {})
+        self.stack: List[Element] = [self.root]
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        closes = IMPLICIT_CLOSE.get(tag)
+        while closes and self.stack[-1].tag in closes:
+            self.stack.pop()
+
+        # ブラウザ同様、table 直下の tr には tbody を補う
+        if tag == "tr" and self.stack[-1].tag == "table":
+            self._push("tbody", {})
+
+        self._push(tag, {k: v if v is not None else "" for k, v in attrs})
+        if tag in VOID_ELEMENTS:
+            self.stack.pop()
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS and self.stack[-1].tag == tag:
+            self.stack.pop()
+
+    def handle_endtag(self, tag: str) -> None:
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data: str) -> None:
+        self.stack[-1].children.append(data)
+
+    def _push(self, tag: str, attrs: Dict[str, str]) -> Element:
+        parent = self.stack[-1]
+        el = Element(tag, attrs, parent)
+        parent.children.append(el)
+        self.stack.append(el)
+        return el
+
+
+class HtmlDocument:
+    """HTML 文字列をパースした文書。Playwright の Page と同じセレクタで要素を取得できる"""
+
+    def __init__(self, html: str, url: str = "") -> None:
+        builder = _TreeBuilder()
+        builder.feed(html)
+        builder.close()
+        self.root: Element = builder.root
+        self.url: str = url
+
+    def select(self, selector: str) -> List[Element]:
+        return select(self.root, selector)
+
+    def select_one(self, selector: str) -> Optional[Element]:
+        found = self.select(selector)
+        return found[0] if found else None
+
+    def all_inner_texts(self, selector: str) -> List[str]:
+        """Locator.all_inner_texts() 相当"""
+        return [el.inner_text for el in self.select(selector)]
+
+    def find_link(self, name: str) -> Optional[Element]:
+        """リンクテキスト・aria-label・title に name を含む a 要素を返す"""
+        for el in self.select("a"):
+            labels = (el.inner_text, el.get("aria-label", ""), el.get("title", ""))
+            if any(name in label for label in labels):
+                return el
+        return None
+
+    def table_rows(self, selector: str) -> List[List[str]]:
+        """selector に一致する各行（tr）の td テキスト一覧を返す"""
+        return [
+            [td.inner_text for td in tr.element_children if td.tag == "td"]
+            for tr in self.select(selector)
+        ]
+
+
+def as_document(html: Union[str, HtmlDocument]) -> HtmlDocument:
+    """HTML 文字列または HtmlDocument を HtmlDocument にそろえる"""
+    return html if isinstance(html, HtmlDocument) else HtmlDocument(html)
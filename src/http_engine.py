@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Optional
+from urllib.parse import urljoin
+
+from html_dom import Element, HtmlDocument
+from resilience import LoginError
+
+# requests は import に時間がかかるため、最初の HttpClient 作成時に読み込む
+if TYPE_CHECKING:
+    import requests
+    from requests.adapters import HTTPAdapter
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+
+# 送信対象にしない input の種類
+_SKIP_INPUT_TYPES = ("submit", "button", "image", "reset", "file")
+
+
+class HttpEngineError(Exception):
+    """
+    HTTP エンジンで画面をたどれなかった（ログインフォーム・リンクが想定と違う）場合の例外。
+    認証情報の誤りは LoginError で区別する
+    """
+
+
+# ウォームコンテナ内で接続を使い回すための共有アダプタ
+_adapter: Optional[HTTPAdapter] = None
+
+
+def _shared_adapter() -> HTTPAdapter:
+    global _adapter
+    if _adapter is None:
+        from requests.adapters import HTTPAdapter
+
+        _adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    return _adapter
+
+
+class HttpClient:
+    """
+    ブラウザを使わずに OPAC を操作するための HTTP クライアント。
+    - Cookie はクライアント（= 1回の取得）ごとに独立
+    - TCP/TLS 接続はモジュール共有のコネクションプールで使い回す
+    """
+
+    def __init__(self, timeout: float = 15.0) -> None:
+        self.timeout: float = timeout
+        import requests
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.session.mount("https://", _shared_adapter())
+        self.session.mount("http://", _shared_adapter())
+
+    def _to_document(self, response: requests.Response) -> HtmlDocument:
+        response.raise_for_status()
+        # Content-Type に文字コードが無い場合は本文から推定する
+        if "charset" not in response.headers.get("Content-Type", "").lower():
+            response.encoding = response.apparent_encoding
+        return HtmlDocument(response.text, response.url)
+
+    def get(self, url: str) -> HtmlDocument:
+        return self._to_document(self.session.get(url, timeout=self.timeout))
+
+    def follow(self, doc: HtmlDocument, link: Optional[Element]) -> HtmlDocument:
+        """リンクをたどる。ページ内リンクの場合は同じ文書を返す"""
+        if link is None:
+            raise HttpEngineError(f"リンクが見つかりません: {doc.url}")
+
+        href = link.get("href", "")
+        if not href or href.startswith("#"):
+            return doc
+        if href.startswith("javascript:"):
+            raise HttpEngineError(f"JavaScript が必要なリンクです: {href}")
+        return self.get(urljoin(doc.url, href))
+
+    def follow_link(self, doc: HtmlDocument, name: str) -> HtmlDocument:
+        """リンク名（テキスト・aria-label・title）でリンクをたどる"""
+        return self.follow(doc, doc.find_link(name))
+
+    def iter_pages(
+        self,
+        doc: HtmlDocument,
+        next_link: Callable[[HtmlDocument], Optional[Element]],
+        max_pages: int = 20,
+    ) -> Iterator[HtmlDocument]:
+        """
+        doc から next_link が返すリンクをたどり、各ページの文書を順に返す。
+        次のページは、呼び出し側が現在のページを解析している間に別スレッドで取得する。
+        同じ URL に戻るリンク・JavaScript のリンクはたどらない。
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        seen = {doc.url}
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            for _ in range(max_pages - 1):
+                link = next_link(doc)
+                href = link.get("href", "") if link is not None else ""
+                url = urljoin(doc.url, href)
+                if not href or href.startswith(("#", "javascript:")) or url in seen:
+                    break
+                seen.add(url)
+                # 次のページの取得中に、現在のページを呼び出し側で解析させる
+                prefetch = executor.submit(self.get, url)
+                yield doc
+                doc = prefetch.result()
+            yield doc
+
+    def submit_login_form(
+        self, doc: HtmlDocument, card: str, password: str
+    ) -> HtmlDocument:
+        """
+        パスワード欄を含むフォームに利用者番号・パスワードを入力して送信する。
+        送信後の画面にもパスワード欄がある場合は LoginError を送出する
+        """
+        form = next(
+            (f for f in doc.select("form") if f.select('input[type="password"]')),
+            None,
+        )
+        if form is None:
+            raise HttpEngineError(f"ログインフォームが見つかりません: {doc.url}")
+
+        fields: Dict[str, str] = {}
+        card_filled = False
+        for el in form.select("input, select, textarea"):
+            name = el.get("name")
+            input_type = el.get("type", "text").lower()
+            if not name or input_type in _SKIP_INPUT_TYPES:
+                continue
+            if input_type in ("checkbox", "radio") and "checked" not in el.attrs:
+                continue
+
+            if input_type == "password":
+                fields[name] = password
+            elif input_type in ("text", "tel", "number") and not card_filled:
+                fields[name] = card
+                card_filled = True
+            elif el.tag == "select":
+                option = next(
+                    (o for o in el.select("option") if "selected" in o.attrs),
+                    next(iter(el.select("option")), None),
+                )
+                fields[name] = option.get("value", option.inner_text) if option else ""
+            else:
+                fields[name] = el.get("value", "")
+
+        # 名前付きの送信ボタンは値も送る
+        submit = next(
+            (
+                b
+                for b in form.select("input, button")
+                if b.get("type", "submit" if b.tag == "button" else "text").lower()
+                == "submit"
+            ),
+            None,
+        )
+        if submit is not None and submit.get("name"):
+            fields[submit.get("name")] = submit.get("value", "")
+
+        action = urljoin(doc.url, form.get("action") or doc.url)
+        if form.get("method", "get").lower() == "post":
+            response = self.session.post(action, data=fields, timeout=self.timeout)
+        else:
+            response = self.session.get(action, params=fields, timeout=self.timeout)
+
+        result = self._to_document(response)
+        # 送信後もパスワード欄が残っている場合は、認証情報が誤っている
+        if result.select('input[type="password"]'):
+            raise LoginError(f"ログインに失敗しました: {result.url}")
+        return result
+
+    def close(self) -> None:
+        # 共有アダプタは閉じずに Cookie だけ破棄する
+        self.session.cookies.clear()
@@ -0,0 +1,154 @@
+"""
+Chromium の起動設定（起動フラグ・実行ファイル・プロファイルの置き場所）をまとめた起動プロファイル。
+BROWSER_PROFILE で選び、未設定の場合は従来どおり default を使う。
+- default: 従来の起動フラグ（--disable-gpu / --single-process）のみ
+- minimal-memory: 拡張機能・裏での通信・コンポーネント更新を止め、キャッシュを小さくして
+  常駐メモリを抑える（Lambda のメモリ設定を下げる場合向け）
+- fastest-start: 起動時の処理を減らすフラグだけを付け、キャッシュは小さくしない
+- debugging: 単一プロセス化をやめ、ブラウザのログを標準エラーに出す
+"""
+
+import os
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT = "default"
+MINIMAL_MEMORY = "minimal-memory"
+FASTEST_START = "fastest-start"
+DEBUGGING = "debugging"
+
+# Lambda では /tmp 以外に書き込めないため、プロファイル・キャッシュは /tmp 以下に置く
+DATA_DIR = "/tmp/library_reader/chromium"
+# Playwright が同梱する、ヘッドレス専用の軽量な Chromium
+HEADLESS_SHELL = "chromium-headless-shell"
+
+# 起動時・待機中に裏で動く処理を止めるフラグ（minimal-memory / fastest-start 共通）
+_QUIET_ARGS: Tuple[str, ...] = (
+    "--disable-gpu",
+    "--no-zygote",
+    "--no-first-run",
+    "--disable-extensions",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-breakpad",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,"
+    "AutofillServerCommunication,InterestFeedContentSuggestions",
+)
+
+
+@dataclass(frozen=True)
+class LaunchProfile:
+    """
+    chromium.launch に渡す設定。
+
+    Attributes:
+        name (str): プロファイル名。
+        args (Tuple[str, ...]): Chromium の起動フラグ。
+        channel (Optional[str]): ブラウザの種類（HEADLESS_SHELL 等）。None なら Playwright の既定。
+        headless (bool): ヘッドレスで起動するかどうか。
+        data_dir (Optional[str]): HOME・キャッシュの置き場所。None ならブラウザの既定。
+        disk_cache_size (Optional[int]): ディスクキャッシュの上限（バイト）。
+    """
+
+    name: str
+    args: Tuple[str, ...] = field(default=())
+    channel: Optional[str] = field(default=None)
+    headless: bool = field(default=True)
+    data_dir: Optional[str] = field(default=None)
+    disk_cache_size: Optional[int] = field(default=None)
+
+    @property
+    def cache_dir(self) -> Optional[str]:
+        """ディスクキャッシュの置き場所（data_dir 未指定なら None）。起動する側で作成する"""
+        if self.data_dir is None:
+            return None
+        return os.path.join(self.data_dir, "cache")
+
+    def launch_options(self) -> Dict[str, Any]:
+        """chromium.launch のキーワード引数（ディレクトリの作成等の副作用は無い）"""
+        args = list(self.args)
+        options: Dict[str, Any] = {"headless": self.headless}
+        if self.data_dir is not None:
+            cache_dir = os.path.join(self.data_dir, "cache")
+            args.append(f"--disk-cache-dir={cache_dir}")
+            # 設定・クラッシュレポート等の書き込み先が読み取り専用の HOME にならないようにする
+            # （env を渡すとブラウザの環境変数はそれだけになるため、現在の環境変数に上書きする）
+            options["env"] = {
+                **os.environ,
+                "HOME": self.data_dir,
+                "XDG_CONFIG_HOME": os.path.join(self.data_dir, "config"),
+                "XDG_CACHE_HOME": cache_dir,
+            }
+        if self.disk_cache_size is not None:
+            args.append(f"--disk-cache-size={self.disk_cache_size}")
+            args.append(f"--media-cache-size={self.disk_cache_size}")
+        options["args"] = args
+
+        # 独自にビルドした Chromium を使う場合は実行ファイルを直接指定する
+        executable_path = os.environ.get("BROWSER_EXECUTABLE_PATH")
+        if executable_path:
+            options["executable_path"] = executable_path
+        elif self.channel is not None:
+            options["channel"] = self.channel
+        return options
+
+
+PROFILES: Dict[str, LaunchProfile] = {
+    DEFAULT: LaunchProfile(
+        name=DEFAULT,
+        args=("--disable-gpu", "--single-process"),
+    ),
+    MINIMAL_MEMORY: LaunchProfile(
+        name=MINIMAL_MEMORY,
+        args=_QUIET_ARGS
+        + (
+            "--single-process",
+            "--renderer-process-limit=1",
+            "--disable-dev-shm-usage",
+            "--disable-site-isolation-trials",
+            "--js-flags=--max-old-space-size=128",
+        ),
+        channel=HEADLESS_SHELL,
+        data_dir=DATA_DIR,
+        disk_cache_size=1024 * 1024,
+    ),
+    FASTEST_START: LaunchProfile(
+        name=FASTEST_START,
+        args=_QUIET_ARGS + ("--single-process",),
+        channel=HEADLESS_SHELL,
+        data_dir=DATA_DIR,
+    ),
+    DEBUGGING: LaunchProfile(
+        name=DEBUGGING,
+        args=("--disable-gpu", "--enable-logging=stderr", "--v=1"),
+        data_dir=DATA_DIR,
+    ),
+}
+
+
+def get_launch_profile(name: str) -> LaunchProfile:
+    """名前から起動プロファイルを返す"""
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"未知の起動プロファイルです: {name}（{', '.join(PROFILES)} のいずれか）"
+        ) from None
+
+
+def launch_profile_from_env() -> LaunchProfile:
+    """
+    環境変数から起動プロファイルを選ぶ。
+    - BROWSER_PROFILE: プロファイル名（未設定なら default）
+    - BROWSER_HEADLESS: 0 / false の場合は画面付きで起動する（debugging でのローカル確認用）
+    - BROWSER_EXECUTABLE_PATH: Chromium の実行ファイル（指定時は channel より優先）
+    """
+    profile = get_launch_profile(os.environ.get("BROWSER_PROFILE") or DEFAULT)
+    if os.environ.get("BROWSER_HEADLESS", "").lower() in ("0", "false"):
+        return replace(profile, headless=False)
+    return profile
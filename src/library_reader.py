@@ -1,66 +1,660 @@
+from __future__ import annotations
+
+import logging
+import re
 from abc import ABC, abstractmethod
-from typing import List, Callable
+from contextlib import ExitStack, contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    FrozenSet,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from urllib.parse import urlparse
 
-from playwright.sync_api import sync_playwright
-from playwright.sync_api._generated import Browser, BrowserContext, Page
+from browser_pool import get_browser_pool
+from html_dom import Element, HtmlDocument
+from http_engine import HttpClient, HttpEngineError
+from metrics import Metrics, MetricsCallback
 from model import LentItem, ReserveItem
+from registry import register, select_engine
+from resilience import CircuitBreaker, LoginError, RetryPolicy, get_circuit_breaker
+from route_policy import RoutePolicy
+from session_cache import SessionCache
+
+if TYPE_CHECKING:
+    from playwright.sync_api._generated import BrowserContext, Locator, Page
+
+T = TypeVar("T")
+R = TypeVar("R")
 
+# iter_all が返す (一覧の種類, アイテム) の組。種類は "lent" または "reserve"
+TaggedItem = Tuple[str, Union[LentItem, ReserveItem]]
 
-def create_browser(playwright):
-    """Playwright ブラウザを起動する共通関数"""
-    return playwright.chromium.launch(
-        args=[
-            "--disable-gpu",
-            "--single-process",
-        ],
-    )
+# HTTP エンジンで失敗した場合に Playwright で取得し直す例外（画面構造・解析結果の不一致）。
+# ログインの失敗（LoginError）・OPAC の停止等は Playwright でも変わらないので含めない
+HTTP_FALLBACK_ERRORS: Tuple[type, ...] = (
+    HttpEngineError,
+    LookupError,
+    ValueError,
+    TypeError,
+    AttributeError,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class BaseLibraryReader(ABC):
     """
     各区立図書館の共通基底クラス。
     - ログイン処理はサブクラスで実装
-    - 貸出中・予約中一覧のスクレイピング処理もサブクラスで実装
+    - 貸出中・予約中一覧のスクレイピング処理もサブクラスで実装（一覧への遷移と、
+      ページごとに組み立てて順に返す読み取りに分ける）
+    - JavaScript 不要な OPAC は _http_* を実装すると HTTP エンジンで取得できる
+    - 取得ごとにフェーズ別の所要時間・通信量を metrics に記録し、metrics_callback に渡す
+    - AREA を定義したサブクラスは定義時に registry へ登録される
+    - ログイン・画面遷移の一時的な失敗は retry_policy で再試行し、続けて失敗した区
+      （またはメンテナンス中の区）は circuit_breaker で CircuitOpenError にする
+    - ログインできなかった場合（認証情報の誤り）は LoginError を送出し、再試行しない
     """
 
     URL: str
+    # セッションキャッシュのキーに使う区の識別子
+    AREA: str
+    # ログイン済みであることを確認するためのセレクタ
+    LOGGED_IN_SELECTOR: str
+    # 描画に必要なため遮断しないリソース種別（image, media, font, stylesheet のうち）
+    ALLOWED_RESOURCE_TYPES: FrozenSet[str] = frozenset()
+    # URL のホスト以外に通信を許可するホスト
+    EXTRA_ALLOWED_HOSTS: Tuple[str, ...] = ()
+    # 対応している取得エンジン（速い順）。"http" は _http_* の実装が必要
+    ENGINES: Tuple[str, ...] = ("playwright",)
+    # 同じ区の OPAC に同時にアクセスする上限
+    MAX_CONCURRENCY: int = 2
+    # 取得結果キャッシュの有効期間（秒）。None の場合はキャッシュ全体の設定に従う
+    CACHE_TTL: Optional[int] = None
+    # 一覧の行・空表示のどちらかが現れるまで待つ上限（ミリ秒）
+    WAIT_TIMEOUT: int = 10_000
+    # キャッシュしたセッションで開いた画面に、ログイン後の表示が現れるまで待つ上限（ミリ秒）
+    RESTORE_TIMEOUT: int = 3_000
+    # 一覧が空の場合に表示される要素（区ごとに実際の画面の文言で確認してから設定する）。
+    # None の区は、一覧の行が wait_timeout 以内に現れなければ空として扱う
+    EMPTY_SELECTOR: Optional[str] = None
+    # ログイン・画面遷移の一時的な失敗（接続エラー・接続のタイムアウト・5xx）の再試行方針
+    RETRY_POLICY: RetryPolicy = RetryPolicy()
+    # 一覧が複数ページに分かれる場合に次のページへ進むリンク・ボタンの名前
+    NEXT_PAGE_NAMES: Tuple[str, ...] = ("次へ", "次のページ")
+    # たどるページ数の上限（リンクの誤検出で同じ画面を繰り返さないための安全策）
+    MAX_PAGES: int = 20
+    # ログイン後のコンテキストに2つ目のページを開き、貸出中・予約中一覧を並行して読み込む。
+    # 同じセッションでの同時の画面遷移に対応していない OPAC では False にする
+    PARALLEL_TABS: bool = True
+    # OPAC の定期メンテナンス時間帯（日本時間の "HH:MM" の組）。この間はアクセスしない
+    MAINTENANCE_WINDOWS: Tuple[Tuple[str, str], ...] = ()
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if "AREA" in cls.__dict__:
+            register(cls)
 
-    def __init__(self, user: str, password: str) -> None:
+    def __init__(
+        self,
+        user: str,
+        password: str,
+        session_cache: Optional[SessionCache] = None,
+        block_resources: bool = True,
+        engine: Optional[str] = None,
+        metrics_callback: Optional[MetricsCallback] = None,
+        wait_timeout: Optional[int] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ) -> None:
         self.card: str = user
         self.password: str = password
+        self.session_cache: Optional[SessionCache] = session_cache
+        self.block_resources: bool = block_resources
+        # 未指定の場合は、必要なパッケージが導入済みのエンジンのうち最も速いもの
+        self.engine: str = engine or select_engine(self.ENGINES)
+        if self.engine not in self.ENGINES:
+            raise ValueError(
+                f"{type(self).__name__} は {self.engine} エンジンに対応していません"
+            )
+        self.metrics_callback: Optional[MetricsCallback] = metrics_callback
+        self.wait_timeout: int = wait_timeout or self.WAIT_TIMEOUT
+        self.retry_policy: RetryPolicy = retry_policy or self.RETRY_POLICY
+        # 区ごとにプロセス内で共有するサーキットブレーカー
+        self.circuit_breaker: CircuitBreaker = get_circuit_breaker(
+            self.AREA, self.MAINTENANCE_WINDOWS
+        )
+        # 直近の取得処理の計測結果
+        self.metrics: Metrics = Metrics(self.AREA, self.engine)
 
     # -------------------------
     # サブクラスで必須実装
     # -------------------------
     @abstractmethod
     def _login(self, context: BrowserContext) -> Page:
-        """ログイン処理を実装する"""
+        """ログイン処理を実装する（ログイン後の画面の表示・成否の確認は _log_in が行う）"""
         raise NotImplementedError
 
     @abstractmethod
-    def _parse_lent(self, page: Page) -> List[LentItem]:
-        """貸出中一覧のスクレイピング処理"""
+    def _open_lent(self, page: Page) -> None:
+        """ログイン後の画面から貸出中一覧へ遷移する（読み込みの完了は待たなくてよい）"""
         raise NotImplementedError
 
     @abstractmethod
-    def _parse_reserve(self, page: Page) -> List[ReserveItem]:
-        """予約中一覧のスクレイピング処理"""
+    def _read_lent(self, page: Page) -> Iterator[LentItem]:
+        """貸出中一覧のスクレイピング処理。複数ページの場合は _pages でたどる"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _open_reserve(self, page: Page) -> None:
+        """ログイン後の画面から予約中一覧へ遷移する（読み込みの完了は待たなくてよい）"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _read_reserve(self, page: Page) -> Iterator[ReserveItem]:
+        """予約中一覧のスクレイピング処理。複数ページの場合は _pages でたどる"""
         raise NotImplementedError
 
+    # -------------------------
+    # HTTP エンジン（対応するサブクラスのみ実装）
+    # -------------------------
+    def _http_login(self, client: HttpClient) -> HtmlDocument:
+        """フォーム送信でログインし、ログイン後の文書を返す"""
+        raise NotImplementedError
+
+    def _http_open_lent(self, client: HttpClient, doc: HtmlDocument) -> HtmlDocument:
+        """ログイン後の文書から貸出中一覧（1ページ目）の文書を取得する"""
+        raise NotImplementedError
+
+    def _http_read_lent(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> Iterator[LentItem]:
+        """貸出中一覧の文書を解析する。複数ページの場合は _http_pages でたどる"""
+        raise NotImplementedError
+
+    def _http_open_reserve(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> HtmlDocument:
+        """ログイン後の文書から予約中一覧（1ページ目）の文書を取得する"""
+        raise NotImplementedError
+
+    def _http_read_reserve(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> Iterator[ReserveItem]:
+        """予約中一覧の文書を解析する。複数ページの場合は _http_pages でたどる"""
+        raise NotImplementedError
+
+    def _http_iter_lent(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> Iterator[LentItem]:
+        yield from self._http_read_lent(client, self._http_open_lent(client, doc))
+
+    def _http_iter_reserve(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> Iterator[ReserveItem]:
+        yield from self._http_read_reserve(client, self._http_open_reserve(client, doc))
+
+    def _http_parse_lent(self, client: HttpClient, doc: HtmlDocument) -> List[LentItem]:
+        return list(self._http_iter_lent(client, doc))
+
+    def _http_parse_reserve(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> List[ReserveItem]:
+        return list(self._http_iter_reserve(client, doc))
+
+    def _http_parse_all(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> Tuple[List[LentItem], List[ReserveItem]]:
+        lent_items: List[LentItem] = []
+        reserve_items: List[ReserveItem] = []
+        for kind, item in self._http_iter_all(client, doc):
+            (lent_items if kind == "lent" else reserve_items).append(item)
+        return lent_items, reserve_items
+
+    def _http_iter_all(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> Iterator[TaggedItem]:
+        """
+        貸出中・予約中一覧を続けて、種類を付けて返す。
+        PARALLEL_TABS の区は、貸出中一覧を取得・解析している間に、同じクライアント（同じ Cookie）で
+        予約中一覧の1ページ目を別スレッドで取得する（解析・計測は呼び出し元のスレッドで行う）。
+        """
+        if not self.PARALLEL_TABS:
+            for item in self._http_iter_lent(client, doc):
+                yield "lent", item
+            for item in self._http_iter_reserve(client, doc):
+                yield "reserve", item
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            reserve_doc = executor.submit(self._http_open_reserve, client, doc)
+            for item in self._http_iter_lent(client, doc):
+                yield "lent", item
+            for item in self._http_read_reserve(client, reserve_doc.result()):
+                yield "reserve", item
+
+    def _http_next_page(self, doc: HtmlDocument) -> Optional[Element]:
+        """一覧の文書から次のページへのリンクを探す。無ければ None"""
+        for name in self.NEXT_PAGE_NAMES:
+            link = doc.find_link(name)
+            if link is not None:
+                return link
+        return None
+
+    def _http_pages(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> Iterator[HtmlDocument]:
+        """一覧の各ページの文書を順に返す（次のページは解析中に先読みする）"""
+        return client.iter_pages(doc, self._http_next_page, self.MAX_PAGES)
+
+    @contextmanager
+    def _http_session(self) -> Iterator[Tuple[HttpClient, HtmlDocument]]:
+        """HTTP クライアントでログインし、クライアントとログイン後の文書を渡す"""
+        self.metrics.engine = "http"
+        client = HttpClient()
+        client.session.hooks["response"].append(self.metrics.on_http_response)
+        try:
+            with self.metrics.span("login"):
+                doc = self._retry("login", lambda: self._http_login(client))
+            yield client, doc
+        finally:
+            client.close()
+
+    def _with_http_login(self, action: Callable[[HttpClient, HtmlDocument], T]) -> T:
+        """HTTP クライアントでログイン後、指定の処理を実行して結果を返す"""
+        with self._http_session() as (client, doc):
+            with self.metrics.span("navigation"):
+                # 一覧画面へはリンク（GET）をたどるだけなので、ログイン後の文書からやり直せる
+                return self._retry("navigation", lambda: action(client, doc))
+
+    def _iter_with_http_login(
+        self, action: Callable[[HttpClient, HtmlDocument], Iterator[T]]
+    ) -> Iterator[T]:
+        """_with_http_login のジェネレータ版（返し始めた後は再試行しない）"""
+        with self._http_session() as (client, doc):
+            with self.metrics.span("navigation"):
+                yield from action(client, doc)
+
     # -------------------------
     # 共通ユーティリティ
     # -------------------------
-    def _with_login(self, action: Callable[[Page], List]) -> List:
-        """ブラウザを起動しログイン後、指定の処理を実行して結果を返す"""
-        with sync_playwright() as playwright:
-            browser: Browser = create_browser(playwright)
-            context: BrowserContext = browser.new_context()
+    def _run(
+        self,
+        action: Callable[[Page], T],
+        http_action: Callable[[HttpClient, HtmlDocument], T],
+    ) -> T:
+        """
+        選択されたエンジンで取得する。HTTP エンジンが画面構造の不一致（HTTP_FALLBACK_ERRORS）で
+        失敗した場合は Playwright で取得し直す。
+        サーキットブレーカーが開いている場合はアクセスせずに CircuitOpenError を送出する。
+        """
+        self.circuit_breaker.before_call()
+        self.metrics = Metrics(self.AREA, self.engine)
+        try:
+            result = self._fetch(action, http_action)
+        except Exception as e:
+            self.circuit_breaker.record_failure(e)
+            raise
+        except BaseException:
+            # タスクの取り消し等で中断された場合も、試しのアクセスを終わらせる
+            self.circuit_breaker.record_abandoned(produced=False)
+            raise
+        else:
+            self.circuit_breaker.record_success()
+            return result
+        finally:
+            self._emit_metrics()
+
+    def _stream(
+        self,
+        action: Callable[[Page], Iterator[T]],
+        http_action: Callable[[HttpClient, HtmlDocument], Iterator[T]],
+    ) -> Iterator[T]:
+        """
+        _run のジェネレータ版。解析したアイテムから順に返す。
+        - 最初のアイテムを返す前に HTTP エンジンが画面構造の不一致で失敗した場合は Playwright で
+          取得し直す
+        - 返し始めた後の失敗は、同じアイテムを重複して返さないよう再試行せずに送出する
+        - 呼び出し側がアイテムを処理している時間は計測に含めない
+        """
+        self.circuit_breaker.before_call()
+        self.metrics = Metrics(self.AREA, self.engine)
+        started = False
+        try:
+            if self.engine == "http":
+                try:
+                    for item in self._iter_with_http_login(http_action):
+                        started = True
+                        with self.metrics.paused():
+                            yield item
+                    self.circuit_breaker.record_success()
+                    return
+                except HTTP_FALLBACK_ERRORS:
+                    if started:
+                        raise
+                    logger.warning(
+                        "%s: HTTP エンジンでの取得に失敗したため Playwright で再取得します",
+                        self.AREA,
+                        exc_info=True,
+                    )
+            for item in self._iter_with_login(action):
+                started = True
+                with self.metrics.paused():
+                    yield item
+        except Exception as e:
+            self.circuit_breaker.record_failure(e)
+            raise
+        except BaseException:
+            # 途中で閉じられた（GeneratorExit）・取り消された場合も、試しのアクセスを終わらせる
+            self.circuit_breaker.record_abandoned(produced=started)
+            raise
+        else:
+            self.circuit_breaker.record_success()
+        finally:
+            self._emit_metrics()
+
+    def _fetch(
+        self,
+        action: Callable[[Page], T],
+        http_action: Callable[[HttpClient, HtmlDocument], T],
+    ) -> T:
+        if self.engine == "http":
             try:
-                page = self._login(context)
+                return self._with_http_login(http_action)
+            except HTTP_FALLBACK_ERRORS:
+                # 画面構造の不一致だけを取り直す。ログインの失敗・OPAC の停止は Playwright でも
+                # 変わらず、取り直すとログインの失敗を重ねる（アカウントのロック）ため送出する
+                logger.warning(
+                    "%s: HTTP エンジンでの取得に失敗したため Playwright で再取得します",
+                    self.AREA,
+                    exc_info=True,
+                )
+        return self._with_login(action)
+
+    def _retry(
+        self,
+        phase: str,
+        func: Callable[[], T],
+        on_retry: Optional[Callable[[], None]] = None,
+    ) -> T:
+        """phase の処理を retry_policy に従って再試行する。on_retry は再試行前の後片付け"""
+
+        def before_retry(retry: int, exc: BaseException) -> None:
+            self.metrics.retries += 1
+            logger.warning(
+                "%s: %s に失敗したため再試行します（%d回目）: %s",
+                self.AREA,
+                phase,
+                retry,
+                exc,
+            )
+            if on_retry is not None:
+                on_retry()
+
+        return self.retry_policy.call(func, before_retry)
+
+    def _emit_metrics(self) -> None:
+        """計測を締めてコールバックに渡す。コールバックの失敗は取得結果に影響させない"""
+        self.metrics.finish()
+        if self.metrics_callback is None:
+            return
+        try:
+            self.metrics_callback(self.metrics)
+        except Exception:
+            logger.warning("%s: 計測結果の出力に失敗しました", self.AREA, exc_info=True)
+
+    def _between_tabs(self, page: Page) -> None:
+        """貸出中一覧から予約中一覧へ移る前の画面遷移（必要なサブクラスのみ上書き）"""
+
+    def _log_in(self, context: BrowserContext) -> Page:
+        """
+        _login でログインし、ログイン後の画面（LOGGED_IN_SELECTOR）が表示されるまで待つ。
+        wait_timeout ミリ秒以内に表示されず、パスワード欄が残っている場合は認証情報の誤りとして
+        LoginError を送出する（それ以外は Playwright の TimeoutError のまま送出する）。
+        """
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+        page = self._login(context)
+        try:
+            page.locator(self.LOGGED_IN_SELECTOR).first.wait_for(
+                timeout=self.wait_timeout
+            )
+        except PlaywrightTimeoutError:
+            if page.locator('input[type="password"]').first.is_visible():
+                raise LoginError(f"{self.AREA}: ログインに失敗しました: {page.url}")
+            raise
+        return page
+
+    def _wait_for_rows(self, page: Page, rows_selector: str) -> bool:
+        """
+        一覧の行と空表示（EMPTY_SELECTOR）のどちらかが現れるまで待つ。
+        行がある場合は True、空表示の場合は False を返す。どちらも wait_timeout ミリ秒以内に
+        現れない場合も、警告を出して空として扱う（False を返す）。
+        """
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+        rows = page.locator(rows_selector)
+        target = rows
+        if self.EMPTY_SELECTOR:
+            target = rows.or_(page.locator(self.EMPTY_SELECTOR))
+        try:
+            target.first.wait_for(timeout=self.wait_timeout)
+        except PlaywrightTimeoutError:
+            logger.warning(
+                "%s: 一覧の行・空表示が現れないため空として扱います: %s", self.AREA, page.url
+            )
+            return False
+        return rows.count() > 0
+
+    def _next_page(self, page: Page, pager: Optional[str] = None) -> Locator:
+        """次のページへ進むリンク・ボタン（NEXT_PAGE_NAMES のいずれかの名前）"""
+        root = page.locator(pager) if pager else page
+        name = re.compile("|".join(map(re.escape, self.NEXT_PAGE_NAMES)))
+        return (
+            root.get_by_role("link", name=name)
+            .or_(root.get_by_role("button", name=name))
+            .first
+        )
+
+    def _pages(
+        self,
+        page: Page,
+        rows_selector: str,
+        read: Callable[[Page], R],
+        pager: Optional[str] = None,
+    ) -> Iterator[R]:
+        """
+        一覧の各ページを read で読み取った結果を順に返す。1ページ目が空表示なら何も返さない。
+        次のページがある場合は、読み取り後すぐに遷移を始めてから結果を返すため、
+        呼び出し側での解析と次のページの読み込みが並行する。
+        pager を指定した場合は、その要素の中だけで次のページへのリンクを探す。
+        """
+        for number in range(1, self.MAX_PAGES + 1):
+            if not self._wait_for_rows(page, rows_selector):
+                return
+            rows = read(page)
+            next_page = self._next_page(page, pager)
+            has_next = next_page.count() > 0
+            if has_next and number == self.MAX_PAGES:
+                logger.warning(
+                    "%s: %d ページを超えたため以降は取得しません", self.AREA, number
+                )
+                has_next = False
+            if has_next:
+                with page.expect_navigation(wait_until="commit"):
+                    next_page.click()
+            yield rows
+            if not has_next:
+                return
+
+    @contextmanager
+    def _browser_session(self) -> Iterator[Tuple[BrowserContext, Page]]:
+        """共有ブラウザから新しいコンテキストを取得してログインし、コンテキストとページを渡す"""
+        cached = (
+            self.session_cache.get(self.AREA, self.card, self.password)
+            if self.session_cache
+            else None
+        )
+        storage_state = cached["storage_state"] if cached else None
+        self.metrics.engine = "playwright"
+
+        with ExitStack() as stack:
+            with self.metrics.span("browser"):
+                context = stack.enter_context(
+                    get_browser_pool().new_context(storage_state=storage_state)
+                )
+            context.on("response", self.metrics.on_browser_response)
+            if self.block_resources:
+                self._route_policy().install(context)
+
+            def login() -> Page:
+                page = self._restore_session(context, cached["url"]) if cached else None
+                if page is None:
+                    context.clear_cookies()
+                    page = self._log_in(context)
+                    # _log_in がログイン後の画面の表示を確かめてから保存する（ログイン画面・
+                    # 認証情報の誤りのセッションはキャッシュしない）
+                    if self.session_cache:
+                        self.session_cache.put(
+                            self.AREA,
+                            self.card,
+                            self.password,
+                            context.storage_state(),
+                            page.url,
+                        )
+                return page
+
+            with self.metrics.span("login"):
+                page = self._retry("login", login, lambda: self._close_pages(context))
+            yield context, page
+
+    def _with_login(self, action: Callable[[Page], T]) -> T:
+        """共有ブラウザから新しいコンテキストを取得してログイン後、指定の処理を実行して結果を返す"""
+        with self._browser_session() as (context, page):
+            landing_url = page.url
+
+            def navigate() -> T:
+                nonlocal page
+                # 再試行時は、同じコンテキストでログイン後の画面を開き直してからやり直す
+                if page.is_closed():
+                    page = self._restore_session(context, landing_url) or self._log_in(
+                        context
+                    )
                 return action(page)
-            finally:
-                context.close()
-                browser.close()
+
+            with self.metrics.span("navigation"):
+                return self._retry(
+                    "navigation", navigate, lambda: self._close_pages(context)
+                )
+
+    def _iter_with_login(self, action: Callable[[Page], Iterator[T]]) -> Iterator[T]:
+        """_with_login のジェネレータ版（返し始めた後は再試行しない）"""
+        with self._browser_session() as (_, page):
+            with self.metrics.span("navigation"):
+                yield from action(page)
+
+    @staticmethod
+    def _close_pages(context: BrowserContext) -> None:
+        for page in context.pages:
+            page.close()
+
+    def _route_policy(self) -> RoutePolicy:
+        """この区の OPAC 用のリクエスト遮断ポリシーを返す"""
+        return RoutePolicy(
+            allowed_hosts=(urlparse(self.URL).hostname, *self.EXTRA_ALLOWED_HOSTS),
+            allowed_resource_types=self.ALLOWED_RESOURCE_TYPES,
+        )
+
+    def _restore_session(self, context: BrowserContext, url: str) -> Optional[Page]:
+        """
+        キャッシュしたセッションでログイン後の画面を開く。期限切れの場合は None。
+        ログイン後の表示が遅れて描画される場合に備え、RESTORE_TIMEOUT ミリ秒まで待つ。
+        """
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+        page: Page = context.new_page()
+        page.goto(url)
+        try:
+            page.locator(self.LOGGED_IN_SELECTOR).first.wait_for(
+                timeout=self.RESTORE_TIMEOUT
+            )
+        except PlaywrightTimeoutError:
+            page.close()
+            return None
+        return page
+
+    def _iter_lent(self, page: Page) -> Iterator[LentItem]:
+        self._open_lent(page)
+        yield from self._read_lent(page)
+
+    def _iter_reserve(self, page: Page) -> Iterator[ReserveItem]:
+        self._open_reserve(page)
+        yield from self._read_reserve(page)
+
+    def _parse_lent(self, page: Page) -> List[LentItem]:
+        return list(self._iter_lent(page))
+
+    def _parse_reserve(self, page: Page) -> List[ReserveItem]:
+        return list(self._iter_reserve(page))
+
+    def _open_reserve_page(self, page: Page, landing_url: str) -> Optional[Page]:
+        """
+        同じコンテキストに2つ目のページを開いてログイン後の画面を表示し、予約中一覧への遷移を始める。
+        ログイン後の画面を URL で開き直せない場合（POST の結果画面等）や、開く途中で失敗した
+        場合は None（呼び出し側は同じページで順に取得する）
+        """
+        other: Optional[Page] = None
+        try:
+            other = self._restore_session(page.context, landing_url)
+            if other is not None:
+                self._open_reserve(other)
+            return other
+        except Exception:
+            logger.warning(
+                "%s: 2つ目のページを開けないため、順に取得します", self.AREA, exc_info=True
+            )
+            if other is not None:
+                other.close()
+            return None
+
+    def _iter_all(self, page: Page) -> Iterator[TaggedItem]:
+        """
+        貸出中・予約中一覧を続けて、種類を付けて返す。
+        PARALLEL_TABS の区は、貸出中一覧の読み込み中に2つ目のページで予約中一覧を開き、
+        両方の一覧の読み込みを並行させる。開けない場合は同じページで順に取得する。
+        """
+        landing_url = page.url
+        self._open_lent(page)
+        reserve_page = (
+            self._open_reserve_page(page, landing_url) if self.PARALLEL_TABS else None
+        )
+        try:
+            for item in self._read_lent(page):
+                yield "lent", item
+            if reserve_page is None:
+                self._between_tabs(page)
+                self._open_reserve(page)
+            for item in self._read_reserve(reserve_page or page):
+                yield "reserve", item
+        finally:
+            if reserve_page is not None:
+                reserve_page.close()
+
+    def _parse_all(self, page: Page) -> Tuple[List[LentItem], List[ReserveItem]]:
+        """1回のログインで貸出中・予約中一覧を取得する"""
+        lent_items: List[LentItem] = []
+        reserve_items: List[ReserveItem] = []
+        for kind, item in self._iter_all(page):
+            (lent_items if kind == "lent" else reserve_items).append(item)
+        return lent_items, reserve_items
 
     @staticmethod
     def _chunk(data: List[str], size: int) -> List[List[str]]:
@@ -73,9 +667,25 @@ class BaseLibraryReader(ABC):
     @property
     def lent(self) -> List[LentItem]:
         """現在貸出中の資料一覧を取得"""
-        return self._with_login(self._parse_lent)
+        return self._run(self._parse_lent, self._http_parse_lent)
 
     @property
     def reserve(self) -> List[ReserveItem]:
         """現在予約中の資料一覧を取得"""
-        return self._with_login(self._parse_reserve)
+        return self._run(self._parse_reserve, self._http_parse_reserve)
+
+    def fetch_all(self) -> Tuple[List[LentItem], List[ReserveItem]]:
+        """1回のログインで貸出中・予約中の資料一覧をまとめて取得"""
+        return self._run(self._parse_all, self._http_parse_all)
+
+    def iter_lent(self) -> Iterator[LentItem]:
+        """貸出中の資料を解析した順に返す（全件の取得を待たずに処理を始められる）"""
+        return self._stream(self._iter_lent, self._http_iter_lent)
+
+    def iter_reserve(self) -> Iterator[ReserveItem]:
+        """予約中の資料を解析した順に返す"""
+        return self._stream(self._iter_reserve, self._http_iter_reserve)
+
+    def iter_all(self) -> Iterator[TaggedItem]:
+        """1回のログインで貸出中・予約中の資料を ("lent" / "reserve", アイテム) の順に返す"""
+        return self._stream(self._iter_all, self._http_iter_all)
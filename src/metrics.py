@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+# Lambda の既定のログレベル（WARNING）でも log_metrics の INFO ログを出力する
+logger.setLevel(logging.INFO)
+
+# 計測するフェーズ（ブラウザ起動・ログイン・画面遷移・解析）
+PHASES = ("browser", "login", "navigation", "parse")
+
+
+class Metrics:
+    """
+    1回の取得処理のフェーズごとの所要時間と通信量。
+    - span の入れ子は内側の時間を外側から差し引き、各フェーズの正味の時間を記録する
+    - requests はブラウザ・HTTP クライアントが受信したレスポンスの件数
+    - content_length_bytes はレスポンスヘッダの Content-Length の合計（圧縮後の申告値）。
+      chunked 等で Content-Length が無いレスポンスは含めず、unsized_responses で件数を数える
+    - retries は一時的な失敗による再試行の回数
+    """
+
+    def __init__(self, area: str, engine: str) -> None:
+        self.area: str = area
+        self.engine: str = engine
+        self.spans: Dict[str, float] = defaultdict(float)
+        self.requests: int = 0
+        self.content_length_bytes: int = 0
+        self.unsized_responses: int = 0
+        self.retries: int = 0
+        self.total: float = 0.0
+        self._stack: List[str] = []
+        self._started_at: float = time.perf_counter()
+
+    @contextmanager
+    def span(self, phase: str) -> Iterator[None]:
+        """ブロック内の処理時間を phase に加算する"""
+        start = time.perf_counter()
+        self._stack.append(phase)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - start
+            self.spans[phase] += elapsed
+            if self._stack:
+                self.spans[self._stack[-1]] -= elapsed
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """
+        ブロック内の時間をどのフェーズにも合計にも含めない。
+        取得途中のアイテムを呼び出し側に渡し、処理を待っている間に使う。
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if self._stack:
+                self.spans[self._stack[-1]] -= elapsed
+            self._started_at += elapsed
+
+    def record_response(self, content_length: Optional[int]) -> None:
+        self.requests += 1
+        if content_length is None:
+            self.unsized_responses += 1
+        else:
+            self.content_length_bytes += content_length
+
+    @staticmethod
+    def _content_length(headers) -> Optional[int]:
+        length = headers.get("content-length", "")
+        return int(length) if length.isdigit() else None
+
+    def on_browser_response(self, response) -> None:
+        """Playwright の response イベント用"""
+        self.record_response(self._content_length(response.headers))
+
+    def on_http_response(self, response, *args, **kwargs) -> None:
+        """requests のレスポンスフック用（ブラウザと揃えて Content-Length で数える）"""
+        self.record_response(self._content_length(response.headers))
+
+    def finish(self) -> None:
+        self.total = time.perf_counter() - self._started_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "area": self.area,
+            "engine": self.engine,
+            **{f"{p}_ms": round(self.spans.get(p, 0.0) * 1000, 1) for p in PHASES},
+            "total_ms": round(self.total * 1000, 1),
+            "requests": self.requests,
+            "content_length_bytes": self.content_length_bytes,
+            "unsized_responses": self.unsized_responses,
+            "retries": self.retries,
+        }
+
+    def as_emf(self, namespace: str) -> Dict[str, Any]:
+        """CloudWatch の Embedded Metric Format に変換する"""
+        values = self.as_dict()
+        metrics = [
+            {"Name": k, "Unit": "Milliseconds"} for k in values if k.endswith("_ms")
+        ]
+        metrics.append({"Name": "requests", "Unit": "Count"})
+        metrics.append({"Name": "content_length_bytes", "Unit": "Bytes"})
+        metrics.append({"Name": "unsized_responses", "Unit": "Count"})
+        metrics.append({"Name": "retries", "Unit": "Count"})
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": namespace,
+                        "Dimensions": [["area", "engine"]],
+                        "Metrics": metrics,
+                    }
+                ],
+            },
+            **values,
+        }
+
+
+# 取得完了時に Metrics を受け取るコールバック
+MetricsCallback = Callable[[Metrics], None]
+
+
+def log_metrics(metrics: Metrics) -> None:
+    """計測結果を JSON 1行のログとして INFO で出力する（このモジュールのロガーは INFO に設定済み）"""
+    logger.info(json.dumps(metrics.as_dict()))
+
+
+def emf_callback(namespace: str) -> MetricsCallback:
+    """計測結果を EMF として標準出力に書き出すコールバックを返す（CloudWatch Logs が取り込む）"""
+
+    def callback(metrics: Metrics) -> None:
+        print(json.dumps(metrics.as_emf(namespace)), flush=True)
+
+    return callback
+
+
+def metrics_callback_from_env() -> MetricsCallback:
+    """
+    環境変数から計測結果の出力先を決める。
+    - METRICS_NAMESPACE: 指定した場合はその名前空間の EMF、未設定なら JSON ログで出力
+    """
+    namespace = os.environ.get("METRICS_NAMESPACE")
+    return emf_callback(namespace) if namespace else log_metrics
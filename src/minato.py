@@ -1,17 +1,184 @@
+from __future__ import annotations
+
+from html_dom import HtmlDocument, as_document
+from http_engine import HttpClient
+from async_library_reader import AsyncBaseLibraryReader
 from library_reader import BaseLibraryReader
 from model import LentItem, ReserveItem
 
-from playwright.sync_api._generated import BrowserContext, Page
+import re
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, List, Tuple, Union
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext as AsyncBrowserContext
+    from playwright.async_api import Page as AsyncPage
+    from playwright.sync_api._generated import BrowserContext, Page
+
+
+LENT_TITLE_SELECTOR = "div.title > a > strong"
+RESERVE_TITLE_SELECTOR = "div.title > strong"
+RESERVE_CATEGORY_SELECTOR = "div.intro"
+BODY_SELECTOR = "div.matter"
+
+
+def build_lent_items(titles: List[str], bodies: List[str]) -> List[LentItem]:
+    """タイトルと本文（div.matter）のテキスト一覧から貸出中アイテムを組み立てる"""
+    titles = [t.replace("\u3000", " ") for t in titles]
+    contents = BaseLibraryReader._chunk(bodies, 6)
+
+    items = []
+    for t, d in zip(titles, contents):
+        _title = t
+        _category = d[0]
+        _checkout_location = d[1].replace("貸出館： ", "")
+        _checkout_date = d[2].replace("貸出日： ", "")
+        _return_date = d[3].replace("返却期日： ", "")
+        _reserved_count = (
+            int(d[4].replace("予約数： ", ""))
+            if d[4].replace("予約数： ", "").isnumeric()
+            else None
+        )
+        _extend_count = (
+            int(d[5].replace("延長回数： ", ""))
+            if d[5].replace("延長回数： ", "").isnumeric()
+            else None
+        )
+        _is_reserved = int(d[4].replace("予約数： ", "")) > 0
+        _is_extendable = _extend_count == 0 and not _is_reserved
+
+        items.append(
+            LentItem(
+                title=_title,
+                category=_category,
+                checkout_location=_checkout_location,
+                checkout_date=_checkout_date,
+                return_date=_return_date,
+                reserved_count=_reserved_count,
+                extend_count=_extend_count,
+                is_reserved=_is_reserved,
+                is_extendable=_is_extendable,
+            )
+        )
+
+    return items
+
+
+def build_reserve_items(
+    titles: List[str], categories: List[str], bodies: List[str]
+) -> List[ReserveItem]:
+    """タイトル・カテゴリ・本文のテキスト一覧から予約中アイテムを組み立てる"""
+    titles = [t.replace("\u3000", " ").lstrip() for t in titles]
+    contents = BaseLibraryReader._chunk(bodies, 7)
+
+    items = []
+    for _title, _category, content in zip(titles, categories, contents):
+        # 受取館の文字列にクレンジング後、要素数が1の場合は決定済み。そうでない場合は選択可能状態なので空白にする
+        _receive_location = re.sub(r"受取館: ?\n受取館\n", "", content[0])
+        if len(_receive_location.split("\n")) != 1:
+            _receive_location = "選択可"
+
+        # 連絡方法の文字列をクレンジング後、要素数が1の場合は決定済み。そうでない場合は選択可能状態なので空白にする
+        _notification_method = re.sub(r"連絡方法: ?\n連絡方法\n", "", content[1])
+        if len(_notification_method.split("\n")) != 1:
+            _notification_method = "選択可"
+        _reserve_date = content[2].replace("予約日:", "")
+        _reserve_rank = (
+            int(content[4].replace("予約順位:", ""))
+            if content[4].replace("予約順位:", "").isnumeric()
+            else None
+        )
+        _reserve_status = content[5].replace("予約状態:", "").replace(" ", "")
+        _reserve_expire_date = (
+            content[6].replace("取置期限:", "").replace(" ", "")
+            if content[6].replace("取置期限:", "").replace(" ", "")
+            else None
+        )
+        _is_canceled = (
+            False if _reserve_status in ("予約中です", "ご用意できました") else None
+        )
+
+        items.append(
+            ReserveItem(
+                title=_title,
+                category=_category,
+                receive_location=_receive_location,
+                notification_method=_notification_method,
+                reserve_date=_reserve_date,
+                reserve_rank=_reserve_rank,
+                reserve_status=_reserve_status,
+                reserve_expire_date=_reserve_expire_date,
+                is_canceled=_is_canceled,
+            )
+        )
+
+    return items
+
+
+def read_lent_texts(page: Page) -> Tuple[List[str], List[str]]:
+    """貸出中一覧の画面からタイトル・本文のテキスト一覧を読み取る"""
+    return (
+        page.locator(LENT_TITLE_SELECTOR).all_inner_texts(),
+        page.locator(BODY_SELECTOR).all_inner_texts(),
+    )
+
+
+def read_reserve_texts(page: Page) -> Tuple[List[str], List[str], List[str]]:
+    """予約中一覧の画面からタイトル・カテゴリ・本文のテキスト一覧を読み取る"""
+    return (
+        page.locator(RESERVE_TITLE_SELECTOR).all_inner_texts(),
+        page.locator(RESERVE_CATEGORY_SELECTOR).all_inner_texts(),
+        page.locator(BODY_SELECTOR).all_inner_texts(),
+    )
+
+
+async def read_lent_texts_async(page: AsyncPage) -> Tuple[List[str], List[str]]:
+    """read_lent_texts の asyncio 版"""
+    return (
+        await page.locator(LENT_TITLE_SELECTOR).all_inner_texts(),
+        await page.locator(BODY_SELECTOR).all_inner_texts(),
+    )
+
+
+async def read_reserve_texts_async(
+    page: AsyncPage,
+) -> Tuple[List[str], List[str], List[str]]:
+    """read_reserve_texts の asyncio 版"""
+    return (
+        await page.locator(RESERVE_TITLE_SELECTOR).all_inner_texts(),
+        await page.locator(RESERVE_CATEGORY_SELECTOR).all_inner_texts(),
+        await page.locator(BODY_SELECTOR).all_inner_texts(),
+    )
+
 
-from typing import List
+def parse_lent_html(html: Union[str, HtmlDocument]) -> List[LentItem]:
+    """貸出中一覧の HTML から貸出中アイテムを組み立てる"""
+    doc = as_document(html)
+    return build_lent_items(
+        doc.all_inner_texts(LENT_TITLE_SELECTOR),
+        doc.all_inner_texts(BODY_SELECTOR),
+    )
+
+
+def parse_reserve_html(html: Union[str, HtmlDocument]) -> List[ReserveItem]:
+    """予約中一覧の HTML から予約中アイテムを組み立てる"""
+    doc = as_document(html)
+    return build_reserve_items(
+        doc.all_inner_texts(RESERVE_TITLE_SELECTOR),
+        doc.all_inner_texts(RESERVE_CATEGORY_SELECTOR),
+        doc.all_inner_texts(BODY_SELECTOR),
+    )
 
 
 class MinatoLibraryReader(BaseLibraryReader):
+    AREA = "minato"
+    LOGGED_IN_SELECTOR = 'a[id="stat-lent"]'
+    URL = "https://www.lib.city.minato.tokyo.jp/licsxp-opac/WOpacSmtMnuTopAction.do"
+    # 画面構造がフォーム送信のみで完結するため HTTP エンジンを既定にする
+    ENGINES = ("http", "playwright")
+
     def _login(self, context: BrowserContext) -> Page:
         page = context.new_page()
-
-        URL = "https://www.lib.city.minato.tokyo.jp/licsxp-opac/WOpacSmtMnuTopAction.do"
-        page.goto(URL)
+        page.goto(self.URL)
 
         page.get_by_role("link", name="マイ図書館メニューを開きます").click()
         page.get_by_role("link", name="ログイン").click()
@@ -21,130 +188,99 @@ class MinatoLibraryReader(BaseLibraryReader):
         page.wait_for_load_state()
         return page
 
-    def _parse_lent(self, page: Page) -> List[LentItem]:
+    def _open_lent(self, page: Page) -> None:
         page.click('a[id="stat-lent"]')
 
-        try:
-            SELECTOR_TITLE = "div.title > a > strong"
-            SELECTOR_BODY = "div.matter"
-
-            page.wait_for_selector(SELECTOR_TITLE)
-            page.wait_for_selector(SELECTOR_BODY)
-        except Exception:
-            # 借りている本が無い場合は空リストを返す
-            return []
-
-        titles = [
-            t.replace("\u3000", " ")
-            for t in page.locator(SELECTOR_TITLE).all_inner_texts()
-        ]
-        tmp = page.locator(SELECTOR_BODY).all_inner_texts()
-        contents = self._chunk(tmp, 6)
-
-        items = []
-        for t, d in zip(titles, contents):
-            _title = t
-            _category = d[0]
-            _checkout_location = d[1].replace("貸出館： ", "")
-            _checkout_date = d[2].replace("貸出日： ", "")
-            _return_date = d[3].replace("返却期日： ", "")
-            _reserved_count = (
-                int(d[4].replace("予約数： ", ""))
-                if d[4].replace("予約数： ", "").isnumeric()
-                else None
-            )
-            _extend_count = (
-                int(d[5].replace("延長回数： ", ""))
-                if d[5].replace("延長回数： ", "").isnumeric()
-                else None
-            )
-            _is_reserved = int(d[4].replace("予約数： ", "")) > 0
-            _is_extendable = _extend_count == 0 and not _is_reserved
-
-            items.append(
-                LentItem(
-                    title=_title,
-                    category=_category,
-                    checkout_location=_checkout_location,
-                    checkout_date=_checkout_date,
-                    return_date=_return_date,
-                    reserved_count=_reserved_count,
-                    extend_count=_extend_count,
-                    is_reserved=_is_reserved,
-                    is_extendable=_is_extendable,
-                )
-            )
+    def _read_lent(self, page: Page) -> Iterator[LentItem]:
+        # 借りている本が無い場合は空表示を検出した時点で終える
+        for titles, bodies in self._pages(page, LENT_TITLE_SELECTOR, read_lent_texts):
+            with self.metrics.span("parse"):
+                items = build_lent_items(titles, bodies)
+            yield from items
 
-        return items
-
-    def _parse_reserve(self, page: Page) -> List[ReserveItem]:
+    def _open_reserve(self, page: Page) -> None:
         page.click('a[id="stat-resv"]')
 
-        try:
-            SELECTOR_TITLE = "div.title > strong"
-            SELECTOR_CATEGORY = "div.intro"
-            SELECTOR_BODY = "div.matter"
-
-            page.wait_for_selector(SELECTOR_TITLE)
-            page.wait_for_selector(SELECTOR_CATEGORY)
-            page.wait_for_selector(SELECTOR_BODY)
-
-        except Exception:
-            # 予約本が無い場合は空リストを返す
-            return []
-
-        titles = [
-            t.replace("\u3000", " ").lstrip()
-            for t in page.locator(SELECTOR_TITLE).all_inner_texts()
-        ]
-        categories = page.locator(SELECTOR_CATEGORY).all_inner_texts()
-        tmp = page.locator(SELECTOR_BODY).all_inner_texts()
-        contents = self._chunk(tmp, 7)
-
-        items = []
-        for _title, _category, content in zip(titles, categories, contents):
-            # 受取館の文字列にクレンジング後、要素数が1の場合は決定済み。そうでない場合は選択可能状態なので空白にする
-            _receive_location = (
-                content[0].replace("受取館: \n受取館\n", "")
-                if len(content[0].replace("受取館: \n受取館\n", "").split("\n")) == 1
-                else "選択可"
-            )
+    def _read_reserve(self, page: Page) -> Iterator[ReserveItem]:
+        # 予約本が無い場合は空表示を検出した時点で終える
+        for titles, categories, bodies in self._pages(
+            page, RESERVE_TITLE_SELECTOR, read_reserve_texts
+        ):
+            with self.metrics.span("parse"):
+                items = build_reserve_items(titles, categories, bodies)
+            yield from items
 
-            # 連絡方法の文字列をクレンジング後、要素数が1の場合は決定済み。そうでない場合は選択可能状態なので空白にする
-            _notification_method = (
-                content[1].replace("連絡方法: \n連絡方法\n", "")
-                if len(content[1].replace("連絡方法: \n連絡方法\n", "").split("\n"))
-                == 1
-                else "選択可"
-            )
-            _reserve_date = content[2].replace("予約日:", "")
-            _reserve_rank = (
-                int(content[4].replace("予約順位:", ""))
-                if content[4].replace("予約順位:", "").isnumeric()
-                else None
-            )
-            _reserve_status = content[5].replace("予約状態:", "").replace(" ", "")
-            _reserve_expire_date = (
-                content[6].replace("取置期限:", "").replace(" ", "")
-                if content[6].replace("取置期限:", "").replace(" ", "")
-                else None
-            )
-            _is_canceled = (
-                False if _reserve_status in ("予約中です", "ご用意できました") else None
-            )
+    def _http_login(self, client: HttpClient) -> HtmlDocument:
+        doc = client.get(self.URL)
+        doc = client.follow_link(doc, "ログイン")
+        return client.submit_login_form(doc, self.card, self.password)
 
-            items.append(
-                ReserveItem(
-                    title=_title,
-                    category=_category,
-                    receive_location=_receive_location,
-                    notification_method=_notification_method,
-                    reserve_date=_reserve_date,
-                    reserve_rank=_reserve_rank,
-                    reserve_status=_reserve_status,
-                    reserve_expire_date=_reserve_expire_date,
-                    is_canceled=_is_canceled,
-                )
-            )
+    def _http_open_lent(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> HtmlDocument:
+        return client.follow(doc, doc.select_one('a[id="stat-lent"]'))
+
+    def _http_read_lent(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> Iterator[LentItem]:
+        for page_doc in self._http_pages(client, doc):
+            with self.metrics.span("parse"):
+                items = parse_lent_html(page_doc)
+            yield from items
+
+    def _http_open_reserve(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> HtmlDocument:
+        return client.follow(doc, doc.select_one('a[id="stat-resv"]'))
+
+    def _http_read_reserve(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> Iterator[ReserveItem]:
+        for page_doc in self._http_pages(client, doc):
+            with self.metrics.span("parse"):
+                items = parse_reserve_html(page_doc)
+            yield from items
+
+
+class AsyncMinatoLibraryReader(AsyncBaseLibraryReader):
+    """MinatoLibraryReader の asyncio 版"""
+
+    SYNC_READER = MinatoLibraryReader
+
+    async def _login(self, context: AsyncBrowserContext) -> AsyncPage:
+        page = await context.new_page()
+        await page.goto(self.URL)
+
+        await page.get_by_role("link", name="マイ図書館メニューを開きます").click()
+        await page.get_by_role("link", name="ログイン").click()
+        await page.get_by_label("利用者番号").fill(self.card)
+        await page.get_by_label("パスワード").fill(self.password)
+        await page.get_by_role("button", name="ログイン").click()
+        await page.wait_for_load_state()
+        return page
+
+    async def _open_lent(self, page: AsyncPage) -> None:
+        await page.click('a[id="stat-lent"]')
+
+    async def _read_lent(self, page: AsyncPage) -> AsyncIterator[LentItem]:
+        # 借りている本が無い場合は空表示を検出した時点で終える
+        async for titles, bodies in self._pages(
+            page, LENT_TITLE_SELECTOR, read_lent_texts_async
+        ):
+            with self.metrics.span("parse"):
+                items = build_lent_items(titles, bodies)
+            for item in items:
+                yield item
+
+    async def _open_reserve(self, page: AsyncPage) -> None:
+        await page.click('a[id="stat-resv"]')
 
-        return items
+    async def _read_reserve(self, page: AsyncPage) -> AsyncIterator[ReserveItem]:
+        # 予約本が無い場合は空表示を検出した時点で終える
+        async for titles, categories, bodies in self._pages(
+            page, RESERVE_TITLE_SELECTOR, read_reserve_texts_async
+        ):
+            with self.metrics.span("parse"):
+                items = build_reserve_items(titles, categories, bodies)
+            for item in items:
+                yield item
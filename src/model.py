@@ -1,9 +1,45 @@
+import re
 from dataclasses import dataclass, field
 from datetime import date
-from dateutil import parser
+from typing import Any, Dict, Optional, Union
 
+# 年・月・日を任意の区切り文字（/ - . 年月日）で並べた日付
+_DATE_PATTERN = re.compile(r"(\d{4})\D(\d{1,2})\D(\d{1,2})")
 
-@dataclass
+
+def parse_date(value: Union[str, date, None]) -> Optional[date]:
+    """
+    OPAC の日付文字列を date に変換する。空文字・解釈できない値は None。
+    各区の画面は YYYY/MM/DD 形式のため、その形式は正規表現を使わずに変換する。
+    """
+    if value is None or isinstance(value, date):
+        return value
+
+    value = value.strip()
+    parts = value.split("/")
+    if len(parts) == 3 and all(p.isdigit() for p in parts):
+        year, month, day = parts
+    else:
+        m = _DATE_PATTERN.search(value)
+        if not m:
+            return None
+        year, month, day = m.groups()
+
+    # 2024/02/30 等の存在しない日付も None（1件の表示崩れで取得全体を失敗させない）
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def format_date(value: Optional[date]) -> Optional[str]:
+    """date を OPAC と同じ YYYY/MM/DD 形式の文字列にする"""
+    if value is None:
+        return None
+    return f"{value.year:04d}/{value.month:02d}/{value.day:02d}"
+
+
+@dataclass(slots=True)
 class LentItem:
     """
     貸出中のアイテムを表すデータクラス。
@@ -12,8 +48,8 @@ class LentItem:
         title (str): アイテムのタイトル（書籍名など）。
         category (str): アイテムのカテゴリ（本、DVDなど）。
         checkout_location (str): 貸出場所（図書館名など）。
-        checkout_date (str): 貸出日（文字列形式）。
-        return_date (str): 返却期限日（文字列形式）。
+        checkout_date (date): 貸出日（文字列を渡した場合は生成時に変換）。
+        return_date (date): 返却期限日（文字列を渡した場合は生成時に変換）。
         reserved_count (int): 他の利用者による予約件数。
         is_extendable (bool): 延長可能かどうか。
         extend_count (int): 延長した回数。
@@ -22,25 +58,43 @@ class LentItem:
     title: str = field(default=None)
     category: str = field(default=None)
     checkout_location: str = field(default=None)
-    checkout_date: str = field(default=None)
-    return_date: str = field(default=None)
+    checkout_date: Optional[date] = field(default=None)
+    return_date: Optional[date] = field(default=None)
     reserved_count: int = field(default=None)
     is_reserved: bool = field(default=None)
     extend_count: int = field(default=None)
     is_extendable: bool = field(default=None)
 
+    def __post_init__(self) -> None:
+        self.checkout_date = parse_date(self.checkout_date)
+        self.return_date = parse_date(self.return_date)
+
     @property
     def is_expired(self) -> bool:
         """
         返却期限が過ぎているかどうかを判定する。
 
         Returns:
-            bool: 期限切れの場合は True、まだ期限内の場合は False。
+            bool: 期限切れの場合は True、まだ期限内（または期限不明）の場合は False。
         """
-        return parser.parse(self.return_date).date() < date.today()
+        return self.return_date is not None and self.return_date < date.today()
 
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON に変換できる dict を返す（日付は YYYY/MM/DD 形式の文字列）"""
+        return {
+            "title": self.title,
+            "category": self.category,
+            "checkout_location": self.checkout_location,
+            "checkout_date": format_date(self.checkout_date),
+            "return_date": format_date(self.return_date),
+            "reserved_count": self.reserved_count,
+            "is_reserved": self.is_reserved,
+            "extend_count": self.extend_count,
+            "is_extendable": self.is_extendable,
+        }
 
-@dataclass
+
+@dataclass(slots=True)
 class ReserveItem:
     """
     予約中のアイテムを表すデータクラス。
@@ -50,20 +104,39 @@ class ReserveItem:
         category (str): アイテムのカテゴリ（本、DVDなど）。
         receive_location (str): 受取場所（図書館名など）。
         notification_method (str): 通知方法（メール、電話など）。
-        reserve_date (str): 予約日（文字列形式）。
-        reserve_rank (str): 予約順位（何番目に受け取れるか）。
+        reserve_date (date): 予約日（文字列を渡した場合は生成時に変換）。
+        reserve_rank (Union[int, str]): 予約順位（何番目に受け取れるか。区により数値か文字列）。
         reserve_status (str): 予約の状態（受付中、準備中など）。
         reserve_cancel_reason (str): 予約キャンセル理由（キャンセルされた場合）。
-        reserve_expire_date (str): 予約の有効期限日（文字列形式）。
+        reserve_expire_date (date): 予約の有効期限日（文字列を渡した場合は生成時に変換）。
     """
 
     title: str = field(default=None)
     category: str = field(default=None)
     receive_location: str = field(default=None)
     notification_method: str = field(default=None)
-    reserve_date: str = field(default=None)
-    reserve_rank: str = field(default=None)
+    reserve_date: Optional[date] = field(default=None)
+    reserve_rank: Union[int, str] = field(default=None)
     reserve_status: str = field(default=None)
     reserve_cancel_reason: str = field(default=None)
-    reserve_expire_date: str = field(default=None)
+    reserve_expire_date: Optional[date] = field(default=None)
     is_canceled: bool = field(default=None)
+
+    def __post_init__(self) -> None:
+        self.reserve_date = parse_date(self.reserve_date)
+        self.reserve_expire_date = parse_date(self.reserve_expire_date)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON に変換できる dict を返す（日付は YYYY/MM/DD 形式の文字列）"""
+        return {
+            "title": self.title,
+            "category": self.category,
+            "receive_location": self.receive_location,
+            "notification_method": self.notification_method,
+            "reserve_date": format_date(self.reserve_date),
+            "reserve_rank": self.reserve_rank,
+            "reserve_status": self.reserve_status,
+            "reserve_cancel_reason": self.reserve_cancel_reason,
+            "reserve_expire_date": format_date(self.reserve_expire_date),
+            "is_canceled": self.is_canceled,
+        }
@@ -1,9 +1,130 @@
+from __future__ import annotations
+
+from html_dom import HtmlDocument, as_document
+from http_engine import HttpClient
+from async_library_reader import AsyncBaseLibraryReader
 from library_reader import BaseLibraryReader
 from model import LentItem, ReserveItem
 
-from playwright.sync_api._generated import BrowserContext, Page
+import re
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, List, Union
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext as AsyncBrowserContext
+    from playwright.async_api import Page as AsyncPage
+    from playwright.sync_api._generated import BrowserContext, Page
+
+
+LENT_SELECTOR = "#main > form:nth-child(2) > fieldset > div > table > tbody > tr > td"
+RESERVE_SELECTOR = (
+    "#main > form:nth-child(7) > fieldset > div > table > tbody > tr > td"
+)
+# 貸出アイテムの構成要素数
+LENT_UNIT = 10
+# 予約アイテムの構成要素数
+RESERVE_UNIT = 8
+# 予約1件のうち状態のセルから続くセルの数
+# （状態・予約日/順位・受取館・タイトル・取置期限・連絡方法）
+RESERVE_FIELDS = 6
+# 予約の状態のセルに表示される文言（これ以外の状態も行の並びから判定する）
+RESERVE_STATUSES = frozenset({"予約中", "取置済", "回送中"})
+# 予約日のセルの先頭
+RESERVE_DATE = re.compile(r"\d{4}/\d{1,2}/\d{1,2}")
+
+
+def build_lent_items(elements: List[str]) -> List[LentItem]:
+    """貸出中一覧のセル（td）テキスト一覧から貸出中アイテムを組み立てる"""
+    # タブ除去＋改行分割
+    elements = [e.replace("\t", "").strip().split("\n") for e in elements]
+    rows = [elements[i : i + LENT_UNIT] for i in range(0, len(elements), LENT_UNIT)]
+
+    items: List[LentItem] = []
+    for row in rows:
+        _title = "".join(row[2])
+        _is_reserved = len(row[8][0]) > 0
+        _checkout_location = row[5][0]
+        _checkout_date = row[3][0]
+        _return_date = row[4][0]
+        _is_extendable = "貸出延長" in row[9][0]
+        _extend_count = 0 if _is_extendable else 1
+
+        items.append(
+            LentItem(
+                title=_title,
+                # category="",
+                checkout_location=_checkout_location,
+                checkout_date=_checkout_date,
+                return_date=_return_date,
+                # reserved_count="",
+                is_extendable=_is_extendable,
+                extend_count=_extend_count,
+                is_reserved=_is_reserved,
+            )
+        )
+    return items
+
+
+def _is_reserve_anchor(cells: List[str], i: int) -> bool:
+    """
+    cells[i] が予約1件分の先頭（状態のセル）か。
+    既知の状態のほか、行番号の直後で予約日が続くセルも状態とみなす（未知の状態に備える）。
+    """
+    if i + 1 >= len(cells) or not cells[i] or not RESERVE_DATE.match(cells[i + 1]):
+        return False
+    if cells[i] in RESERVE_STATUSES:
+        return True
+    return i > 0 and cells[i - 1].isdigit()
+
+
+def build_reserve_items(elements: List[str]) -> List[ReserveItem]:
+    """
+    予約中一覧のセル（td）テキスト一覧から予約中アイテムを組み立てる。
+    セルを先頭から1回だけ走査し、状態のセルを起点に続く RESERVE_FIELDS 個を1件とする。
+    1件分のセルが足りない行は読み飛ばす。
+    """
+    cells = [e.replace("\t", "").strip() for e in elements]
+
+    items: List[ReserveItem] = []
+    i = 0
+    while i < len(cells):
+        if not _is_reserve_anchor(cells, i):
+            i += 1
+            continue
+
+        row = [c.split("\n") for c in cells[i : i + RESERVE_FIELDS]]
+        i += RESERVE_FIELDS
+        if len(row) < RESERVE_FIELDS:
+            break
+        status, dates, location, title, expire_date, notification = row
+
+        items.append(
+            ReserveItem(
+                title="".join(title),
+                # category="",
+                receive_location=location[1] if len(location) > 1 else location[0],
+                notification_method=(
+                    notification[1] if len(notification) > 1 else notification[0]
+                ),
+                reserve_date=dates[0],
+                reserve_rank=dates[2] if len(dates) == 3 else "",
+                reserve_status=status[0],
+                # reserve_cancel_reason="",
+                reserve_expire_date=expire_date[0],
+                is_canceled=None,
+            )
+        )
+
+    return items
+
+
+def parse_lent_html(html: Union[str, HtmlDocument]) -> List[LentItem]:
+    """貸出中一覧の HTML から貸出中アイテムを組み立てる"""
+    return build_lent_items(as_document(html).all_inner_texts(LENT_SELECTOR))
 
-from typing import List
+
+def parse_reserve_html(html: Union[str, HtmlDocument]) -> List[ReserveItem]:
+    """予約中一覧の HTML から予約中アイテムを組み立てる"""
+    return build_reserve_items(as_document(html).all_inner_texts(RESERVE_SELECTOR))
 
 
 class NakanoLibraryReader(BaseLibraryReader):
@@ -11,11 +132,11 @@ class NakanoLibraryReader(BaseLibraryReader):
     中野区立図書館のWebサイトから貸出中・予約中の資料情報を取得するクラス。
     """
 
+    AREA = "nakano"
+    LOGGED_IN_SELECTOR = 'a:has-text("●貸出中一覧")'
     URL = "https://www.kn.licsre-saas.jp/tokyo-nakano/webopac/usermenu.do?target=adult/"
-    # 貸出アイテムの構成要素数
-    LENT_UNIT = 10
-    # 予約アイテムの構成要素数
-    RESERVE_UNIT = 8
+    # 画面構造がフォーム送信のみで完結するため HTTP エンジンを既定にする
+    ENGINES = ("http", "playwright")
 
     def _login(self, context: BrowserContext) -> Page:
         page: Page = context.new_page()
@@ -27,108 +148,98 @@ class NakanoLibraryReader(BaseLibraryReader):
 
         return page
 
-    def _parse_lent(self, page: Page) -> List[LentItem]:
+    def _open_lent(self, page: Page) -> None:
         page.get_by_role("link", name="●貸出中一覧").click()
 
-        _locator = (
-            "#main > form:nth-child(2) > fieldset > div > table > tbody > tr > td"
-        )
-        page.wait_for_selector(_locator)
-
-        elements: List[str] = page.locator(_locator).all_inner_texts()
-
-        # タブ除去＋改行分割
-        elements = [e.replace("\t", "").strip().split("\n") for e in elements]
-        rows = [
-            elements[i : i + self.LENT_UNIT]
-            for i in range(0, len(elements), self.LENT_UNIT)
-        ]
-
-        items: List[LentItem] = []
-        for row in rows:
-            _title = "".join(row[2])
-            _is_reserved = len(row[8][0]) > 0
-            _checkout_location = row[5][0]
-            _checkout_date = row[3][0]
-            _return_date = row[4][0]
-            _is_extendable = "貸出延長" in row[9][0]
-            _extend_count = 0 if _is_extendable else 1
-
-            items.append(
-                LentItem(
-                    title=_title,
-                    # category="",
-                    checkout_location=_checkout_location,
-                    checkout_date=_checkout_date,
-                    return_date=_return_date,
-                    # reserved_count="",
-                    is_extendable=_is_extendable,
-                    extend_count=_extend_count,
-                    is_reserved=_is_reserved,
-                )
-            )
-        return items
+    def _read_lent(self, page: Page) -> Iterator[LentItem]:
+        for elements in self._pages(
+            page, LENT_SELECTOR, lambda p: p.locator(LENT_SELECTOR).all_inner_texts()
+        ):
+            with self.metrics.span("parse"):
+                items = build_lent_items(elements)
+            yield from items
 
-    def _parse_reserve(self, page: Page) -> List[ReserveItem]:
+    def _open_reserve(self, page: Page) -> None:
         page.get_by_role("link", name="●予約中一覧").click()
 
-        _locator = (
-            "#main > form:nth-child(7) > fieldset > div > table > tbody > tr > td"
-        )
-        page.wait_for_selector(_locator)
-
-        elements: List[str] = page.locator(_locator).all_inner_texts()
-
-        elements = [e.replace("\t", "").strip().split("\n") for e in elements]
-
-        items: List[ReserveItem] = []
-
-        i = 0
-        while i < len(elements):
-            parse_elements = []
-            if elements[i][0] and elements[i][0] in ("予約中", "取置済"):
-                # 予約中または取り置き済みの場合は、i-1 から i+6 までの要素を取得する
-                parse_elements = elements[i - 1 : i + 7]
-
-            elif elements[i][0] and elements[i][0] in ("回送中"):
-                # 回送中の場合は、i-2 から i+6 までの要素を取得し、1番目の要素を削除する
-                del elements[i - 1]
-                i = i - 1
-
-                parse_elements = elements[i - 1 : i + 7]
-
-            if parse_elements:
-                # print(i, elements[i], parse_elements)
-
-                _title = "".join(parse_elements[4])
-                _receive_location = parse_elements[3][1]
-                _notification_method = (
-                    parse_elements[6][0]
-                    if len(parse_elements[6]) == 1
-                    else parse_elements[6][1]
-                )
-                _reserve_date = parse_elements[2][0]
-                _reserve_rank = (
-                    parse_elements[2][2] if len(parse_elements[2]) == 3 else ""
-                )
-                _reserve_status = parse_elements[1][0]
-                _reserve_expire_date = parse_elements[5][0]
-
-                items.append(
-                    ReserveItem(
-                        title=_title,
-                        # category="",
-                        receive_location=_receive_location,
-                        notification_method=_notification_method,
-                        reserve_date=_reserve_date,
-                        reserve_rank=_reserve_rank,
-                        reserve_status=_reserve_status,
-                        # reserve_cancel_reason="",
-                        reserve_expire_date=_reserve_expire_date,
-                        is_canceled=None,
-                    )
-                )
+    def _read_reserve(self, page: Page) -> Iterator[ReserveItem]:
+        for elements in self._pages(
+            page,
+            RESERVE_SELECTOR,
+            lambda p: p.locator(RESERVE_SELECTOR).all_inner_texts(),
+        ):
+            with self.metrics.span("parse"):
+                items = build_reserve_items(elements)
+            yield from items
+
+    def _http_login(self, client: HttpClient) -> HtmlDocument:
+        doc = client.get(self.URL)
+        return client.submit_login_form(doc, self.card, self.password)
+
+    def _http_open_lent(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> HtmlDocument:
+        return client.follow_link(doc, "●貸出中一覧")
+
+    def _http_read_lent(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> Iterator[LentItem]:
+        for page_doc in self._http_pages(client, doc):
+            with self.metrics.span("parse"):
+                items = parse_lent_html(page_doc)
+            yield from items
+
+    def _http_open_reserve(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> HtmlDocument:
+        return client.follow_link(doc, "●予約中一覧")
+
+    def _http_read_reserve(
+        self, client: HttpClient, doc: HtmlDocument
+    ) -> Iterator[ReserveItem]:
+        for page_doc in self._http_pages(client, doc):
+            with self.metrics.span("parse"):
+                items = parse_reserve_html(page_doc)
+            yield from items
+
+
+class AsyncNakanoLibraryReader(AsyncBaseLibraryReader):
+    """NakanoLibraryReader の asyncio 版"""
+
+    SYNC_READER = NakanoLibraryReader
+
+    async def _login(self, context: AsyncBrowserContext) -> AsyncPage:
+        page = await context.new_page()
+        await page.goto(self.URL)
+
+        await page.get_by_label("利用者番号").fill(self.card)
+        await page.get_by_label("パスワード").fill(self.password)
+        await page.get_by_role("button", name="ログインする").click()
 
-            i += 1
+        return page
 
-        return items
+    async def _open_lent(self, page: AsyncPage) -> None:
+        await page.get_by_role("link", name="●貸出中一覧").click()
+
+    async def _read_lent(self, page: AsyncPage) -> AsyncIterator[LentItem]:
+        async for elements in self._pages(
+            page, LENT_SELECTOR, lambda p: p.locator(LENT_SELECTOR).all_inner_texts()
+        ):
+            with self.metrics.span("parse"):
+                items = build_lent_items(elements)
+            for item in items:
+                yield item
+
+    async def _open_reserve(self, page: AsyncPage) -> None:
+        await page.get_by_role("link", name="●予約中一覧").click()
+
+    async def _read_reserve(self, page: AsyncPage) -> AsyncIterator[ReserveItem]:
+        async for elements in self._pages(
+            page,
+            RESERVE_SELECTOR,
+            lambda p: p.locator(RESERVE_SELECTOR).all_inner_texts(),
+        ):
+            with self.metrics.span("parse"):
+                items = build_reserve_items(elements)
+            for item in items:
+                yield item
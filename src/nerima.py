@@ -1,9 +1,118 @@
+from __future__ import annotations
+
+from async_library_reader import AsyncBaseLibraryReader
+from html_dom import HtmlDocument, as_document
 from library_reader import BaseLibraryReader
 from model import LentItem, ReserveItem
 
-from playwright.sync_api._generated import BrowserContext, Page
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, List, Union
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext as AsyncBrowserContext
+    from playwright.async_api import Page as AsyncPage
+    from playwright.sync_api._generated import BrowserContext, Page
+
+
+# テーブルの全行のセル（td）テキストを1回の呼び出しでまとめて取得する
+ROWS_SCRIPT = """
+(selector) => Array.from(document.querySelectorAll(selector)).map((tr) =>
+    Array.from(tr.children)
+        .filter((cell) => cell.tagName === "TD")
+        .map((td) => td.innerText)
+)
+"""
+
+LENT_ROWS_SELECTOR = "#ContentLend > form > div > table > tbody > tr"
+RESERVE_ROWS_SELECTOR = "#ContentRsv > form > div > table > tbody > tr"
+
+
+def build_lent_item(elements_upper: List[str], elements_lower: List[str]) -> LentItem:
+    """貸出中一覧の1件分（上段・下段の2行）のセルテキストから貸出中アイテムを組み立てる"""
+    _title = elements_upper[2]
+    _category = elements_upper[3]
+    _checkout_location = elements_upper[5]
+    _checkout_date = elements_upper[6]
+    _return_date = elements_upper[7]
+    _is_extendable = True if "延長" == elements_upper[1] else False
+    _extend_count = 1 if "すでに延長されています" in elements_upper[1] else 0
+    _is_reserved = True if "予約待ちあり" in elements_lower[1].strip() else False
+
+    return LentItem(
+        title=_title,
+        category=_category,
+        checkout_location=_checkout_location,
+        checkout_date=_checkout_date,
+        return_date=_return_date,
+        is_extendable=_is_extendable,
+        extend_count=_extend_count,
+        is_reserved=_is_reserved,
+    )
+
+
+def build_reserve_item(elements: List[str]) -> ReserveItem:
+    """予約中一覧の1行分のセルテキストから予約中アイテムを組み立てる"""
+    _reserve_status = elements[1].replace("\n", "")
+    _reserve_rank = (
+        int(elements[2].split(" ")[0])
+        if elements[2].split(" ")[0].isnumeric()
+        else None
+    )
+    _title = elements[3].strip()
+    _category = elements[4]
+    _reserve_date = elements[6]
+    _reserve_expire_date = (
+        elements[7].replace("\u00a0", "")
+        if elements[7].replace("\u00a0", "")
+        else None
+    )
+    _receive_location = elements[9]
+    _notification_method = elements[10]
+
+    _is_canceled = (
+        False
+        if _reserve_status in ("予約解除可能", "移送中です", "ご用意できました")
+        else None
+    )
+    return ReserveItem(
+        reserve_status=_reserve_status,
+        reserve_rank=_reserve_rank,
+        title=_title,
+        category=_category,
+        reserve_date=_reserve_date,
+        reserve_expire_date=_reserve_expire_date,
+        receive_location=_receive_location,
+        notification_method=_notification_method,
+        is_canceled=_is_canceled,
+    )
+
+
+def build_lent_items(rows: List[List[str]]) -> List[LentItem]:
+    """
+    貸出中一覧の全行のセルテキストから貸出中アイテムを組み立てる。
+    1行目は見出し、以降は上段・下段の2行で1件。
+    """
+    items: List[LentItem] = []
+    for i in range(1, len(rows), 2):
+        elements_upper = rows[i]
+        elements_lower = rows[i + 1] if i + 1 < len(rows) else []
+        if elements_upper:
+            items.append(build_lent_item(elements_upper, elements_lower))
+    return items
+
+
+def build_reserve_items(rows: List[List[str]]) -> List[ReserveItem]:
+    """予約中一覧の全行のセルテキストから予約中アイテムを組み立てる（見出し行は読み飛ばす）"""
+    return [build_reserve_item(elements) for elements in rows if elements]
 
-from typing import List
+
+def parse_lent_html(html: Union[str, HtmlDocument]) -> List[LentItem]:
+    """貸出中一覧の HTML から貸出中アイテムを組み立てる"""
+    return build_lent_items(as_document(html).table_rows(LENT_ROWS_SELECTOR))
+
+
+def parse_reserve_html(html: Union[str, HtmlDocument]) -> List[ReserveItem]:
+    """予約中一覧の HTML から予約中アイテムを組み立てる"""
+    return build_reserve_items(as_document(html).table_rows(RESERVE_ROWS_SELECTOR))
 
 
 class NerimaLibraryReader(BaseLibraryReader):
@@ -11,13 +120,16 @@ class NerimaLibraryReader(BaseLibraryReader):
     練馬区立図書館のWebサイトから貸出中・予約中の資料情報を取得するクラス。
     """
 
-    MAX_ROWS = 20  # テーブルの最大行数目安
+    AREA = "nerima"
+    LOGGED_IN_SELECTOR = "#ContentLend-tab"
+    URL = "https://www.lib.nerima.tokyo.jp/"
+    # 貸出中・予約中が同じ画面のタブで、画面を開いた時点で両方とも読み込まれているため、
+    # 2つ目のページを開いても速くならない
+    PARALLEL_TABS = False
 
     def _login(self, context: BrowserContext) -> Page:
         page: Page = context.new_page()
-
-        URL = "https://www.lib.nerima.tokyo.jp/"
-        page.goto(URL)
+        page.goto(self.URL)
 
         page.get_by_role("link", name="利用者ログイン").click()
         page.get_by_placeholder("利用者ID").fill(self.card)
@@ -27,98 +139,84 @@ class NerimaLibraryReader(BaseLibraryReader):
 
         return page
 
-    def _parse_lent(self, page: Page) -> List[LentItem]:
+    def _open_lent(self, page: Page) -> None:
         page.click("#ContentLend-tab")
         page.wait_for_load_state()
 
-        items: List[LentItem] = []
-        for i in range(1, self.MAX_ROWS):
-            SELECTOR_UPPER = f"#ContentLend > form > div > table > tbody > tr:nth-child({i * 2}) > td"
-            SELECTOR_LOWER = f"#ContentLend > form > div > table > tbody > tr:nth-child({i * 2 + 1}) > td"
-
-            elements_upper: List[str] = page.locator(SELECTOR_UPPER).all_inner_texts()
-            elements_lower: List[str] = page.locator(SELECTOR_LOWER).all_inner_texts()
-
-            # print("elements:", elements_upper)
-            # print("elements:", elements_lower)
-
-            if elements_upper:
-                _title = elements_upper[2]
-                _category = elements_upper[3]
-                _checkout_location = elements_upper[5]
-                _checkout_date = elements_upper[6]
-                _return_date = elements_upper[7]
-                _is_extendable = True if "延長" == elements_upper[1] else False
-                _extend_count = (
-                    1 if "すでに延長されています" in elements_upper[1] else 0
-                )
-                _is_reserved = (
-                    True if "予約待ちあり" in elements_lower[1].strip() else False
-                )
-
-                items.append(
-                    LentItem(
-                        title=_title,
-                        category=_category,
-                        checkout_location=_checkout_location,
-                        checkout_date=_checkout_date,
-                        return_date=_return_date,
-                        is_extendable=_is_extendable,
-                        extend_count=_extend_count,
-                        is_reserved=_is_reserved,
-                    )
-                )
-
-                # print(items[-1])
-        return items
-
-    def _parse_reserve(self, page: Page) -> List[ReserveItem]:
+    def _read_lent(self, page: Page) -> Iterator[LentItem]:
+        # 貸出中・予約中が同じ画面のタブなので、ページ送りはタブの中から探す
+        for rows in self._pages(
+            page,
+            LENT_ROWS_SELECTOR,
+            lambda p: p.evaluate(ROWS_SCRIPT, LENT_ROWS_SELECTOR),
+            pager="#ContentLend",
+        ):
+            with self.metrics.span("parse"):
+                items = build_lent_items(rows)
+            yield from items
+
+    def _open_reserve(self, page: Page) -> None:
         page.click("#ContentRsv-tab")
         page.wait_for_load_state()
 
-        items: List[ReserveItem] = []
-        for i in range(1, self.MAX_ROWS):
-            SELECTOR = (
-                f"#ContentRsv > form > div > table > tbody > tr:nth-child({i}) > td"
-            )
-
-            elements: List[str] = page.locator(SELECTOR).all_inner_texts()
-
-            if elements:
-                _reserve_status = elements[1].replace("\n", "")
-                _reserve_rank = (
-                    int(elements[2].split(" ")[0])
-                    if elements[2].split(" ")[0].isnumeric()
-                    else None
-                )
-                _title = elements[3].strip()
-                _category = elements[4]
-                _reserve_date = elements[6]
-                _reserve_expire_date = (
-                    elements[7].replace("\u00a0", "")
-                    if elements[7].replace("\u00a0", "")
-                    else None
-                )
-                _receive_location = elements[9]
-                _notification_method = elements[10]
-
-                _is_canceled = (
-                    False
-                    if _reserve_status
-                    in ("予約解除可能", "移送中です", "ご用意できました")
-                    else None
-                )
-                items.append(
-                    ReserveItem(
-                        reserve_status=_reserve_status,
-                        reserve_rank=_reserve_rank,
-                        title=_title,
-                        category=_category,
-                        reserve_date=_reserve_date,
-                        reserve_expire_date=_reserve_expire_date,
-                        receive_location=_receive_location,
-                        notification_method=_notification_method,
-                        is_canceled=_is_canceled,
-                    )
-                )
-        return items
+    def _read_reserve(self, page: Page) -> Iterator[ReserveItem]:
+        for rows in self._pages(
+            page,
+            RESERVE_ROWS_SELECTOR,
+            lambda p: p.evaluate(ROWS_SCRIPT, RESERVE_ROWS_SELECTOR),
+            pager="#ContentRsv",
+        ):
+            with self.metrics.span("parse"):
+                items = build_reserve_items(rows)
+            yield from items
+
+
+class AsyncNerimaLibraryReader(AsyncBaseLibraryReader):
+    """NerimaLibraryReader の asyncio 版"""
+
+    SYNC_READER = NerimaLibraryReader
+
+    async def _login(self, context: AsyncBrowserContext) -> AsyncPage:
+        page = await context.new_page()
+        await page.goto(self.URL)
+
+        await page.get_by_role("link", name="利用者ログイン").click()
+        await page.get_by_placeholder("利用者ID").fill(self.card)
+        await page.get_by_placeholder("パスワード").fill(self.password)
+        await page.get_by_role("button", name="送信").click()
+        await page.wait_for_load_state()
+
+        return page
+
+    async def _open_lent(self, page: AsyncPage) -> None:
+        await page.click("#ContentLend-tab")
+        await page.wait_for_load_state()
+
+    async def _read_lent(self, page: AsyncPage) -> AsyncIterator[LentItem]:
+        # 貸出中・予約中が同じ画面のタブなので、ページ送りはタブの中から探す
+        async for rows in self._pages(
+            page,
+            LENT_ROWS_SELECTOR,
+            lambda p: p.evaluate(ROWS_SCRIPT, LENT_ROWS_SELECTOR),
+            pager="#ContentLend",
+        ):
+            with self.metrics.span("parse"):
+                items = build_lent_items(rows)
+            for item in items:
+                yield item
+
+    async def _open_reserve(self, page: AsyncPage) -> None:
+        await page.click("#ContentRsv-tab")
+        await page.wait_for_load_state()
+
+    async def _read_reserve(self, page: AsyncPage) -> AsyncIterator[ReserveItem]:
+        async for rows in self._pages(
+            page,
+            RESERVE_ROWS_SELECTOR,
+            lambda p: p.evaluate(ROWS_SCRIPT, RESERVE_ROWS_SELECTOR),
+            pager="#ContentRsv",
+        ):
+            with self.metrics.span("parse"):
+                items = build_reserve_items(rows)
+            for item in items:
+                yield item
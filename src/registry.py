@@ -0,0 +1,112 @@
+"""
+区の識別子からリーダーのクラスを引くためのレジストリ。
+- AREA を定義した BaseLibraryReader のサブクラス（と対応する asyncio 版）は定義時に自動で登録される
+- 区のモジュールは初めて要求された時点で import する（同梱の区は _BUILTIN_MODULES、
+  追加の区はエントリポイント library_reader.readers から探す）
+- 各区の対応エンジン・同時アクセス数・キャッシュ有効期間・メンテナンス時間帯は
+  リーダーのクラス属性で宣言する
+"""
+
+import importlib
+import importlib.util
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence
+
+# 追加の区を提供するパッケージが宣言するエントリポイントのグループ（名前 = 区の識別子、値 = モジュール）
+ENTRY_POINT_GROUP = "library_reader.readers"
+
+# 同梱の区のリーダーを定義しているモジュール
+_BUILTIN_MODULES: Dict[str, str] = {
+    "minato": "minato",
+    "nakano": "nakano",
+    "nerima": "nerima",
+    "suginami": "suginami",
+}
+
+# 取得エンジンごとに必要なパッケージ
+ENGINE_DEPENDENCIES: Dict[str, str] = {
+    "http": "requests",
+    "playwright": "playwright",
+}
+
+_readers: Dict[str, type] = {}
+_async_readers: Dict[str, type] = {}
+
+
+def register(reader: type) -> type:
+    """リーダーを登録する（BaseLibraryReader.__init_subclass__ から呼ばれる）"""
+    _readers[reader.AREA] = reader
+    return reader
+
+
+def register_async(reader: type) -> type:
+    """asyncio 版のリーダーを登録する（AsyncBaseLibraryReader.__init_subclass__ から呼ばれる）"""
+    _async_readers[reader.SYNC_READER.AREA] = reader
+    return reader
+
+
+@lru_cache(maxsize=None)
+def _entry_point_modules() -> Dict[str, str]:
+    # importlib.metadata は import に時間がかかるため、同梱以外の区を探す時点で読み込む
+    from importlib import metadata
+
+    return {ep.name: ep.module for ep in metadata.entry_points(group=ENTRY_POINT_GROUP)}
+
+
+def _load(area: str) -> None:
+    """区のモジュールを import して、リーダーを登録させる"""
+    module = _BUILTIN_MODULES.get(area) or _entry_point_modules().get(area)
+    if module is None:
+        raise ValueError(f"未対応の区です: {area}")
+    importlib.import_module(module)
+
+
+def get_reader(area: str) -> type:
+    """区のリーダーのクラスを返す。未読み込みの場合はモジュールを import する"""
+    if area not in _readers:
+        _load(area)
+    if area not in _readers:
+        raise ValueError(f"リーダーが登録されていません: {area}")
+    return _readers[area]
+
+
+def get_async_reader(area: str) -> type:
+    """区の asyncio 版リーダーのクラスを返す。未読み込みの場合はモジュールを import する"""
+    if area not in _async_readers:
+        _load(area)
+    if area not in _async_readers:
+        raise ValueError(f"asyncio 版のリーダーが登録されていません: {area}")
+    return _async_readers[area]
+
+
+def areas() -> List[str]:
+    """利用できる区の識別子の一覧（モジュールは import しない）"""
+    return sorted({*_BUILTIN_MODULES, *_entry_point_modules(), *_readers})
+
+
+def capabilities(area: str) -> Dict[str, Any]:
+    """区のリーダーが宣言している対応エンジン・同時アクセス数・キャッシュ有効期間等"""
+    reader = get_reader(area)
+    return {
+        "engines": list(reader.ENGINES),
+        "default_engine": select_engine(reader.ENGINES),
+        "max_concurrency": reader.MAX_CONCURRENCY,
+        "cache_ttl": reader.CACHE_TTL,
+        "maintenance_windows": [list(w) for w in reader.MAINTENANCE_WINDOWS],
+    }
+
+
+@lru_cache(maxsize=None)
+def _is_installed(package: str) -> bool:
+    return importlib.util.find_spec(package) is not None
+
+
+def select_engine(engines: Sequence[str]) -> str:
+    """
+    リーダーが対応するエンジンのうち、必要なパッケージが導入済みのものを優先順に選ぶ。
+    どれも導入されていない場合は先頭のエンジンを返す（取得時に ImportError になる）。
+    """
+    for engine in engines:
+        if _is_installed(ENGINE_DEPENDENCIES.get(engine, engine)):
+            return engine
+    return engines[0]
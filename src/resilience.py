@@ -0,0 +1,270 @@
+"""
+OPAC へのアクセスの一時的な失敗に備える再試行と、区ごとのサーキットブレーカー。
+- RetryPolicy: 失敗したフェーズ（ログイン・画面遷移）をジッター付きの指数バックオフで再試行する
+- CircuitBreaker: 連続して失敗した区、または夜間メンテナンス中の区へのアクセスを止め、
+  CircuitOpenError ですぐに失敗させる（呼び出し側はキャッシュを返せる）
+- ブレーカーの状態はプロセス内で共有する（ウォームコンテナ内でのみ有効）
+"""
+
+import logging
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+JST = timezone(timedelta(hours=9))
+
+# ブレーカーの状態
+CLOSED = "closed"  # 通常どおりアクセスする
+OPEN = "open"  # 失敗が続いているためアクセスしない
+HALF_OPEN = "half_open"  # 待機時間を過ぎたため、1回だけ試しにアクセスする
+
+# 一時的な失敗とみなす HTTP ステータス
+_TRANSIENT_STATUS = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(Exception):
+    """区の OPAC が停止中・メンテナンス中のため、アクセスせずに失敗させる場合の例外"""
+
+    def __init__(self, area: str, retry_after: float, reason: str) -> None:
+        super().__init__(f"{area}: {reason}（{int(retry_after)}秒後に再開）")
+        self.area: str = area
+        self.retry_after: float = retry_after
+
+
+class LoginError(Exception):
+    """
+    利用者番号・パスワードの誤り等でログインできなかった場合の例外。
+    OPAC は応答しているため、再試行・別エンジンでの取得はせず（アカウントのロックを避ける）、
+    サーキットブレーカーの失敗にも数えない
+    """
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    再試行で回復しうる、OPAC 側の失敗か（接続エラー・接続のタイムアウト・5xx 等）。
+    Playwright の TimeoutError は含めない。認証情報の誤り・リンクの変更・空表示の不一致でも
+    要素を待つ処理がタイムアウトするため、1アカウントの誤りで区全体を止めないよう
+    再試行・サーキットブレーカーの対象にしない。
+    requests / playwright は読み込み済みの場合だけ判定に使う（ここで import しない）。
+    """
+    requests = sys.modules.get("requests")
+    if requests is not None:
+        if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+            return True
+        if isinstance(exc, requests.HTTPError):
+            status = exc.response.status_code if exc.response is not None else None
+            return status in _TRANSIENT_STATUS
+
+    for module in ("playwright.sync_api", "playwright.async_api"):
+        playwright = sys.modules.get(module)
+        if playwright is None:
+            continue
+        # 接続断・ページ遷移の中断等（net::ERR_*）
+        if isinstance(exc, playwright.Error) and "net::" in str(exc):
+            return True
+
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    一時的な失敗の再試行方針。
+
+    Attributes:
+        attempts (int): 最初の1回を含む試行回数。1 の場合は再試行しない。
+        base_delay (float): 1回目の再試行までの待機時間の上限（秒）。以降は倍々に増やす。
+        max_delay (float): 待機時間の上限（秒）。
+    """
+
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 5.0
+
+    def delay(self, retry: int) -> float:
+        """retry 回目（1始まり）の再試行までの待機時間。full jitter で同時再試行を分散させる"""
+        cap = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        return random.uniform(0, cap)
+
+    def call(
+        self,
+        func: Callable[[], T],
+        on_retry: Optional[Callable[[int, BaseException], None]] = None,
+    ) -> T:
+        """
+        func を実行し、一時的な失敗の場合は待機して再試行する。
+        on_retry は再試行の前に (再試行回数, 例外) で呼ばれ、後片付け等に使える。
+        """
+        for retry in range(1, self.attempts):
+            try:
+                return func()
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                if on_retry is not None:
+                    on_retry(retry, e)
+                time.sleep(self.delay(retry))
+        return func()
+
+    async def call_async(
+        self,
+        func: Callable[[], Awaitable[T]],
+        on_retry: Optional[Callable[[int, BaseException], Awaitable[None]]] = None,
+    ) -> T:
+        """call の asyncio 版。func・on_retry はコルーチン関数"""
+        import asyncio
+
+        for retry in range(1, self.attempts):
+            try:
+                return await func()
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                if on_retry is not None:
+                    await on_retry(retry, e)
+                await asyncio.sleep(self.delay(retry))
+        return await func()
+
+
+def _minutes(hhmm: str) -> int:
+    hour, minute = hhmm.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+def maintenance_remaining(
+    windows: Sequence[Tuple[str, str]], now: Optional[datetime] = None
+) -> float:
+    """
+    現在がメンテナンス時間帯（日本時間の "HH:MM" の組、日付をまたいでもよい）であれば
+    終了までの秒数、そうでなければ 0 を返す。
+    """
+    now = (now or datetime.now(JST)).astimezone(JST)
+    current = now.hour * 60 + now.minute + now.second / 60
+    for start, end in windows:
+        start_min, end_min = _minutes(start), _minutes(end)
+        if start_min <= end_min:
+            inside = start_min <= current < end_min
+        else:
+            inside = current >= start_min or current < end_min
+        if inside:
+            return ((end_min - current) % (24 * 60)) * 60
+    return 0.0
+
+
+class CircuitBreaker:
+    """
+    区ごとのサーキットブレーカー。
+    - 一時的な失敗が failure_threshold 回続くと OPEN にし、reset_timeout 秒はアクセスさせない
+    - 待機時間を過ぎたら HALF_OPEN にして1回だけ試し、成功すれば CLOSED に戻す
+    - 試しのアクセスが trial_timeout 秒以内に結果を返さない場合は、次の呼び出しで試し直す
+    - maintenance_windows の時間帯は状態に関わらずアクセスさせない
+    """
+
+    def __init__(
+        self,
+        area: str,
+        failure_threshold: int = 3,
+        reset_timeout: float = 300,
+        maintenance_windows: Sequence[Tuple[str, str]] = (),
+        trial_timeout: float = 180,
+    ) -> None:
+        self.area: str = area
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.trial_timeout: float = trial_timeout
+        self.maintenance_windows: Tuple[Tuple[str, str], ...] = tuple(
+            maintenance_windows
+        )
+        self.state: str = CLOSED
+        self.failures: int = 0
+        self._opened_at: float = 0.0
+        self._trial_started_at: float = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """アクセスしてよいか確認する。止める場合は CircuitOpenError を送出する"""
+        remaining = maintenance_remaining(self.maintenance_windows)
+        if remaining:
+            raise CircuitOpenError(self.area, remaining, "メンテナンス時間中です")
+
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                remaining = self.trial_timeout - (now - self._trial_started_at)
+            else:
+                remaining = self.reset_timeout - (now - self._opened_at)
+            if remaining <= 0:
+                # 試しのアクセスは1件だけ通し、結果が出るまで（trial_timeout 秒まで）他は止める
+                self.state = HALF_OPEN
+                self._trial_started_at = now
+                return
+            raise CircuitOpenError(
+                self.area, remaining, "OPAC へのアクセスが続けて失敗しています"
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_abandoned(self, produced: bool) -> None:
+        """
+        結果が出る前に取得が中断された（ジェネレータを途中で閉じた・タスクを取り消した）ことを記録する。
+        HALF_OPEN の試しのアクセスだった場合、アイテムを受け取れていれば CLOSED に戻し、
+        そうでなければ OPEN に戻して次の呼び出しに試しを譲る。
+        """
+        with self._lock:
+            if self.state != HALF_OPEN:
+                return
+            if produced:
+                self.state = CLOSED
+                self.failures = 0
+            else:
+                # OPEN にした時刻は変えないので、次の呼び出しがすぐに試しのアクセスになる
+                self.state = OPEN
+
+    def record_failure(self, exc: BaseException) -> None:
+        """失敗を記録する。一時的な失敗でない場合（解析エラー等）は数えない"""
+        with self._lock:
+            if not is_transient(exc):
+                # HALF_OPEN の試しのアクセスが届いたなら OPAC は応答している
+                if self.state == HALF_OPEN:
+                    self.state = CLOSED
+                    self.failures = 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(
+                        "%s: 失敗が続いたため %d 秒間アクセスを止めます",
+                        self.area,
+                        self.reset_timeout,
+                    )
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(
+    area: str, maintenance_windows: Sequence[Tuple[str, str]] = ()
+) -> CircuitBreaker:
+    """区のサーキットブレーカーを返す（プロセス内で共有）"""
+    with _breakers_lock:
+        if area not in _breakers:
+            _breakers[area] = CircuitBreaker(
+                area, maintenance_windows=maintenance_windows
+            )
+        return _breakers[area]
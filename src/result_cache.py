@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from resilience import is_transient
+
+logger = logging.getLogger(__name__)
+
+# キャッシュの参照結果
+HIT = "hit"  # 有効期間内のキャッシュを返した
+STALE = "stale"  # 期限切れのキャッシュを1度だけ返した（次の参照時にその場で取得し直す）
+REFRESHED = "refreshed"  # 前回期限切れのキャッシュを返したエントリを、その場で取得し直した
+MISS = "miss"  # キャッシュが無いため取得した
+BYPASS = "bypass"  # force_refresh 指定のためキャッシュを使わずに取得した
+FALLBACK = "fallback"  # 取得に失敗した（取得先が停止中等）ため、期限に関わらず保存済みの結果を返した
+
+
+class ResultBackend(ABC):
+    """取得結果キャッシュの保存先。キーごとにエントリを読み書きする"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryResultBackend(ResultBackend):
+    """プロセス内の LRU。ウォームコンテナ内でのみ有効"""
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize: int = maxsize
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SqliteResultBackend(ResultBackend):
+    """ローカルの SQLite ファイルに保存するバックエンド（EFS 等に置けばコンテナ間で共有できる）"""
+
+    def __init__(self, path: str = "/tmp/library_reader/results.sqlite3") -> None:
+        self.path: str = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, entry TEXT)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 の接続はスレッドをまたいで使えないため、操作ごとに接続する
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT entry FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, entry) VALUES (?, ?)",
+                (key, json.dumps(entry)),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+
+
+class ResultCache:
+    """
+    貸出中・予約中一覧の取得結果を (area, card) 単位で保持するキャッシュ。
+    - ttl 秒以内のエントリはそのまま返す
+    - ttl を過ぎても stale_ttl 秒以内なら古い結果を1度だけ返して再取得待ちの印を付け、
+      次の参照時にその場で取得し直す（serve stale once。裏のスレッドでの再検証はしない）
+    - キーは利用者番号・パスワードをまとめてハッシュ化し、正しい認証情報でのみヒットさせる
+    """
+
+    def __init__(
+        self, backend: ResultBackend, ttl: int = 600, stale_ttl: int = 3600
+    ) -> None:
+        self.backend: ResultBackend = backend
+        self.ttl: int = ttl
+        self.stale_ttl: int = stale_ttl
+
+    @staticmethod
+    def _key(area: str, card: str, password: str) -> str:
+        return hashlib.sha256(f"{area}:{card}:{password}".encode("utf-8")).hexdigest()
+
+    def fetch(
+        self,
+        area: str,
+        card: str,
+        password: str,
+        loader: Callable[[], Dict[str, Any]],
+        force_refresh: bool = False,
+        ttl: Optional[int] = None,
+        fallback_errors: Tuple[Type[BaseException], ...] = (),
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        キャッシュを参照し、必要に応じて loader で取得した結果を保存して返す。
+
+        Args:
+            loader: 取得結果（JSON に変換できる dict）を返す関数。呼び出し元のスレッドで呼ぶ。
+            force_refresh: True の場合はキャッシュを使わずに取得する。
+            ttl: 区ごとの有効期間（秒）。None の場合は self.ttl。
+            fallback_errors: loader がこれらの例外で失敗した場合は、保存済みの結果があれば
+                期限切れでも返す（無ければそのまま送出する）。取得し直す際は、再試行で
+                回復しうる失敗（is_transient）でも古い結果を返す。
+
+        Returns:
+            取得結果と参照結果（HIT / STALE / REFRESHED / MISS / BYPASS / FALLBACK）。
+        """
+        key = self._key(area, card, password)
+        ttl = self.ttl if ttl is None else ttl
+        if not force_refresh:
+            entry = self.backend.get(key)
+            age = time.time() - entry["saved_at"] if entry else None
+            if age is not None and age < ttl:
+                return entry["contents"], HIT
+            if age is not None and age < max(ttl, self.stale_ttl):
+                if not entry.get("refresh_pending"):
+                    self.backend.put(key, {**entry, "refresh_pending": True})
+                    return entry["contents"], STALE
+                # 前回古い結果を返したエントリは、この呼び出しの中で取得し直す
+                # （取得先の停止・一時的な失敗の場合だけ古い結果を返し、認証情報の誤り等は送出する）
+                try:
+                    contents = loader()
+                except Exception as e:
+                    if not (isinstance(e, fallback_errors) or is_transient(e)):
+                        raise
+                    logger.warning(
+                        "%s: キャッシュの再取得に失敗しました: %r", area, e
+                    )
+                    return entry["contents"], FALLBACK
+                self._put(key, contents)
+                return contents, REFRESHED
+
+        try:
+            contents = loader()
+        except fallback_errors:
+            entry = self.backend.get(key)
+            if entry is None:
+                raise
+            return entry["contents"], FALLBACK
+        self._put(key, contents)
+        return contents, BYPASS if force_refresh else MISS
+
+    def invalidate(self, area: str, card: str, password: str) -> None:
+        self.backend.delete(self._key(area, card, password))
+
+    def _put(self, key: str, contents: Dict[str, Any]) -> None:
+        self.backend.put(key, {"contents": contents, "saved_at": time.time()})
+
+
+def result_cache_from_env() -> Optional[ResultCache]:
+    """
+    環境変数から取得結果キャッシュを構築する。未設定の場合は None（キャッシュ無効）。
+    - RESULT_CACHE_TTL: 有効期間（秒）
+    - RESULT_CACHE_STALE_TTL: 古い結果を1度だけ返してよい期間（秒、既定は TTL の6倍）
+    - RESULT_CACHE_PATH: 指定した場合は SQLite に保存、未設定ならプロセス内の LRU
+    """
+    ttl = os.environ.get("RESULT_CACHE_TTL")
+    if not ttl:
+        return None
+
+    path = os.environ.get("RESULT_CACHE_PATH")
+    backend: ResultBackend = (
+        SqliteResultBackend(path) if path else MemoryResultBackend()
+    )
+    stale_ttl = os.environ.get("RESULT_CACHE_STALE_TTL") or int(ttl) * 6
+    return ResultCache(backend, ttl=int(ttl), stale_ttl=int(stale_ttl))
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, FrozenSet, Iterable
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    from playwright.sync_api._generated import BrowserContext, Route
+
+# 画面描画にしか使わないため既定で遮断するリソース種別
+BLOCKED_RESOURCE_TYPES: FrozenSet[str] = frozenset(
+    {"image", "media", "font", "stylesheet"}
+)
+
+# 解析・広告系としてホスト名に関係なく遮断するキーワード
+TRACKER_KEYWORDS = (
+    "google-analytics",
+    "googletagmanager",
+    "doubleclick",
+    "facebook",
+    "twitter",
+    "analytics",
+)
+
+
+class RoutePolicy:
+    """
+    BrowserContext に設定するリクエスト遮断ポリシー。
+    - 画像・メディア・フォント・スタイルシートを遮断（allowed_resource_types で個別に許可）
+    - 解析系ホストと、許可ホスト以外へのサブリソース要求を遮断
+    - 画面遷移（document）は常に許可する
+    """
+
+    def __init__(
+        self,
+        allowed_hosts: Iterable[str],
+        allowed_resource_types: Iterable[str] = (),
+        block_third_party: bool = True,
+    ) -> None:
+        # www. の有無に関わらず同一サイトとして扱う
+        self.allowed_hosts = tuple(h.removeprefix("www.") for h in allowed_hosts)
+        self.blocked_resource_types = BLOCKED_RESOURCE_TYPES - frozenset(
+            allowed_resource_types
+        )
+        self.block_third_party: bool = block_third_party
+
+    def _is_allowed_host(self, host: str) -> bool:
+        return any(host == h or host.endswith("." + h) for h in self.allowed_hosts)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        """要求を遮断すべきかどうか"""
+        if resource_type == "document":
+            return False
+
+        host = urlparse(url).hostname or ""
+        if any(k in host for k in TRACKER_KEYWORDS):
+            return True
+        if resource_type in self.blocked_resource_types:
+            return True
+        return self.block_third_party and not self._is_allowed_host(host)
+
+    def _handle(self, route: Route) -> None:
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            route.abort()
+        else:
+            route.continue_()
+
+    async def _handle_async(self, route) -> None:
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def install(self, context: BrowserContext) -> None:
+        """コンテキスト内の全リクエストにポリシーを適用する"""
+        context.route("**/*", self._handle)
+
+    async def install_async(self, context) -> None:
+        """async_api の BrowserContext にポリシーを適用する"""
+        await context.route("**/*", self._handle_async)
@@ -0,0 +1,333 @@
+"""
+貸出中・予約中一覧の内容から、アカウントごとに次に取得すべき時刻を決めるスケジューラ。
+- 返却期限・取置期限が近い資料、予約1位・回送中の資料がある間は短い間隔で取得する
+- それ以外は基本の間隔で取得し、前回から変化が無ければ間隔を延ばす
+- ただし、期限が近づく時点（期限の urgent_days 日前）より後にはしない
+取得時刻が来たジョブは優先度付きキュー（取得時刻順）から取り出して実行する。
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from model import LentItem, ReserveItem
+from resilience import JST, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# 次回の取得時刻を決めた理由
+NEW = "new"  # 登録直後のため、すぐに取得する
+DEADLINE = "deadline"  # 返却期限・取置期限が近い資料がある
+HOLD_NEAR = "hold_near"  # 予約1位・回送中の資料がある（取置になるのを早く知るため）
+BASE = "base"  # 期限の近い資料も予約1位の資料も無い
+BACKOFF = "backoff"  # 前回から変化が無いため間隔を延ばした
+UNTIL_DEADLINE = "until_deadline"  # 期限が近づく時点まで間隔を縮めた
+ERROR = "error"  # 取得に失敗したため、時間を置いて再試行する
+
+# 予約資料が受取館へ移動中であることを表す状態の文言（中野区: 回送中、練馬区: 移送中です）
+IN_TRANSIT_STATUSES = frozenset({"回送中", "移送中です"})
+# 予約順位の数字部分（"1"、"1位"、"1/3" 等）
+_RANK = re.compile(r"\d+")
+
+Fetch = Callable[["PollJob"], Tuple[Sequence[LentItem], Sequence[ReserveItem]]]
+
+
+def reserve_rank(item: ReserveItem) -> Optional[int]:
+    """
+    予約順位を数値で返す。順位が表示されていない場合は None。
+    区によって数値（港区・練馬区）と文字列（中野区・杉並区）のどちらでも入っている。
+    """
+    rank = item.reserve_rank
+    if isinstance(rank, int):
+        return rank
+    m = _RANK.search(rank) if isinstance(rank, str) else None
+    return int(m[0]) if m else None
+
+
+def fingerprint(
+    lent_items: Iterable[LentItem], reserve_items: Iterable[ReserveItem]
+) -> str:
+    """一覧の内容のハッシュ。前回の取得から変化したかどうかの判定に使う"""
+    contents = {
+        "lent": sorted(json.dumps(i.to_dict(), sort_keys=True) for i in lent_items),
+        "reserve": sorted(
+            json.dumps(i.to_dict(), sort_keys=True) for i in reserve_items
+        ),
+    }
+    data = json.dumps(contents, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass(frozen=True)
+class PollPolicy:
+    """
+    次回の取得時刻の決め方。
+
+    Attributes:
+        urgent_interval (float): 期限の近い資料・予約1位の資料がある場合の間隔（秒）。
+        base_interval (float): 上記に当たらない場合の間隔（秒）。
+        max_interval (float): 変化が無い場合に延ばす間隔の上限（秒）。
+        backoff (float): 前回から変化が無い場合に間隔に掛ける倍率。
+        urgent_days (int): 返却期限・取置期限が近いとみなす日数。
+        error_interval (float): 取得に失敗した場合に再試行するまでの間隔（秒）。
+    """
+
+    urgent_interval: float = 2 * 3600
+    base_interval: float = 12 * 3600
+    max_interval: float = 3 * 86400
+    backoff: float = 2.0
+    urgent_days: int = 2
+    error_interval: float = 1800
+
+    @staticmethod
+    def _deadlines(
+        lent_items: Iterable[LentItem], reserve_items: Iterable[ReserveItem]
+    ) -> List[date]:
+        """返却期限と取置期限（取消された予約は除く）"""
+        deadlines = [i.return_date for i in lent_items if i.return_date]
+        deadlines += [
+            i.reserve_expire_date
+            for i in reserve_items
+            if i.reserve_expire_date and not i.is_canceled
+        ]
+        return deadlines
+
+    def next_interval(
+        self,
+        lent_items: Sequence[LentItem],
+        reserve_items: Sequence[ReserveItem],
+        now: float,
+        previous: Optional[float] = None,
+        changed: bool = True,
+    ) -> Tuple[float, str]:
+        """
+        次回の取得までの間隔（秒）と、その理由を返す。
+
+        Args:
+            lent_items: 今回取得した貸出中の資料一覧。
+            reserve_items: 今回取得した予約中の資料一覧。
+            now: 今回の取得時刻（UNIX 時刻）。
+            previous: 前回決めた間隔。初回は None。
+            changed: 前回の取得から一覧の内容が変わったかどうか。
+        """
+        today = datetime.fromtimestamp(now, JST).date()
+        urgent_until = today + timedelta(days=self.urgent_days)
+        deadlines = self._deadlines(lent_items, reserve_items)
+
+        # 期限切れの資料は返却されるまで変わらないので、期限の近い資料には含めない
+        if any(today <= d <= urgent_until for d in deadlines):
+            return self.urgent_interval, DEADLINE
+        if any(
+            not i.is_canceled
+            and (reserve_rank(i) == 1 or i.reserve_status in IN_TRANSIT_STATUSES)
+            for i in reserve_items
+        ):
+            return self.urgent_interval, HOLD_NEAR
+
+        interval, reason = self.base_interval, BASE
+        if previous is not None and not changed:
+            interval = max(previous, self.base_interval) * self.backoff
+            interval = min(interval, self.max_interval)
+            reason = BACKOFF
+
+        # 期限が urgent_days 日以内に入る日の0時（JST）には取得する
+        upcoming = [d for d in deadlines if d > urgent_until]
+        if upcoming:
+            start = min(upcoming) - timedelta(days=self.urgent_days)
+            start_at = datetime(start.year, start.month, start.day, tzinfo=JST)
+            until = max(start_at.timestamp() - now, self.urgent_interval)
+            if until < interval:
+                interval, reason = until, UNTIL_DEADLINE
+        return interval, reason
+
+
+@dataclass
+class PollJob:
+    """
+    1アカウント分の取得予定。
+
+    Attributes:
+        area (str): 区の識別子。
+        userid (str): 利用者番号。
+        password (str): パスワード。
+        due_at (float): 次回の取得時刻（UNIX 時刻）。
+        interval (Optional[float]): 直前に決めた間隔（秒）。登録直後は None。
+        reason (str): 次回の取得時刻を決めた理由。
+        fingerprint (Optional[str]): 前回取得した一覧のハッシュ。
+        fetched_at (Optional[float]): 前回取得に成功した時刻。
+    """
+
+    area: str
+    userid: str
+    password: str = field(repr=False)
+    due_at: float = field(default=0.0)
+    interval: Optional[float] = field(default=None)
+    reason: str = field(default=NEW)
+    fingerprint: Optional[str] = field(default=None)
+    fetched_at: Optional[float] = field(default=None)
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.area, self.userid
+
+
+class PollScheduler:
+    """
+    アカウントごとの取得予定を、取得時刻順の優先度付きキューで管理する。
+    予定を変えた場合は新しいエントリを積み、古いエントリは取り出す際に読み飛ばす。
+    """
+
+    def __init__(
+        self,
+        policy: Optional[PollPolicy] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.policy: PollPolicy = policy or PollPolicy()
+        self.clock: Callable[[], float] = clock
+        self._jobs: Dict[Tuple[str, str], PollJob] = {}
+        self._heap: List[Tuple[float, int, PollJob]] = []
+        # 取得時刻が同じエントリは登録順に取り出す
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def jobs(self) -> List[PollJob]:
+        """登録中の取得予定（取得時刻順）"""
+        return sorted(self._jobs.values(), key=lambda j: j.due_at)
+
+    def _push(self, job: PollJob) -> PollJob:
+        self._jobs[job.key] = job
+        heapq.heappush(self._heap, (job.due_at, next(self._seq), job))
+        return job
+
+    def _is_current(self, job: PollJob) -> bool:
+        return self._jobs.get(job.key) is job
+
+    def add(
+        self, area: str, userid: str, password: str, due_at: Optional[float] = None
+    ) -> PollJob:
+        """アカウントを登録する。due_at 未指定ならすぐに取得する（登録済みなら予定を置き換える）"""
+        due_at = self.clock() if due_at is None else due_at
+        return self._push(PollJob(area, userid, password, due_at=due_at))
+
+    def remove(self, area: str, userid: str) -> None:
+        self._jobs.pop((area, userid), None)
+
+    def next_due_at(self) -> Optional[float]:
+        """次に取得時刻が来るジョブの取得時刻。ジョブが無ければ None"""
+        while self._heap and not self._is_current(self._heap[0][2]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[PollJob]:
+        """取得時刻が来たジョブを取得時刻順に取り出す（取り出したジョブは record で予定し直す）"""
+        now = self.clock() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, job = heapq.heappop(self._heap)
+            if self._is_current(job):
+                due.append(job)
+        return due
+
+    def record(
+        self,
+        job: PollJob,
+        lent_items: Sequence[LentItem],
+        reserve_items: Sequence[ReserveItem],
+        now: Optional[float] = None,
+    ) -> PollJob:
+        """取得結果から次回の取得時刻を決めて、予定し直す"""
+        now = self.clock() if now is None else now
+        digest = fingerprint(lent_items, reserve_items)
+        interval, reason = self.policy.next_interval(
+            lent_items,
+            reserve_items,
+            now,
+            previous=job.interval,
+            changed=digest != job.fingerprint,
+        )
+        return self._reschedule(
+            replace(
+                job,
+                due_at=now + interval,
+                interval=interval,
+                reason=reason,
+                fingerprint=digest,
+                fetched_at=now,
+            )
+        )
+
+    def record_error(
+        self, job: PollJob, error: BaseException, now: Optional[float] = None
+    ) -> PollJob:
+        """
+        取得に失敗したジョブを、時間を置いて再試行するよう予定し直す。
+        区の OPAC が停止中（CircuitOpenError）の場合は再開見込みの時刻まで待つ。
+        """
+        now = self.clock() if now is None else now
+        delay = self.policy.error_interval
+        if isinstance(error, CircuitOpenError):
+            delay = max(delay, error.retry_after)
+        # 失敗の前に決めた間隔は、次に成功した際の延長に使うので変えない
+        return self._reschedule(replace(job, due_at=now + delay, reason=ERROR))
+
+    def _reschedule(self, job: PollJob) -> PollJob:
+        # 取得中に remove されたアカウントは予定し直さない
+        if job.key not in self._jobs:
+            return job
+        return self._push(job)
+
+    def drain(self, fetch: Fetch, now: Optional[float] = None) -> int:
+        """
+        取得時刻が来たジョブを順に実行して予定し直す。実行したジョブ数を返す。
+        取得・予定の決定に失敗したジョブは record_error で再試行を予定し、他のジョブは続ける。
+        """
+        jobs = self.pop_due(now)
+        for job in jobs:
+            try:
+                lent_items, reserve_items = fetch(job)
+                self.record(job, lent_items, reserve_items, now)
+            except Exception as e:
+                logger.warning("%s/%s の取得に失敗しました: %s", job.area, job.userid, e)
+                self.record_error(job, e, now)
+        return len(jobs)
+
+    def run(
+        self,
+        fetch: Fetch,
+        stop: Callable[[], bool] = lambda: False,
+        sleep: Callable[[float], None] = time.sleep,
+        max_sleep: float = 60.0,
+    ) -> None:
+        """
+        ジョブの取得時刻が来るまで待っては drain する（ローカル実行用）。
+        stop が True を返すまで続ける。待機は max_sleep 秒ごとに区切って stop を確かめる。
+        """
+        while not stop():
+            self.drain(fetch)
+            next_due = self.next_due_at()
+            wait = max_sleep if next_due is None else next_due - self.clock()
+            if wait > 0:
+                sleep(min(wait, max_sleep))
+
+
+def fetch_with_reader(**reader_kwargs) -> Fetch:
+    """
+    区のリーダーで貸出中・予約中一覧を取得する fetch を返す（PollScheduler.drain 用）。
+    reader_kwargs は各リーダーにそのまま渡す（session_cache 等）。
+    """
+    from registry import get_reader
+
+    def fetch(job: PollJob) -> Tuple[List[LentItem], List[ReserveItem]]:
+        reader = get_reader(job.area)(job.userid, job.password, **reader_kwargs)
+        return reader.fetch_all()
+
+    return fetch
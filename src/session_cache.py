@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """一時ファイルに書き込んでから置き換える"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SessionBackend(ABC):
+    """セッションキャッシュの保存先。全エントリを dict としてまとめて読み書きする"""
+
+    @abstractmethod
+    def load(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, entries: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+
+class FileSessionBackend(SessionBackend):
+    """ローカルの JSON ファイルに保存するバックエンド"""
+
+    def __init__(self, path: str = "/tmp/library_reader/sessions.json") -> None:
+        self.path: str = path
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "rb") as f:
+                return json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self, entries: Dict[str, Any]) -> None:
+        _atomic_write(self.path, json.dumps(entries).encode("utf-8"))
+
+
+class EncryptedBlobSessionBackend(SessionBackend):
+    """
+    全エントリを1つの暗号化 blob として保存するバックエンド。
+    暗号化には cryptography パッケージの Fernet を使う（別途インストールが必要）。
+    """
+
+    def __init__(
+        self, key: str, path: str = "/tmp/library_reader/sessions.bin"
+    ) -> None:
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError as e:
+            raise ImportError(
+                "EncryptedBlobSessionBackend を使うには cryptography をインストールしてください"
+            ) from e
+
+        self.path: str = path
+        self._fernet = Fernet(key)
+
+    def load(self) -> Dict[str, Any]:
+        from cryptography.fernet import InvalidToken
+
+        try:
+            with open(self.path, "rb") as f:
+                return json.loads(self._fernet.decrypt(f.read()))
+        except (FileNotFoundError, InvalidToken, ValueError):
+            return {}
+
+    def save(self, entries: Dict[str, Any]) -> None:
+        blob = self._fernet.encrypt(json.dumps(entries).encode("utf-8"))
+        _atomic_write(self.path, blob)
+
+
+class SessionCache:
+    """
+    ログイン済みセッション（Playwright の storage_state）を (area, card) 単位で保持するキャッシュ。
+    - ttl 秒を過ぎたエントリは読み書きのたびに削除する
+    - キーは利用者番号・パスワードをまとめてハッシュ化し、正しい認証情報でのみヒットさせる
+      （キャッシュがあるとログインを省くため、利用者番号だけで他人のセッションを使わせない）
+    """
+
+    def __init__(self, backend: SessionBackend, ttl: int = 1800) -> None:
+        self.backend: SessionBackend = backend
+        self.ttl: int = ttl
+
+    @staticmethod
+    def _key(area: str, card: str, password: str) -> str:
+        return hashlib.sha256(f"{area}:{card}:{password}".encode("utf-8")).hexdigest()
+
+    def _load_alive(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            k: v
+            for k, v in self.backend.load().items()
+            if now - v.get("saved_at", 0) < self.ttl
+        }
+
+    def get(self, area: str, card: str, password: str) -> Optional[Dict[str, Any]]:
+        """有効なエントリ（storage_state とログイン後の URL）を返す。無ければ None"""
+        return self._load_alive().get(self._key(area, card, password))
+
+    def put(
+        self,
+        area: str,
+        card: str,
+        password: str,
+        storage_state: Dict[str, Any],
+        url: str,
+    ) -> None:
+        entries = self._load_alive()
+        entries[self._key(area, card, password)] = {
+            "storage_state": storage_state,
+            "url": url,
+            "saved_at": time.time(),
+        }
+        self.backend.save(entries)
+
+    def invalidate(self, area: str, card: str, password: str) -> None:
+        entries = self._load_alive()
+        if entries.pop(self._key(area, card, password), None) is not None:
+            self.backend.save(entries)
+
+
+def session_cache_from_env() -> Optional[SessionCache]:
+    """
+    環境変数からセッションキャッシュを構築する。未設定の場合は None（キャッシュ無効）。
+    - SESSION_CACHE_PATH: 保存先ファイル
+    - SESSION_CACHE_KEY: 指定した場合は暗号化 blob として保存（Fernet キー）
+    - SESSION_CACHE_TTL: 有効期間（秒）
+    """
+    path = os.environ.get("SESSION_CACHE_PATH")
+    if not path:
+        return None
+
+    key = os.environ.get("SESSION_CACHE_KEY")
+    backend: SessionBackend = (
+        EncryptedBlobSessionBackend(key, path) if key else FileSessionBackend(path)
+    )
+    return SessionCache(backend, ttl=int(os.environ.get("SESSION_CACHE_TTL", "1800")))
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+from model import LentItem, ReserveItem
+from result_cache import MemoryResultBackend, ResultBackend, SqliteResultBackend
+
+Item = Union[LentItem, ReserveItem, Dict[str, Any]]
+
+# 同じ資料かどうかを判定する項目（返却期限・予約状態等は変わりうるので含めない）
+LENT_IDENTITY: Tuple[str, ...] = ("title", "category", "checkout_date")
+RESERVE_IDENTITY: Tuple[str, ...] = ("title", "category", "reserve_date")
+
+
+def _as_dict(item: Item) -> Dict[str, Any]:
+    return dict(item) if isinstance(item, dict) else item.to_dict()
+
+
+@dataclass
+class ItemChange:
+    """
+    内容が変わった資料。
+
+    Attributes:
+        item (Dict[str, Any]): 変更後の資料。
+        changes (Dict[str, Dict[str, Any]]): 変わった項目ごとの {"old": 変更前, "new": 変更後}。
+    """
+
+    item: Dict[str, Any]
+    changes: Dict[str, Dict[str, Any]]
+
+
+@dataclass
+class ItemDiff:
+    """
+    前回のスナップショットとの差分。
+
+    Attributes:
+        added (List[Dict[str, Any]]): 新しく現れた資料。
+        removed (List[Dict[str, Any]]): 無くなった資料（返却済み・受取済み等）。
+        changed (List[ItemChange]): 内容が変わった資料。
+    """
+
+    added: List[Dict[str, Any]] = field(default_factory=list)
+    removed: List[Dict[str, Any]] = field(default_factory=list)
+    changed: List[ItemChange] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "changed": [{"item": c.item, "changes": c.changes} for c in self.changed],
+        }
+
+
+def _index(
+    items: Iterable[Dict[str, Any]], identity: Tuple[str, ...]
+) -> Dict[Tuple, Dict[str, Any]]:
+    """識別項目をキーにした dict を作る。同じキーの資料（複本等）は出現順の番号で区別する"""
+    seen: Dict[Tuple, int] = defaultdict(int)
+    index = {}
+    for item in items:
+        key = tuple(item.get(k) for k in identity)
+        index[(*key, seen[key])] = item
+        seen[key] += 1
+    return index
+
+
+def diff_items(
+    old: Iterable[Item], new: Iterable[Item], identity: Tuple[str, ...]
+) -> ItemDiff:
+    """識別項目で資料を対応付け、追加・削除・変更された資料を返す"""
+    old_index = _index(map(_as_dict, old), identity)
+    new_index = _index(map(_as_dict, new), identity)
+
+    diff = ItemDiff()
+    for key, item in new_index.items():
+        before = old_index.get(key)
+        if before is None:
+            diff.added.append(item)
+            continue
+        changes = {
+            k: {"old": before.get(k), "new": v}
+            for k, v in item.items()
+            if before.get(k) != v
+        }
+        if changes:
+            diff.changed.append(ItemChange(item=item, changes=changes))
+    diff.removed = [item for key, item in old_index.items() if key not in new_index]
+    return diff
+
+
+class SnapshotStore:
+    """
+    前回取得した貸出中・予約中一覧を (area, card, consumer) 単位で保持し、差分を返すストア。
+    consumer ごとに別のスナップショットを持つため、複数の通知ジョブが差分を取り合わない。
+    """
+
+    def __init__(self, backend: ResultBackend) -> None:
+        self.backend: ResultBackend = backend
+
+    @staticmethod
+    def _key(area: str, card: str, consumer: str) -> str:
+        return hashlib.sha256(f"{area}:{card}:{consumer}".encode("utf-8")).hexdigest()
+
+    def diff_and_save(
+        self,
+        area: str,
+        card: str,
+        lent_items: Iterable[Item],
+        reserve_items: Iterable[Item],
+        consumer: str = "default",
+    ) -> Dict[str, Any]:
+        """
+        前回のスナップショットとの差分を返し、今回の一覧をスナップショットとして保存する。
+        初回は全件が added になる（previous_at が None）。
+        """
+        key = self._key(area, card, consumer)
+        previous = self.backend.get(key) or {}
+        lent_items = [_as_dict(i) for i in lent_items]
+        reserve_items = [_as_dict(i) for i in reserve_items]
+
+        self.backend.put(
+            key,
+            {
+                "lent_items": lent_items,
+                "reserve_items": reserve_items,
+                "saved_at": time.time(),
+            },
+        )
+        return {
+            "previous_at": previous.get("saved_at"),
+            "lent": diff_items(
+                previous.get("lent_items", []), lent_items, LENT_IDENTITY
+            ),
+            "reserve": diff_items(
+                previous.get("reserve_items", []), reserve_items, RESERVE_IDENTITY
+            ),
+        }
+
+
+def snapshot_store_from_env() -> SnapshotStore:
+    """
+    環境変数からスナップショットストアを構築する。
+    - SNAPSHOT_PATH: 指定した場合は SQLite に保存、未設定ならプロセス内（ウォームコンテナ内のみ有効）
+    """
+    path = os.environ.get("SNAPSHOT_PATH")
+    backend: ResultBackend = (
+        SqliteResultBackend(path) if path else MemoryResultBackend(maxsize=1024)
+    )
+    return SnapshotStore(backend)
@@ -1,23 +1,124 @@
-from model import LentItem, ReserveItem
+from __future__ import annotations
 
-from playwright.sync_api._generated import BrowserContext, Page
+from model import LentItem, ReserveItem
 
-from typing import List
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, List, Union
 
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext as AsyncBrowserContext
+    from playwright.async_api import Page as AsyncPage
+    from playwright.sync_api._generated import BrowserContext, Page
 
+from async_library_reader import AsyncBaseLibraryReader
+from html_dom import HtmlDocument, as_document
 from library_reader import BaseLibraryReader
 
 
+LENT_SELECTOR = "div.main > table > tbody > tr > td"
+RESERVE_SELECTOR = "table#ItemDetaTable > tbody > tr > td"
+# 貸出アイテムの構成要素数
+LENT_UNIT = 8
+# 予約アイテムの構成要素数
+RESERVE_UNIT = 12
+
+
+def build_lent_items(elements: List[str]) -> List[LentItem]:
+    """貸出中一覧のセル（td）テキスト一覧から貸出中アイテムを組み立てる"""
+    rows = BaseLibraryReader._chunk(elements, LENT_UNIT)
+
+    items = []
+    for row in rows:
+        title = row[0]
+        category = row[1]
+        checkout_location = row[2]
+        checkout_date = row[3]
+        return_date = row[4]
+        extend_count = int(row[6])
+        reserved_count = int(row[5])
+        is_reserved = reserved_count > 0
+        is_extendable = extend_count == 0 and not is_reserved
+
+        items.append(
+            LentItem(
+                title=title,
+                category=category,
+                checkout_location=checkout_location,
+                checkout_date=checkout_date,
+                return_date=return_date,
+                reserved_count=reserved_count,
+                extend_count=extend_count,
+                is_reserved=is_reserved,
+                is_extendable=is_extendable,
+            )
+        )
+
+    return items
+
+
+def build_reserve_items(elements: List[str]) -> List[ReserveItem]:
+    """予約中一覧のセル（td）テキスト一覧から予約中アイテムを組み立てる"""
+    rows = BaseLibraryReader._chunk(elements, RESERVE_UNIT)
+
+    items = []
+    for row in rows:
+        # 受取場所と連絡方法が2要素の場合は内容が確定している。
+        _receive_location = (
+            row[2].split("\n")[0] if len(row[2].split("\n")) == 2 else "選択可"
+        )
+        _notification_method = (
+            row[2].split("\n")[1] if len(row[2].split("\n")) == 2 else "選択可"
+        )
+
+        _title = row[0].strip()
+        _category = row[1]
+        _reserve_date = row[3].split("\n")[0]
+        _reserve_rank = row[4]
+        _reserve_status = row[5]
+        _reserve_cancel_reason = row[6]
+        _reserve_expire_date = row[7]
+
+        _is_canceled = _reserve_status in ("取消・手配不可")
+
+        items.append(
+            ReserveItem(
+                title=_title,
+                category=_category,
+                receive_location=_receive_location,
+                notification_method=_notification_method,
+                reserve_date=_reserve_date,
+                reserve_rank=_reserve_rank,
+                reserve_status=_reserve_status,
+                reserve_cancel_reason=_reserve_cancel_reason,
+                reserve_expire_date=_reserve_expire_date,
+                is_canceled=_is_canceled,
+            )
+        )
+
+    return items
+
+
+def parse_lent_html(html: Union[str, HtmlDocument]) -> List[LentItem]:
+    """貸出中一覧の HTML から貸出中アイテムを組み立てる"""
+    return build_lent_items(as_document(html).all_inner_texts(LENT_SELECTOR))
+
+
+def parse_reserve_html(html: Union[str, HtmlDocument]) -> List[ReserveItem]:
+    """予約中一覧の HTML から予約中アイテムを組み立てる"""
+    return build_reserve_items(as_document(html).all_inner_texts(RESERVE_SELECTOR))
+
+
 class SuginamiLibraryReader(BaseLibraryReader):
     """
     杉並区立図書館のWebサイトから貸出中・予約中の資料情報を取得するクラス。
     """
 
+    AREA = "suginami"
+    LOGGED_IN_SELECTOR = '[title="あなたが現在借りている資料です"]'
+    URL = "https://www.library.city.suginami.tokyo.jp/"
+
     def _login(self, context: BrowserContext) -> Page:
         page: Page = context.new_page()
-
-        URL = "https://www.library.city.suginami.tokyo.jp/"
-        page.goto(URL)
+        page.goto(self.URL)
 
         page.get_by_role("banner").get_by_role("link", name="利用者ログイン").click()
         page.get_by_role("button", name="ログイン").click()
@@ -27,93 +128,91 @@ class SuginamiLibraryReader(BaseLibraryReader):
 
         return page
 
-    def _parse_lent(self, page: Page) -> List[LentItem]:
+    def _between_tabs(self, page: Page) -> None:
+        # 貸出中一覧は別画面に遷移するため、マイページへ戻ってから予約中一覧を開く
+        # （貸出中一覧が複数ページの場合は、ページ数の分だけ戻る）
+        reserve_link = page.get_by_title("あなたが現在予約している資料です").first
+        for _ in range(self.MAX_PAGES):
+            page.go_back()
+            page.wait_for_load_state()
+            if reserve_link.is_visible():
+                return
+
+    def _open_lent(self, page: Page) -> None:
         page.get_by_title("あなたが現在借りている資料です").click()
 
-        # セレクタと構成要素数
-        SELECTOR = "div.main > table > tbody > tr > td"
-        LENT_UNIT = 8
-
-        page.wait_for_selector(SELECTOR)
-
-        elements: List[str] = page.locator(SELECTOR).all_inner_texts()
-
-        rows = self._chunk(elements, LENT_UNIT)
-
-        items = []
-        for row in rows:
-            title = row[0]
-            category = row[1]
-            checkout_location = row[2]
-            checkout_date = row[3]
-            return_date = row[4]
-            extend_count = int(row[6])
-            reserved_count = int(row[5])
-            is_reserved = reserved_count > 0
-            is_extendable = extend_count == 0 and not is_reserved
-
-            items.append(
-                LentItem(
-                    title=title,
-                    category=category,
-                    checkout_location=checkout_location,
-                    checkout_date=checkout_date,
-                    return_date=return_date,
-                    reserved_count=reserved_count,
-                    extend_count=extend_count,
-                    is_reserved=is_reserved,
-                    is_extendable=is_extendable,
-                )
-            )
-
-        return items
+    def _read_lent(self, page: Page) -> Iterator[LentItem]:
+        for elements in self._pages(
+            page, LENT_SELECTOR, lambda p: p.locator(LENT_SELECTOR).all_inner_texts()
+        ):
+            with self.metrics.span("parse"):
+                items = build_lent_items(elements)
+            yield from items
 
-    def _parse_reserve(self, page: Page) -> List[ReserveItem]:
+    def _open_reserve(self, page: Page) -> None:
         page.get_by_title("あなたが現在予約している資料です").click()
 
-        # セレクタと構成要素数
-        SELECTOR = "table#ItemDetaTable > tbody > tr > td"
-        RESERVE_UNIT = 12
+    def _read_reserve(self, page: Page) -> Iterator[ReserveItem]:
+        for elements in self._pages(
+            page,
+            RESERVE_SELECTOR,
+            lambda p: p.locator(RESERVE_SELECTOR).all_inner_texts(),
+        ):
+            with self.metrics.span("parse"):
+                items = build_reserve_items(elements)
+            yield from items
 
-        page.wait_for_selector(SELECTOR)
 
-        elements: List[str] = page.locator(SELECTOR).all_inner_texts()
+class AsyncSuginamiLibraryReader(AsyncBaseLibraryReader):
+    """SuginamiLibraryReader の asyncio 版"""
 
-        rows = self._chunk(elements, RESERVE_UNIT)
+    SYNC_READER = SuginamiLibraryReader
 
-        items = []
-        for row in rows:
-            # 受取場所と連絡方法が2要素の場合は内容が確定している。
-            _receive_location = (
-                row[2].split("\n")[0] if len(row[2].split("\n")) == 2 else "選択可"
-            )
-            _notification_method = (
-                row[2].split("\n")[1] if len(row[2].split("\n")) == 2 else "選択可"
-            )
+    async def _login(self, context: AsyncBrowserContext) -> AsyncPage:
+        page = await context.new_page()
+        await page.goto(self.URL)
 
-            _title = row[0].strip()
-            _category = row[1]
-            _reserve_date = row[3].split("\n")[0]
-            _reserve_rank = row[4]
-            _reserve_status = row[5]
-            _reserve_cancel_reason = row[6]
-            _reserve_expire_date = row[7]
-
-            _is_canceled = _reserve_status in ("取消・手配不可")
-
-            items.append(
-                ReserveItem(
-                    title=_title,
-                    category=_category,
-                    receive_location=_receive_location,
-                    notification_method=_notification_method,
-                    reserve_date=_reserve_date,
-                    reserve_rank=_reserve_rank,
-                    reserve_status=_reserve_status,
-                    reserve_cancel_reason=_reserve_cancel_reason,
-                    reserve_expire_date=_reserve_expire_date,
-                    is_canceled=_is_canceled,
-                )
-            )
+        banner = page.get_by_role("banner")
+        await banner.get_by_role("link", name="利用者ログイン").click()
+        await page.get_by_role("button", name="ログイン").click()
+        await page.get_by_role("textbox", name="図書館利用カード番号").fill(self.card)
+        await page.get_by_label("パスワード").fill(self.password)
+        await page.get_by_role("button", name="ログイン").click()
+
+        return page
 
-        return items
+    async def _between_tabs(self, page: AsyncPage) -> None:
+        # 貸出中一覧は別画面に遷移するため、マイページへ戻ってから予約中一覧を開く
+        # （貸出中一覧が複数ページの場合は、ページ数の分だけ戻る）
+        reserve_link = page.get_by_title("あなたが現在予約している資料です").first
+        for _ in range(self.MAX_PAGES):
+            await page.go_back()
+            await page.wait_for_load_state()
+            if await reserve_link.is_visible():
+                return
+
+    async def _open_lent(self, page: AsyncPage) -> None:
+        await page.get_by_title("あなたが現在借りている資料です").click()
+
+    async def _read_lent(self, page: AsyncPage) -> AsyncIterator[LentItem]:
+        async for elements in self._pages(
+            page, LENT_SELECTOR, lambda p: p.locator(LENT_SELECTOR).all_inner_texts()
+        ):
+            with self.metrics.span("parse"):
+                items = build_lent_items(elements)
+            for item in items:
+                yield item
+
+    async def _open_reserve(self, page: AsyncPage) -> None:
+        await page.get_by_title("あなたが現在予約している資料です").click()
+
+    async def _read_reserve(self, page: AsyncPage) -> AsyncIterator[ReserveItem]:
+        async for elements in self._pages(
+            page,
+            RESERVE_SELECTOR,
+            lambda p: p.locator(RESERVE_SELECTOR).all_inner_texts(),
+        ):
+            with self.metrics.span("parse"):
+                items = build_reserve_items(elements)
+            for item in items:
+                yield item
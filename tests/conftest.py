@@ -0,0 +1,38 @@
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+FIXTURES = ROOT / "fixtures"
+
+sys.path.insert(0, str(ROOT / "src"))
+
+
+@pytest.fixture
+def fixture_html():
+    """fixtures/<区>/<lent|reserve>.html の内容を返す関数"""
+
+    def read(area: str, kind: str) -> str:
+        return (FIXTURES / area / f"{kind}.html").read_text(encoding="utf-8")
+
+    return read
+
+
+@pytest.fixture
+def fake_playwright(monkeypatch):
+    """playwright.sync_api の例外クラスだけを持つ代わりのモジュール（Playwright は導入しない）"""
+    module = types.ModuleType("playwright.sync_api")
+
+    class Error(Exception):
+        pass
+
+    class TimeoutError(Error):
+        pass
+
+    module.Error, module.TimeoutError = Error, TimeoutError
+    monkeypatch.setitem(sys.modules, "playwright", types.ModuleType("playwright"))
+    monkeypatch.setitem(sys.modules, "playwright.sync_api", module)
+    return module
+
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import pytest
+
+from history import HistoryStore
+from resilience import JST
+
+
+def at(day: str) -> float:
+    return datetime.strptime(day, "%Y/%m/%d").replace(hour=12, tzinfo=JST).timestamp()
+
+
+def hold(title: str, reserve_date: str, expire_date: str = "") -> dict:
+    return {
+        "title": title,
+        "category": "図書",
+        "reserve_date": reserve_date,
+        "reserve_expire_date": expire_date,
+        "is_canceled": False,
+    }
+
+
+def test_holds_ready_at_first_fetch_are_left_out_of_the_wait(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    # 予約から取置までを観測した予約（3日）
+    store.append("minato", "0001", [], [hold("A", "2024/05/01")], at("2024/05/01"))
+    store.append(
+        "minato", "0001", [], [hold("A", "2024/05/01", "2024/05/11")], at("2024/05/04")
+    )
+    # 初めて取得した時点で既に取置になっていた予約（取置になった日は分からない）
+    store.append(
+        "minato", "0002", [], [hold("B", "2024/04/01", "2024/05/11")], at("2024/05/04")
+    )
+
+    assert store.hold_wait_by_category() == [
+        {"category": "図書", "holds": 1, "avg_wait_days": 3.0, "uncertain_holds": 1}
+    ]
+
+
+def test_unparseable_since_is_rejected(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    with pytest.raises(ValueError):
+        store.hold_wait_by_category(since="last week")
+    with pytest.raises(ValueError):
+        store.loans("minato", "0001", since="last week")
@@ -0,0 +1,344 @@
+"""
+BaseLibraryReader の取得処理（エンジンの切り替え・再試行・サーキットブレーカー）のテスト。
+ブラウザ・OPAC には接続せず、ログイン・取得処理を差し替えた区で確かめる。
+"""
+
+import itertools
+
+import pytest
+
+from http_engine import HttpEngineError
+from library_reader import BaseLibraryReader
+from resilience import CLOSED, OPEN, CircuitOpenError, LoginError, RetryPolicy
+
+_areas = itertools.count()
+
+
+def make_reader(http_login, **kwargs):
+    """HTTP エンジンで取得し、Playwright での取得は呼び出しを記録するだけの区のリーダー"""
+
+    class Reader(BaseLibraryReader):
+        AREA = f"test-{next(_areas)}"
+        LOGGED_IN_SELECTOR = "#mypage"
+        URL = "https://opac.example.jp/"
+        ENGINES = ("http", "playwright")
+
+        playwright_calls = 0
+
+        def _login(self, context):
+            raise NotImplementedError
+
+        def _open_lent(self, page):
+            raise NotImplementedError
+
+        def _read_lent(self, page):
+            raise NotImplementedError
+
+        def _open_reserve(self, page):
+            raise NotImplementedError
+
+        def _read_reserve(self, page):
+            raise NotImplementedError
+
+        def _http_login(self, client):
+            return http_login(self)
+
+        def _http_iter_lent(self, client, doc):
+            return iter(["lent"])
+
+        def _with_login(self, action):
+            type(self).playwright_calls += 1
+            return ["from playwright"]
+
+        def _iter_with_login(self, action):
+            type(self).playwright_calls += 1
+            yield "from playwright"
+
+    kwargs.setdefault("retry_policy", RetryPolicy(base_delay=0))
+    return Reader("0001", "secret", engine="http", **kwargs)
+
+
+def test_login_error_is_not_retried_with_playwright():
+    calls = []
+
+    def http_login(reader):
+        calls.append(1)
+        raise LoginError("ログインに失敗しました")
+
+    reader = make_reader(http_login)
+    with pytest.raises(LoginError):
+        reader.lent
+    with pytest.raises(LoginError):
+        list(reader.iter_lent())
+    assert len(calls) == 2
+    assert reader.playwright_calls == 0
+
+
+def test_structural_mismatch_falls_back_to_playwright():
+    def http_login(reader):
+        raise HttpEngineError("ログインフォームが見つかりません")
+
+    reader = make_reader(http_login)
+    assert reader.lent == ["from playwright"]
+    assert list(reader.iter_lent()) == ["from playwright"]
+    assert reader.playwright_calls == 2
+    assert reader.circuit_breaker.state == CLOSED
+
+
+def test_unavailable_opac_is_not_retried_with_playwright():
+    def http_login(reader):
+        raise ConnectionError("connection refused")
+
+    reader = make_reader(http_login, retry_policy=RetryPolicy(attempts=1))
+    with pytest.raises(ConnectionError):
+        reader.lent
+    assert reader.playwright_calls == 0
+
+
+
+def test_wrong_password_does_not_take_the_ward_down():
+    """1アカウントのログインの失敗は再試行せず、区のサーキットブレーカーにも数えない"""
+    logins = []
+
+    def http_login(reader):
+        logins.append(reader.card)
+        if reader.password != "secret":
+            raise LoginError("ログインに失敗しました")
+        return None
+
+    reader = make_reader(http_login)
+    bad = type(reader)("0002", "wrong", engine="http", retry_policy=reader.retry_policy)
+    for _ in range(5):
+        with pytest.raises(LoginError):
+            bad.lent
+    assert logins == ["0002"] * 5
+    assert bad.metrics.retries == 0
+    assert bad.circuit_breaker.state == CLOSED
+
+    assert reader.lent == ["lent"]
+
+
+def test_connection_failures_are_retried_and_open_the_circuit():
+    logins = []
+
+    def http_login(reader):
+        logins.append(1)
+        raise ConnectionError("connection refused")
+
+    reader = make_reader(http_login)
+    for _ in range(reader.circuit_breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            reader.lent
+    assert len(logins) == 3 * reader.retry_policy.attempts
+    assert reader.circuit_breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        reader.lent
+    assert len(logins) == 9
+
+
+def test_reserve_list_is_requested_while_the_lent_list_is_read():
+    import threading
+
+    lent_started = threading.Event()
+
+    class Reader(type(make_reader(lambda reader: "mypage"))):
+        def _http_iter_lent(self, client, doc):
+            return BaseLibraryReader._http_iter_lent(self, client, doc)
+
+        def _http_open_lent(self, client, doc):
+            return "lent-doc"
+
+        def _http_read_lent(self, client, doc):
+            lent_started.set()
+            yield "lent"
+
+        def _http_open_reserve(self, client, doc):
+            # 貸出中一覧の解析が始まるまで待つ（順に取得すると時間切れで失敗する）
+            assert lent_started.wait(timeout=5)
+            return "reserve-doc"
+
+        def _http_read_reserve(self, client, doc):
+            assert doc == "reserve-doc"
+            yield "reserve"
+
+    reader = Reader("0001", "secret", engine="http")
+    assert reader.fetch_all() == (["lent"], ["reserve"])
+
+
+class FakeLocator:
+    def __init__(self, visible: bool, timeout_error: type) -> None:
+        self.visible = visible
+        self.timeout_error = timeout_error
+        self.first = self
+
+    def wait_for(self, timeout=None) -> None:
+        if not self.visible:
+            raise self.timeout_error(f"Timeout {timeout}ms exceeded.")
+
+    def is_visible(self) -> bool:
+        return self.visible
+
+    def count(self) -> int:
+        return int(self.visible)
+
+
+class FakePage:
+    url = "https://opac.example.jp/login"
+
+    def __init__(self, visible_selectors, timeout_error: type) -> None:
+        self.visible_selectors = visible_selectors
+        self.timeout_error = timeout_error
+
+    def locator(self, selector: str) -> FakeLocator:
+        return FakeLocator(selector in self.visible_selectors, self.timeout_error)
+
+    def goto(self, url: str) -> None:
+        self.url = url
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeContext:
+    """new_page で返すページを順に指定できるコンテキスト"""
+
+    def __init__(self, pages) -> None:
+        self._pages = list(pages)
+        self.pages = []
+
+    def new_page(self) -> FakePage:
+        page = self._pages.pop(0)
+        self.pages.append(page)
+        return page
+
+    def on(self, event, callback) -> None:
+        pass
+
+    def clear_cookies(self) -> None:
+        pass
+
+    def storage_state(self):
+        return {"cookies": []}
+
+
+class FakeSessionCache:
+    def __init__(self, cached=None) -> None:
+        self.cached = cached
+        self.saved = []
+
+    def get(self, area, card, password):
+        return self.cached
+
+    def put(self, area, card, password, storage_state, url) -> None:
+        self.saved.append(url)
+
+
+def use_context(monkeypatch, context: FakeContext) -> None:
+    """共有ブラウザの代わりに context を払い出す"""
+    import contextlib
+
+    import library_reader
+
+    class Pool:
+        @contextlib.contextmanager
+        def new_context(self, **kwargs):
+            yield context
+
+    monkeypatch.setattr(library_reader, "get_browser_pool", Pool)
+
+
+def test_log_in_waits_for_the_logged_in_marker(fake_playwright):
+    reader = make_reader(lambda reader: None)
+    page = FakePage({"#mypage"}, fake_playwright.TimeoutError)
+    reader._login = lambda context: page
+    assert reader._log_in(object()) is page
+
+
+def test_log_in_raises_login_error_when_the_login_form_remains(fake_playwright):
+    reader = make_reader(lambda reader: None)
+    page = FakePage({'input[type="password"]'}, fake_playwright.TimeoutError)
+    reader._login = lambda context: page
+    with pytest.raises(LoginError):
+        reader._log_in(object())
+
+
+def test_log_in_keeps_other_timeouts(fake_playwright):
+    reader = make_reader(lambda reader: None)
+    reader._login = lambda context: FakePage(set(), fake_playwright.TimeoutError)
+    with pytest.raises(fake_playwright.TimeoutError):
+        reader._log_in(object())
+
+
+def test_wait_for_rows_returns_true_when_rows_appear(fake_playwright):
+    reader = make_reader(lambda reader: None)
+    page = FakePage({"tr.item"}, fake_playwright.TimeoutError)
+    assert reader._wait_for_rows(page, "tr.item") is True
+
+
+def test_wait_for_rows_treats_a_timeout_as_empty(fake_playwright, caplog):
+    reader = make_reader(lambda reader: None)
+    page = FakePage(set(), fake_playwright.TimeoutError)
+    assert reader._wait_for_rows(page, "tr.item") is False
+    assert "空として扱います" in caplog.text
+
+
+def test_restore_session_waits_for_the_logged_in_marker(fake_playwright):
+    reader = make_reader(lambda reader: None)
+    restored = FakePage({"#mypage"}, fake_playwright.TimeoutError)
+    assert reader._restore_session(FakeContext([restored]), "/mypage") is restored
+
+    expired = FakePage(set(), fake_playwright.TimeoutError)
+    assert reader._restore_session(FakeContext([expired]), "/mypage") is None
+    assert expired.closed
+
+
+def test_failed_login_is_not_cached(fake_playwright, monkeypatch):
+    cache = FakeSessionCache()
+    reader = make_reader(lambda reader: None, session_cache=cache)
+    reader.block_resources = False
+    login_page = FakePage({'input[type="password"]'}, fake_playwright.TimeoutError)
+    reader._login = lambda context: context.new_page()
+    use_context(monkeypatch, FakeContext([login_page]))
+
+    with pytest.raises(LoginError):
+        with reader._browser_session():
+            pass
+    assert cache.saved == []
+
+
+def test_session_is_cached_after_the_logged_in_marker(fake_playwright, monkeypatch):
+    cache = FakeSessionCache()
+    reader = make_reader(lambda reader: None, session_cache=cache)
+    reader.block_resources = False
+    page = FakePage({"#mypage"}, fake_playwright.TimeoutError)
+    page.url = "https://opac.example.jp/mypage"
+    reader._login = lambda context: context.new_page()
+    use_context(monkeypatch, FakeContext([page]))
+
+    with reader._browser_session() as (_, logged_in):
+        assert logged_in is page
+    assert cache.saved == ["https://opac.example.jp/mypage"]
+
+
+def test_wrong_password_logs_in_once_on_mock_opac(monkeypatch):
+    """HTTP エンジンでのログインの失敗は 401 を返し、Playwright でログインし直さない"""
+    import sys
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+    import mock_opac
+    import nakano
+    from app import lambda_handler
+
+    server = mock_opac.MockOpacServer().start()
+    try:
+        monkeypatch.setattr(
+            nakano.NakanoLibraryReader, "URL", server.entry_url("nakano")
+        )
+        params = {"area": "nakano", "userid": "1", "password": mock_opac.WRONG_PASSWORD}
+        response = lambda_handler({"queryStringParameters": params}, None)
+    finally:
+        server.stop()
+    assert response["statusCode"] == 401
+    assert server.login_attempts == 1
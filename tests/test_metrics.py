@@ -0,0 +1,26 @@
+import json
+import logging
+
+from metrics import Metrics, log_metrics
+
+
+class FakeResponse:
+    def __init__(self, headers) -> None:
+        self.headers = headers
+
+
+def test_log_metrics_is_emitted_at_the_lambda_default_level(caplog, monkeypatch):
+    # Lambda のルートロガーは WARNING
+    monkeypatch.setattr(logging.getLogger(), "level", logging.WARNING)
+    log_metrics(Metrics("minato", "http"))
+    assert json.loads(caplog.records[-1].getMessage())["area"] == "minato"
+
+
+def test_responses_without_content_length_are_counted_separately():
+    metrics = Metrics("minato", "playwright")
+    metrics.on_browser_response(FakeResponse({"content-length": "1200"}))
+    metrics.on_browser_response(FakeResponse({"transfer-encoding": "chunked"}))
+    values = metrics.as_dict()
+    assert values["requests"] == 2
+    assert values["content_length_bytes"] == 1200
+    assert values["unsized_responses"] == 1
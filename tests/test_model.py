@@ -0,0 +1,27 @@
+from datetime import date
+
+import pytest
+
+from model import parse_date
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2024/05/01", date(2024, 5, 1)),
+        (" 2024/5/1 ", date(2024, 5, 1)),
+        ("2024-05-01", date(2024, 5, 1)),
+        ("2024年5月1日", date(2024, 5, 1)),
+        ("返却期限：2024.05.01", date(2024, 5, 1)),
+        (date(2024, 5, 1), date(2024, 5, 1)),
+    ],
+)
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value", [None, "", "予約中", "2024/05", "2024/02/30", "2024/13/01", "2024年0月1日"]
+)
+def test_parse_date_returns_none_for_unparsable_values(value):
+    assert parse_date(value) is None
@@ -0,0 +1,65 @@
+"""
+各区の解析処理を fixtures の HTML で確かめる（ブラウザ・ネットワークは使わない）。
+fixtures は各リーダーのセレクタに合わせて作った合成の HTML のため、ここで確かめられるのは
+解析処理（セルの並びからアイテムを組み立てる部分）だけで、実際の画面とセレクタの
+ずれは検出できない。
+"""
+
+import importlib
+from datetime import date
+
+import pytest
+
+from model import LentItem, ReserveItem
+
+# 区ごとの (貸出中のタイトル, 予約中のタイトル, 予約順位)
+EXPECTED = {
+    "minato": (
+        ["吾輩は猫である 上", "こころ", "銀河鉄道の夜"],
+        ["坊っちゃん", "羅生門 鼻"],
+        [3, None],
+    ),
+    "nakano": (
+        ["吾輩は猫である夏目漱石", "三四郎夏目漱石"],
+        ["それから", "門", "虞美人草"],
+        ["3", "", ""],
+    ),
+    "nerima": (["草枕", "夢十夜"], ["硝子戸の中", "行人"], [5, None]),
+    "suginami": (["明暗", "彼岸過迄"], ["道草", "坑夫"], ["2", ""]),
+}
+
+
+def parse(area: str, kind: str, fixture_html):
+    module = importlib.import_module(area)
+    return getattr(module, f"parse_{kind}_html")(fixture_html(area, kind))
+
+
+@pytest.mark.parametrize("area", EXPECTED)
+def test_parse_lent_html(area, fixture_html):
+    items = parse(area, "lent", fixture_html)
+    assert all(isinstance(i, LentItem) for i in items)
+    assert [i.title for i in items] == EXPECTED[area][0]
+    assert all(isinstance(i.return_date, date) for i in items)
+
+
+@pytest.mark.parametrize("area", EXPECTED)
+def test_parse_reserve_html(area, fixture_html):
+    items = parse(area, "reserve", fixture_html)
+    assert all(isinstance(i, ReserveItem) for i in items)
+    assert [i.title for i in items] == EXPECTED[area][1]
+    assert [i.reserve_rank for i in items] == EXPECTED[area][2]
+
+
+def test_minato_lent_details(fixture_html):
+    item = parse("minato", "lent", fixture_html)[1]
+    assert item.checkout_date == date(2024, 4, 20)
+    assert item.return_date == date(2024, 5, 4)
+    assert (item.reserved_count, item.is_reserved) == (2, True)
+    assert (item.extend_count, item.is_extendable) == (1, False)
+
+
+def test_suginami_canceled_reserve(fixture_html):
+    item = parse("suginami", "reserve", fixture_html)[1]
+    assert item.is_canceled is True
+    assert item.reserve_cancel_reason == "所蔵なし"
+
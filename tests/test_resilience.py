@@ -0,0 +1,140 @@
+from datetime import datetime
+
+import pytest
+
+from resilience import (
+    CLOSED,
+    HALF_OPEN,
+    JST,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    LoginError,
+    is_transient,
+    maintenance_remaining,
+)
+
+
+def open_breaker(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker("minato", failure_threshold=2, **kwargs)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure(ConnectionError("timeout"))
+    assert breaker.state == OPEN
+    return breaker
+
+
+def start_trial(breaker: CircuitBreaker) -> None:
+    """待機時間を過ぎたことにして、試しのアクセスを始める"""
+    reset_timeout, breaker.reset_timeout = breaker.reset_timeout, 0
+    breaker.before_call()
+    breaker.reset_timeout = reset_timeout
+    assert breaker.state == HALF_OPEN
+
+
+def test_opens_after_consecutive_transient_failures():
+    breaker = open_breaker(reset_timeout=300)
+    with pytest.raises(CircuitOpenError) as e:
+        breaker.before_call()
+    assert 0 < e.value.retry_after <= 300
+
+
+def test_non_transient_failures_are_not_counted():
+    breaker = CircuitBreaker("minato", failure_threshold=2)
+    for _ in range(3):
+        breaker.record_failure(ValueError("解析エラー"))
+    assert (breaker.state, breaker.failures) == (CLOSED, 0)
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("minato", failure_threshold=2)
+    breaker.record_failure(ConnectionError())
+    breaker.record_success()
+    breaker.record_failure(ConnectionError())
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = open_breaker()
+    start_trial(breaker)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_trial_reopens():
+    breaker = open_breaker()
+    start_trial(breaker)
+    breaker.record_failure(TimeoutError())
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_non_transient_failure_of_trial_closes():
+    breaker = open_breaker()
+    start_trial(breaker)
+    breaker.record_failure(ValueError("解析エラー"))
+    assert breaker.state == CLOSED
+
+
+def test_abandoned_trial_with_items_closes():
+    breaker = open_breaker()
+    start_trial(breaker)
+    breaker.record_abandoned(produced=True)
+    assert (breaker.state, breaker.failures) == (CLOSED, 0)
+
+
+def test_abandoned_trial_without_items_hands_over_the_trial():
+    breaker = open_breaker(reset_timeout=300)
+    start_trial(breaker)
+    breaker.record_abandoned(produced=False)
+    assert breaker.state == OPEN
+    # OPEN にした時刻は変わらないので、待機時間を過ぎていれば次の呼び出しが試しになる
+    start_trial(breaker)
+
+
+def test_abandoned_call_is_ignored_unless_half_open():
+    breaker = CircuitBreaker("minato")
+    breaker.record_abandoned(produced=False)
+    assert breaker.state == CLOSED
+    breaker = open_breaker()
+    breaker.record_abandoned(produced=True)
+    assert breaker.state == OPEN
+
+
+def test_stuck_trial_is_replaced_after_trial_timeout():
+    breaker = open_breaker(trial_timeout=180)
+    start_trial(breaker)
+    breaker.trial_timeout = 0
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+
+
+def test_maintenance_window_blocks_calls():
+    # 1日中をメンテナンス時間帯にして、実行時刻に関わらず止まることを確かめる
+    windows = [("00:00", "12:00"), ("12:00", "00:00")]
+    breaker = CircuitBreaker("minato", maintenance_windows=windows)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+@pytest.mark.parametrize(
+    "hhmm, expected",
+    [("01:30", 30 * 60), ("23:00", 3 * 3600), ("02:00", 0.0), ("12:00", 0.0)],
+)
+def test_maintenance_remaining(hhmm, expected):
+    hour, minute = map(int, hhmm.split(":"))
+    now = datetime(2024, 5, 1, hour, minute, tzinfo=JST)
+    assert maintenance_remaining([("22:00", "02:00")], now) == expected
+
+
+def test_transient_errors(fake_playwright):
+    assert is_transient(ConnectionError("reset"))
+    assert is_transient(fake_playwright.Error("net::ERR_CONNECTION_RESET"))
+    # 要素を待つ処理のタイムアウトは認証情報の誤り・画面の変更でも起きるので含めない
+    assert not is_transient(fake_playwright.TimeoutError("Timeout 10000ms exceeded"))
+    assert not is_transient(fake_playwright.Error("strict mode violation"))
+    assert not is_transient(LoginError("ログインに失敗しました"))
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from resilience import CircuitOpenError, LoginError
+from result_cache import (
+    FALLBACK,
+    HIT,
+    MISS,
+    REFRESHED,
+    STALE,
+    MemoryResultBackend,
+    ResultCache,
+)
+
+
+def expired_cache() -> ResultCache:
+    """有効期間を過ぎ、古い結果を返してよい期間内のエントリを持つキャッシュ"""
+    cache = ResultCache(MemoryResultBackend(), ttl=60, stale_ttl=3600)
+    key = cache._key("minato", "0001", "secret")
+    cache.backend.put(key, {"contents": {"v": "old"}, "saved_at": time.time() - 120})
+    return cache
+
+
+def fetch(cache: ResultCache, loader, **kwargs):
+    return cache.fetch("minato", "0001", "secret", loader, **kwargs)
+
+
+def test_stale_entry_is_served_once_then_refreshed():
+    cache = expired_cache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"v": "new"}
+
+    assert fetch(cache, loader) == ({"v": "old"}, STALE)
+    assert calls == []
+    assert fetch(cache, loader) == ({"v": "new"}, REFRESHED)
+    assert fetch(cache, loader) == ({"v": "new"}, HIT)
+    assert len(calls) == 1
+
+
+def test_miss_when_nothing_is_cached():
+    cache = ResultCache(MemoryResultBackend())
+    assert fetch(cache, lambda: {"v": "new"}) == ({"v": "new"}, MISS)
+
+
+@pytest.mark.parametrize(
+    "error", [ConnectionError("refused"), CircuitOpenError("minato", 60, "停止中")]
+)
+def test_failed_refresh_of_unavailable_opac_serves_stale(error):
+    cache = expired_cache()
+    fetch(cache, lambda: {"v": "new"})
+
+    def loader():
+        raise error
+
+    result = fetch(cache, loader, fallback_errors=(CircuitOpenError,))
+    assert result == ({"v": "old"}, FALLBACK)
+
+
+def test_failed_refresh_with_other_errors_is_raised():
+    cache = expired_cache()
+    fetch(cache, lambda: {"v": "new"})
+
+    def loader():
+        raise LoginError("ログインに失敗しました")
+
+    with pytest.raises(LoginError):
+        fetch(cache, loader, fallback_errors=(CircuitOpenError,))
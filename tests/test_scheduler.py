@@ -0,0 +1,192 @@
+import importlib
+from datetime import date, datetime
+
+import pytest
+
+from model import LentItem, ReserveItem
+from resilience import JST, CircuitOpenError
+from scheduler import (
+    BACKOFF,
+    BASE,
+    DEADLINE,
+    ERROR,
+    HOLD_NEAR,
+    UNTIL_DEADLINE,
+    PollPolicy,
+    PollScheduler,
+    reserve_rank,
+)
+
+NOW = datetime(2024, 5, 1, 12, tzinfo=JST).timestamp()
+HOUR = 3600
+DAY = 86400
+
+
+def reserve(rank, status="予約中", **kwargs) -> ReserveItem:
+    return ReserveItem(
+        title="坊っちゃん", reserve_rank=rank, reserve_status=status, **kwargs
+    )
+
+
+@pytest.mark.parametrize(
+    "rank, expected",
+    [(1, 1), (12, 12), ("1", 1), ("3位", 3), ("2/10", 2), ("", None), (None, None)],
+)
+def test_reserve_rank(rank, expected):
+    assert reserve_rank(reserve(rank)) == expected
+
+
+class TestPollPolicy:
+    policy = PollPolicy()
+
+    def test_deadline_within_urgent_days(self):
+        lent = [LentItem(title="こころ", return_date=date(2024, 5, 2))]
+        assert self.policy.next_interval(lent, [], NOW) == (2 * HOUR, DEADLINE)
+
+    def test_overdue_item_is_not_urgent(self):
+        lent = [LentItem(title="こころ", return_date=date(2024, 4, 20))]
+        assert self.policy.next_interval(lent, [], NOW) == (12 * HOUR, BASE)
+
+    @pytest.mark.parametrize("rank", [1, "1", "1位"])
+    def test_first_in_queue(self, rank):
+        assert self.policy.next_interval([], [reserve(rank)], NOW) == (
+            2 * HOUR,
+            HOLD_NEAR,
+        )
+
+    @pytest.mark.parametrize("status", ["回送中", "移送中です"])
+    def test_in_transit(self, status):
+        items = [reserve(None, status=status)]
+        assert self.policy.next_interval([], items, NOW)[1] == HOLD_NEAR
+
+    def test_canceled_reserve_is_ignored(self):
+        items = [reserve(1, is_canceled=True, reserve_expire_date=date(2024, 5, 2))]
+        assert self.policy.next_interval([], items, NOW) == (12 * HOUR, BASE)
+
+    def test_backoff_when_unchanged(self):
+        interval, reason = self.policy.next_interval(
+            [], [reserve(5)], NOW, previous=12 * HOUR, changed=False
+        )
+        assert (interval, reason) == (24 * HOUR, BACKOFF)
+
+    def test_backoff_is_capped(self):
+        interval, _ = self.policy.next_interval(
+            [], [], NOW, previous=3 * DAY, changed=False
+        )
+        assert interval == self.policy.max_interval
+
+    def test_shortened_until_deadline_approaches(self):
+        policy = PollPolicy(max_interval=30 * DAY)
+        lent = [LentItem(title="こころ", return_date=date(2024, 5, 10))]
+        interval, reason = policy.next_interval(
+            lent, [], NOW, previous=10 * DAY, changed=False
+        )
+        # 期限の2日前（5/8）の0時まで
+        start_at = datetime(2024, 5, 8, tzinfo=JST).timestamp()
+        assert (interval, reason) == (start_at - NOW, UNTIL_DEADLINE)
+
+
+class TestPollScheduler:
+    def make_scheduler(self):
+        clock = [NOW]
+        return PollScheduler(clock=lambda: clock[0]), clock
+
+    def test_pop_due_in_due_order_and_skips_replaced_entries(self):
+        scheduler, _ = self.make_scheduler()
+        scheduler.add("nakano", "2", "", due_at=NOW - 10)
+        scheduler.add("minato", "1", "", due_at=NOW - 20)
+        scheduler.add("nakano", "2", "", due_at=NOW + 10)
+        assert [j.userid for j in scheduler.pop_due()] == ["1"]
+        assert scheduler.next_due_at() == NOW + 10
+
+    def test_drain_reschedules_with_int_and_str_ranks(self):
+        scheduler, _ = self.make_scheduler()
+        scheduler.add("minato", "1", "")
+        scheduler.add("nakano", "2", "")
+        ranks = {"1": 1, "2": "1"}
+
+        def fetch(job):
+            return [], [reserve(ranks[job.userid])]
+
+        assert scheduler.drain(fetch) == 2
+        assert [(j.reason, j.due_at) for j in scheduler.jobs()] == [
+            (HOLD_NEAR, NOW + 2 * HOUR)
+        ] * 2
+
+    def test_drain_records_errors_and_continues(self):
+        scheduler, _ = self.make_scheduler()
+        scheduler.add("minato", "1", "")
+        scheduler.add("nakano", "2", "")
+        scheduler.add("nerima", "3", "")
+
+        def fetch(job):
+            if job.userid == "1":
+                raise ConnectionError("timeout")
+            if job.userid == "2":
+                # 予定の決定（record）で失敗する場合も record_error で予定し直す
+                return [], [object()]
+            return [], []
+
+        assert scheduler.drain(fetch) == 3
+        jobs = {j.userid: j for j in scheduler.jobs()}
+        assert jobs["1"].reason == ERROR
+        assert jobs["1"].due_at == NOW + PollPolicy().error_interval
+        assert jobs["2"].reason == ERROR
+        assert jobs["3"].reason == BASE
+
+    def test_drain_reschedules_from_the_given_time(self):
+        scheduler, _ = self.make_scheduler()
+        scheduler.add("minato", "1", "", due_at=NOW)
+        scheduler.add("nakano", "2", "", due_at=NOW)
+        later = NOW + DAY
+
+        def fetch(job):
+            if job.userid == "2":
+                raise ConnectionError("timeout")
+            return [], []
+
+        scheduler.drain(fetch, now=later)
+        jobs = {j.userid: j for j in scheduler.jobs()}
+        assert (jobs["1"].fetched_at, jobs["1"].due_at) == (later, later + 12 * HOUR)
+        assert jobs["2"].due_at == later + PollPolicy().error_interval
+
+    def test_error_waits_for_circuit_to_reopen(self):
+        scheduler, _ = self.make_scheduler()
+        job = scheduler.add("minato", "1", "")
+        retry_after = 4 * HOUR
+        scheduler.record_error(job, CircuitOpenError("minato", retry_after, "停止中"))
+        assert scheduler.next_due_at() == NOW + retry_after
+
+    def test_job_removed_during_fetch_is_not_rescheduled(self):
+        scheduler, _ = self.make_scheduler()
+        scheduler.add("minato", "1", "")
+
+        def fetch(job):
+            scheduler.remove(job.area, job.userid)
+            return [], []
+
+        scheduler.drain(fetch)
+        assert len(scheduler) == 0
+        assert scheduler.next_due_at() is None
+
+    def test_unchanged_results_back_off(self):
+        scheduler, clock = self.make_scheduler()
+        scheduler.add("minato", "1", "")
+        fetch = lambda job: ([], [reserve(5)])  # noqa: E731
+
+        scheduler.drain(fetch)
+        clock[0] = scheduler.next_due_at()
+        scheduler.drain(fetch)
+        (job,) = scheduler.jobs()
+        assert (job.reason, job.interval) == (BACKOFF, 24 * HOUR)
+
+
+@pytest.mark.parametrize("area", ["minato", "nakano", "nerima", "suginami"])
+def test_parsed_fixture_items_can_be_scheduled(area, fixture_html):
+    """区ごとに数値・文字列の異なる予約順位でも、次回の取得時刻を決められる"""
+    module = importlib.import_module(area)
+    lent = module.parse_lent_html(fixture_html(area, "lent"))
+    reserve = module.parse_reserve_html(fixture_html(area, "reserve"))
+    scheduler = PollScheduler(clock=lambda: NOW)
+    job = scheduler.add(area, "1", "")
+    assert scheduler.record(job, lent, reserve).due_at > NOW
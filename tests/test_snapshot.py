@@ -0,0 +1,57 @@
+"""差分検出のテスト。資料は合成の fixtures（実際の画面の保存ではない）から組み立てる"""
+
+from dataclasses import replace
+from datetime import date
+
+from minato import parse_lent_html, parse_reserve_html
+from result_cache import MemoryResultBackend
+from snapshot import LENT_IDENTITY, SnapshotStore, diff_items
+
+
+def lent_items(fixture_html):
+    return parse_lent_html(fixture_html("minato", "lent"))
+
+
+def test_same_items_have_no_diff(fixture_html):
+    items = lent_items(fixture_html)
+    assert diff_items(items, lent_items(fixture_html), LENT_IDENTITY).is_empty
+
+
+def test_added_removed_and_changed(fixture_html):
+    old = lent_items(fixture_html)
+    extended = replace(old[1], return_date=date(2024, 5, 18), extend_count=2)
+    new = [old[0], extended]
+
+    diff = diff_items(old, new, LENT_IDENTITY)
+    assert diff.added == []
+    assert [i["title"] for i in diff.removed] == [old[2].title]
+    (change,) = diff.changed
+    assert change.item["title"] == "こころ"
+    assert set(change.changes) == {"return_date", "extend_count"}
+    assert change.changes["extend_count"] == {"old": 1, "new": 2}
+
+
+def test_copies_with_the_same_identity_are_matched_in_order(fixture_html):
+    item = lent_items(fixture_html)[0]
+    diff = diff_items([item], [item, item], LENT_IDENTITY)
+    assert len(diff.added) == 1
+    assert not diff.removed and not diff.changed
+
+
+def test_snapshot_store_diffs_against_previous_fetch(fixture_html):
+    store = SnapshotStore(MemoryResultBackend())
+    lent = lent_items(fixture_html)
+    reserve = parse_reserve_html(fixture_html("minato", "reserve"))
+
+    first = store.diff_and_save("minato", "1", lent, reserve)
+    assert first["previous_at"] is None
+    assert len(first["lent"].added) == len(lent)
+
+    second = store.diff_and_save("minato", "1", lent[:2], reserve)
+    assert second["previous_at"] is not None
+    assert [i["title"] for i in second["lent"].removed] == [lent[2].title]
+    assert second["reserve"].is_empty
+
+    # consumer ごとに別のスナップショットを持つ
+    other = store.diff_and_save("minato", "1", lent[:2], reserve, consumer="notify")
+    assert len(other["lent"].added) == 2